@@ -0,0 +1,20 @@
+from django.contrib import admin
+
+from .models import DailySalesRollup
+
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the sales rollups; they are maintained automatically.
+    """
+
+    list_display = ("day", "category", "status", "revenue", "units", "orders")
+    list_filter = ("status", "category")
+    date_hierarchy = "day"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,42 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.rollups import RollupJobsRunning, rebuild
+
+
+def parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}, expected YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the daily sales rollups from the order tables.
+
+    Needed once to backfill existing orders, and after changing orders
+    outside the application (raw SQL, fixtures). Limit the work to a range
+    of days with --start / --end; the rows of those days are replaced in
+    one transaction.
+
+    The rollup deltas still queued for those days are dropped in the same
+    transaction, as the orders they come from are counted by the rebuild;
+    changes committed after it queue new deltas as usual. The command
+    refuses to run while a worker is applying deltas: run it again once
+    that job is done.
+    """
+
+    help = "Rebuild the daily sales rollups from the orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=parse_date, help="First day, YYYY-MM-DD.")
+        parser.add_argument("--end", type=parse_date, help="Last day, YYYY-MM-DD.")
+
+    def handle(self, *args, **options):
+        try:
+            written = rebuild(options["start"], options["end"])
+        except RollupJobsRunning as exc:
+            raise CommandError(f"{exc} Try again when it is done.")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} sales rollup rows."))
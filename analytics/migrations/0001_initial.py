@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("categories", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailySalesRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("Pending", "Pending"),
+                            ("Pending Payment", "Pending Payment"),
+                            ("Processing", "Processing"),
+                            ("Shipped", "Shipped"),
+                            ("Delivered", "Delivered"),
+                            ("Cancelled", "Cancelled"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("units", models.IntegerField(default=0)),
+                ("orders", models.IntegerField(default=0)),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="categories.category",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "DailySalesRollups",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day", "category", "status"),
+                        name="unique_daily_sales_rollup",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.db import models
+
+from orders.models import Order
+
+
+class DailySalesRollup(models.Model):
+    """
+    Sales of one day, in one category, for orders in one status.
+
+    Rows are kept up to date incrementally when orders are placed and when
+    their status changes, by background jobs queued with the change (see
+    analytics/rollups.py), so sales reports read
+    a handful of pre-aggregated rows instead of scanning the order tables.
+
+    Attributes:
+        day (DateField): The local date the orders were placed.
+        category (ForeignKey): The category of the products sold.
+        status (CharField): The current status of the orders.
+        revenue (DecimalField): The sum of quantity x price at order time.
+        units (IntegerField): The number of units sold.
+        orders (IntegerField): The number of orders with items in the
+            category; an order spanning two categories counts in both.
+    """
+
+    day = models.DateField()
+    category = models.ForeignKey(
+        "categories.Category", on_delete=models.CASCADE, related_name="+"
+    )
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units = models.IntegerField(default=0)
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        """
+        Meta options for the DailySalesRollup model.
+
+        - db_table: Sets a custom table name in the database.
+        - constraints: One row per day, category and status; its index
+          also serves date-range reports.
+        """
+
+        db_table = "DailySalesRollups"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "category", "status"],
+                name="unique_daily_sales_rollup",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.category_id} {self.status}: {self.revenue}"
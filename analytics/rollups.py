@@ -0,0 +1,269 @@
+"""
+Incremental maintenance of the daily sales rollups.
+
+An order contributes its items to the row of (day it was placed, product
+category, order status). Placing orders adds their contributions; a
+status change moves them from the old status row to the new one. The
+category is the one the product had when the order was placed
+(OrderItem.category_at_order_time): moving a product to another category
+later doesn't move its past sales, so a status change always moves the
+rows the order was added to. Contributions are computed for any number
+of orders with one grouped query, which keeps bulk changes (such as the
+expired hold sweep) cheap.
+
+The changes are computed in the transaction that changes the orders, as
+signed deltas, and queued there as a background job (see jobs/queue.py):
+checkouts don't wait on the hot rollup rows, yet no change can be lost.
+Deltas only add up, so the jobs may run in any order. A worker applies
+them with `SET revenue = revenue + ...`, in a fixed key order so that
+concurrent workers lock rows in the same order.
+
+A rebuild reads the order tables, which already include every change
+whose deltas are still queued: it drops those deltas in its own
+transaction, so that they are not added a second time.
+"""
+
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import enqueue
+from orders.models import ArchivedOrderItem, OrderItem
+
+from .models import DailySalesRollup
+
+MEASURES = ("revenue", "units", "orders")
+
+APPLY_DELTAS_JOB = "analytics.apply_rollup_deltas"
+
+
+class RollupJobsRunning(Exception):
+    """
+    Raised by rebuild() while a worker is applying rollup deltas.
+    """
+
+
+def contributions(items, group_by_status=True):
+    """
+    Groups order items into rollup rows.
+
+    Returns a values() queryset with day, category_id, (status,) revenue,
+    units and orders.
+    """
+    keys = ["day", "category_id"] + (["status"] if group_by_status else [])
+    return (
+        items.order_by()
+        .annotate(
+            day=TruncDate("order__created_at"),
+            # Items without one (added outside the checkout) fall back to
+            # the product's current category.
+            category_id=Coalesce("category_at_order_time_id", "product__category_id"),
+            status=F("order__status"),
+        )
+        .values(*keys)
+        .annotate(
+            revenue=Sum(
+                F("price_at_order_time") * F("quantity"),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+            units=Sum("quantity"),
+            orders=Count("order_id", distinct=True),
+        )
+    )
+
+
+def _deltas(rows, status=None, sign=1):
+    """
+    Turns contribution rows into signed deltas of the `status` rows (or of
+    each row's own status).
+    """
+    return [
+        {
+            "day": row["day"],
+            "category_id": row["category_id"],
+            "status": status or row["status"],
+            **{measure: sign * row[measure] for measure in MEASURES},
+        }
+        for row in rows
+    ]
+
+
+def _enqueue(deltas):
+    if deltas:
+        enqueue(APPLY_DELTAS_JOB, deltas=deltas)
+
+
+def apply_deltas(deltas):
+    """
+    Adds deltas to the rollup rows, creating missing rows.
+
+    Rows a negative delta brings down to zero (every order of a day and
+    category moved to another status) are deleted, so they don't pile up
+    in the table and in the reports.
+    """
+    for row in sorted(
+        deltas, key=lambda row: (row["day"], row["category_id"], row["status"])
+    ):
+        key = {
+            "day": row["day"],
+            "category_id": row["category_id"],
+            "status": row["status"],
+        }
+        values = {measure: row[measure] for measure in MEASURES}
+        increments = {measure: F(measure) + value for measure, value in values.items()}
+        if DailySalesRollup.objects.filter(**key).update(**increments):
+            if values["orders"] < 0:
+                # Still locked by the update above.
+                DailySalesRollup.objects.filter(
+                    **key, **{measure: 0 for measure in MEASURES}
+                ).delete()
+            continue
+        try:
+            with transaction.atomic():
+                DailySalesRollup.objects.create(**key, **values)
+        except IntegrityError:
+            # Created by a concurrent transaction in the meantime.
+            DailySalesRollup.objects.filter(**key).update(**increments)
+
+
+def record_orders_placed(order_ids):
+    """
+    Adds newly placed orders (with their items saved) to the rollups.
+    """
+    _enqueue(
+        _deltas(contributions(OrderItem.objects.filter(order_id__in=list(order_ids))))
+    )
+
+
+def record_orders_removed(order_ids):
+    """
+    Takes orders about to be deleted (items still present) out of the rollups.
+    """
+    _enqueue(
+        _deltas(
+            contributions(OrderItem.objects.filter(order_id__in=list(order_ids))),
+            sign=-1,
+        )
+    )
+
+
+def record_status_change(order_ids, old_status, new_status):
+    """
+    Moves orders that went from `old_status` to `new_status` between rows.
+    """
+    if old_status == new_status:
+        return
+    rows = list(
+        contributions(
+            OrderItem.objects.filter(order_id__in=list(order_ids)),
+            group_by_status=False,
+        )
+    )
+    _enqueue(_deltas(rows, old_status, -1) + _deltas(rows, new_status))
+
+
+def local_day_range(start, end):
+    """
+    Returns the aware datetimes bounding the local dates start..end.
+    """
+    tz = timezone.get_current_timezone()
+    lower = datetime.datetime.combine(start, datetime.time.min, tzinfo=tz)
+    upper = datetime.datetime.combine(
+        end + datetime.timedelta(days=1), datetime.time.min, tzinfo=tz
+    )
+    return lower, upper
+
+
+def discard_queued_deltas(start=None, end=None):
+    """
+    Drops the queued deltas of the days start..end (all days by default).
+
+    Must run in the transaction of a rebuild of those days, before it
+    reads the orders: the locked jobs can't be claimed until it commits.
+    Deltas of other days stay queued. Raises RollupJobsRunning if a
+    worker is applying deltas, as those may land on either side of the
+    rebuild.
+    """
+    jobs = Job.objects.select_for_update().filter(
+        name=APPLY_DELTAS_JOB, status__in=("queued", "running")
+    )
+    emptied = []
+    for job in jobs.order_by("pk"):
+        if job.status == "running":
+            raise RollupJobsRunning(f"Rollup job #{job.pk} is running.")
+        deltas = job.payload["deltas"]
+        kept = [
+            row
+            for row in deltas
+            if (start and datetime.date.fromisoformat(row["day"]) < start)
+            or (end and datetime.date.fromisoformat(row["day"]) > end)
+        ]
+        if not kept:
+            emptied.append(job.pk)
+        elif len(kept) < len(deltas):
+            job.payload["deltas"] = kept
+            job.save(update_fields=["payload"])
+    Job.objects.filter(pk__in=emptied).delete()
+
+
+def rebuild(start=None, end=None, batch_size=1000):
+    """
+    Recomputes the rollups of the days start..end (all days by default)
+    from the order tables, archived orders included, and drops the queued
+    deltas of those days. Returns the number of rows written.
+    """
+    rollups = DailySalesRollup.objects.all()
+    filters = {}
+    if start is not None:
+        filters["order__created_at__gte"] = local_day_range(start, start)[0]
+        rollups = rollups.filter(day__gte=start)
+    if end is not None:
+        filters["order__created_at__lt"] = local_day_range(end, end)[1]
+        rollups = rollups.filter(day__lte=end)
+
+    with transaction.atomic():
+        discard_queued_deltas(start, end)
+
+        # An order is either hot or archived, so the two sets of rows add up.
+        totals = {}
+        for model in (OrderItem, ArchivedOrderItem):
+            for row in contributions(model.objects.filter(**filters)):
+                key = (row["day"], row["category_id"], row["status"])
+                if key in totals:
+                    for measure in MEASURES:
+                        totals[key][measure] += row[measure]
+                else:
+                    totals[key] = row
+
+        rollups.delete()
+        rows = DailySalesRollup.objects.bulk_create(
+            [DailySalesRollup(**row) for row in totals.values()],
+            batch_size=batch_size,
+        )
+    return len(rows)
+
+
+def report(start, end, group_by, filters=None):
+    """
+    Sums the rollups of the days start..end, grouped by any of `day`,
+    `category` and `status`. Returns a list of rows ordered by the groups.
+    """
+    fields = {"day": "day", "category": "category__slug", "status": "status"}
+    keys = [fields[name] for name in group_by]
+    rows = (
+        DailySalesRollup.objects.filter(day__range=(start, end), **(filters or {}))
+        .values(*keys)
+        .annotate(**{measure: Sum(measure) for measure in MEASURES})
+        .order_by(*keys)
+    )
+    return [
+        {
+            **{name: row[fields[name]] for name in group_by},
+            **{measure: row[measure] for measure in MEASURES},
+        }
+        for row in rows
+    ]
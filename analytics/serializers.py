@@ -0,0 +1,52 @@
+from rest_framework import serializers
+
+from orders.models import Order
+
+GROUPS = ("day", "category", "status")
+
+
+class SalesReportParamsSerializer(serializers.Serializer):
+    """
+    Validates the query parameters of a sales report.
+
+    `start` and `end` are inclusive local dates; `group_by` is a
+    non-empty comma-separated list of `day`, `category` and `status`
+    (`day` when left out).
+    """
+
+    start = serializers.DateField()
+    end = serializers.DateField()
+    group_by = serializers.CharField(required=False, default="day")
+    category = serializers.SlugField(required=False)
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES, required=False)
+
+    def validate_group_by(self, value):
+        names = [name.strip() for name in value.split(",") if name.strip()]
+        if not names:
+            raise serializers.ValidationError(
+                f"Give at least one of {', '.join(GROUPS)}."
+            )
+        unknown = [name for name in names if name not in GROUPS]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown groups: {', '.join(unknown)}. Use {', '.join(GROUPS)}."
+            )
+        return list(dict.fromkeys(names))
+
+    def validate(self, data):
+        if data["start"] > data["end"]:
+            raise serializers.ValidationError("`start` must not be after `end`.")
+        return data
+
+
+class SalesRowSerializer(serializers.Serializer):
+    """
+    A row of a sales report; only the grouped fields are present.
+    """
+
+    day = serializers.DateField(required=False)
+    category = serializers.CharField(required=False)
+    status = serializers.CharField(required=False)
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    units = serializers.IntegerField()
+    orders = serializers.IntegerField()
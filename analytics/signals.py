@@ -0,0 +1,54 @@
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from orders.archive import is_archiving
+from orders.models import Order
+
+from .rollups import record_orders_removed, record_status_change
+
+
+def _saves_status(instance, raw, update_fields):
+    return not (
+        raw
+        or instance._state.adding
+        or (update_fields is not None and "status" not in update_fields)
+    )
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_status(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Reads the stored status of an order about to be saved.
+    """
+    if _saves_status(instance, raw, update_fields):
+        instance._stored_status = (
+            Order.objects.filter(pk=instance.pk)
+            .values_list("status", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Order)
+def move_order_between_rollups(
+    sender, instance, created, raw=False, update_fields=None, **kwargs
+):
+    """
+    Keeps the sales rollups in step when save() changes an order's status,
+    e.g. from the admin or the API. Bulk status changes go through
+    queryset.update() and record the change themselves.
+    """
+    stored_status = instance.__dict__.pop("_stored_status", None)
+    if created or stored_status is None:
+        return
+    record_status_change([instance.pk], stored_status, instance.status)
+
+
+@receiver(pre_delete, sender=Order)
+def remove_order_from_rollups(sender, instance, **kwargs):
+    """
+    Takes a deleted order out of the sales rollups. Orders moved to the
+    archive still count.
+    """
+    if is_archiving():
+        return
+    record_orders_removed([instance.pk])
@@ -0,0 +1,23 @@
+import datetime
+import decimal
+
+from jobs.queue import task
+
+from .rollups import APPLY_DELTAS_JOB, apply_deltas
+
+
+@task(APPLY_DELTAS_JOB)
+def apply_rollup_deltas(deltas):
+    """
+    Applies the rollup deltas queued by analytics.rollups.
+    """
+    apply_deltas(
+        [
+            {
+                **row,
+                "day": datetime.date.fromisoformat(row["day"]),
+                "revenue": decimal.Decimal(row["revenue"]),
+            }
+            for row in deltas
+        ]
+    )
@@ -0,0 +1,150 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from categories.models import Category
+from jobs.models import Job
+from orders.archive import archive_batch
+from orders.models import Order, OrderItem
+from orders.status import bulk_transition
+from products.models import Product
+from users.models import Users
+
+from .models import DailySalesRollup
+from .rollups import APPLY_DELTAS_JOB, rebuild, record_orders_placed
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create_user(
+            username="customer", email="customer@example.com", password="x"
+        )
+        cls.category = Category.objects.create(name="Before")
+        cls.other_category = Category.objects.create(name="After")
+        cls.product = Product.objects.create(
+            name="Mouse", price=10, stack=10, category=cls.category
+        )
+
+    def place(self, quantity):
+        order = Order.objects.create(user=self.user, total_amount=10 * quantity)
+        OrderItem.objects.create(
+            order=order,
+            product=self.product,
+            quantity=quantity,
+            price_at_order_time=10,
+            category_at_order_time=self.category,
+        )
+        record_orders_placed([order.pk])
+        return order
+
+    def run_jobs(self):
+        call_command("run_workers", "--once", stdout=StringIO())
+
+    def rollups(self):
+        return sorted(
+            DailySalesRollup.objects.values_list(
+                "category_id", "status", "units", "revenue"
+            )
+        )
+
+    def test_queued_deltas_are_applied(self):
+        self.place(2)
+        self.place(3)
+        self.run_jobs()
+        self.assertEqual(self.rollups(), [(self.category.pk, "Pending", 5, 50)])
+
+    def test_rebuild_drops_queued_deltas(self):
+        self.place(2)
+        self.run_jobs()
+        self.place(3)
+        self.assertTrue(Job.objects.filter(name=APPLY_DELTAS_JOB).exists())
+
+        rebuild()
+        self.assertFalse(
+            Job.objects.filter(name=APPLY_DELTAS_JOB, status="queued").exists()
+        )
+        self.run_jobs()
+        self.assertEqual(self.rollups(), [(self.category.pk, "Pending", 5, 50)])
+
+    def test_sales_stay_in_the_category_at_order_time(self):
+        order = self.place(2)
+        self.run_jobs()
+        self.product.category = self.other_category
+        self.product.save()
+
+        bulk_transition([order.pk], "Cancelled")
+        self.run_jobs()
+        incremental = self.rollups()
+        self.assertEqual(incremental, [(self.category.pk, "Cancelled", 2, 20)])
+        rebuild()
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_status_moves_leave_no_empty_rows(self):
+        order = self.place(2)
+        self.run_jobs()
+        bulk_transition([order.pk], "Cancelled")
+        self.run_jobs()
+        # The Pending row went down to zero and is gone.
+        self.assertEqual(self.rollups(), [(self.category.pk, "Cancelled", 2, 20)])
+
+    def test_archived_orders_stay_counted(self):
+        order = self.place(2)
+        self.run_jobs()
+        with transaction.atomic():
+            archive_batch([order.pk])
+        self.run_jobs()
+        self.assertEqual(self.rollups(), [(self.category.pk, "Pending", 2, 20)])
+        rebuild()
+        self.assertEqual(self.rollups(), [(self.category.pk, "Pending", 2, 20)])
+
+
+class SalesReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = Users.objects.create_user(
+            username="staff", email="staff@example.com", password="x", is_staff=True
+        )
+        category = Category.objects.create(name="Report", slug="report")
+        today = timezone.localdate()
+        for status, units in (("Pending", 2), ("Cancelled", 1)):
+            DailySalesRollup.objects.create(
+                day=today,
+                category=category,
+                status=status,
+                revenue=10 * units,
+                units=units,
+                orders=1,
+            )
+        cls.params = {"start": today.isoformat(), "end": today.isoformat()}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def get(self, **params):
+        return self.client.get("/analytics/api/sales/", {**self.params, **params})
+
+    def test_report_groups_rows(self):
+        response = self.get(group_by="category,status")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row["status"], row["units"]) for row in response.data["results"]],
+            [("Cancelled", 1), ("Pending", 2)],
+        )
+        self.assertEqual(response.data["totals"]["units"], 3)
+
+    def test_days_by_default(self):
+        for params in ({}, {"group_by": ""}):
+            [row] = self.get(**params).data["results"]
+            self.assertEqual(set(row), {"day", "revenue", "units", "orders"})
+            self.assertEqual(row["orders"], 2)
+
+    def test_groups_are_required(self):
+        response = self.get(group_by=" , ")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("group_by", response.data)
@@ -0,0 +1,9 @@
+# analytics/urls.py
+
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path("api/sales/", views.SalesReportView.as_view(), name="sales-report"),
+]
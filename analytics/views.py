@@ -0,0 +1,42 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .rollups import MEASURES, report
+from .serializers import SalesReportParamsSerializer, SalesRowSerializer
+
+
+class SalesReportView(APIView):
+    """
+    API endpoint for sales reports (staff only).
+
+    `GET /analytics/api/sales/?start=2025-01-01&end=2025-01-31` returns
+    revenue, units and order counts per day; `group_by` can also split them
+    by `category` and `status`, and `category` (slug) / `status` filter
+    them. Answers come from the daily rollups, never from the order tables,
+    so even a year-long report reads at most a few thousand small rows.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        params = SalesReportParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+
+        filters = {}
+        if "category" in data:
+            filters["category__slug"] = data["category"]
+        if "status" in data:
+            filters["status"] = data["status"]
+        rows = report(data["start"], data["end"], data["group_by"], filters)
+
+        totals = {measure: sum(row[measure] for row in rows) for measure in MEASURES}
+        return Response(
+            {
+                "start": data["start"],
+                "end": data["end"],
+                "totals": SalesRowSerializer(totals).data,
+                "results": SalesRowSerializer(rows, many=True).data,
+            }
+        )
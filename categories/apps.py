@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CategoriesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'categories'
+
+    def ready(self):
+        # Connect the signal handlers that keep derived data in sync.
+        from . import signals  # noqa: F401
@@ -14,6 +14,8 @@ class Category(models.Model):
         name (CharField): The required name of the category.
         description (TextField): An optional text description.
         image (ImageField): An optional image for the category.
+        image_variants_ready (JSONField): Which resized variants of the
+            image exist (see ecommerce_api/images.py).
         created_at (DateTimeField): Records when the category was created.
         updated_at (DateTimeField): Records when the category was last updated.
         slug (SlugField): A URL-friendly version of the name.
@@ -21,6 +23,7 @@ class Category(models.Model):
     name = models.CharField(max_length=70)
     description = models.TextField(null=True, blank=True, help_text="Description of the Category")
     image = models.ImageField(upload_to='Categories/', blank=True, null=True)
+    image_variants_ready = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     slug = models.SlugField(max_length=100, unique=True, blank=True)
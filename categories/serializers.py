@@ -1,8 +1,12 @@
 from rest_framework import serializers
 from .models import Category
+from ecommerce_api.fields import ImageVariantsField
+from ecommerce_api.serializers import SparseFieldsetsMixin
+
+class CategorySerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    image_variants = ImageVariantsField('image')
 
-class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = ['id', 'name', 'description', 'image', 'slug', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'description', 'image', 'image_variants', 'slug', 'created_at', 'updated_at']
         read_only_fields = ['id', 'slug', 'created_at', 'updated_at']
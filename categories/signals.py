@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ecommerce_api.cache import bump_generation
+from ecommerce_api.images import schedule_variants
+
+from .models import Category
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, **kwargs):
+    """
+    Invalidates cached category (and product) responses after any write.
+
+    The generation is bumped once the write is committed: bumped earlier,
+    a concurrent read could still cache the old data under the new one.
+    """
+    transaction.on_commit(lambda: bump_generation(Category))
+
+
+@receiver(post_save, sender=Category)
+def generate_category_image_variants(sender, instance, raw=False, **kwargs):
+    """
+    Resizes a newly uploaded category image in the background.
+    """
+    update_fields = kwargs.get("update_fields")
+    if raw or (update_fields is not None and "image" not in update_fields):
+        return
+    schedule_variants(instance.image)
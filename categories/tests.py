@@ -1,3 +1,33 @@
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import Category
+
+
+class CategoryApiQueryTests(TestCase):
+    """
+    The category API reads a page with a fixed number of queries.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(5):
+            cls.category = Category.objects.create(name=f"Category {index}")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_list_queries(self):
+        # Validators, count and page.
+        with self.assertNumQueries(3):
+            response = self.client.get('/categories/api/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_queries(self):
+        # Validators and the row.
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/categories/api/{self.category.slug}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Category 4')
@@ -1,4 +1,6 @@
 from rest_framework import viewsets, permissions
+from ecommerce_api.conditional import ConditionalDetailMixin, ConditionalGetMixin
+from ecommerce_api.mixins import CachedResponseMixin, QueryPlannerMixin
 from django.views.generic import (
     ListView,
     DetailView,
@@ -14,7 +16,9 @@ from .serializers import CategorySerializer
 from .forms import CategoryForm
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(
+    ConditionalGetMixin, CachedResponseMixin, QueryPlannerMixin, viewsets.ModelViewSet
+):
     """
     API ViewSet for managing categories.
 
@@ -23,6 +27,9 @@ class CategoryViewSet(viewsets.ModelViewSet):
     - Uses 'slug' instead of 'id' for URL lookups.
     - Read-only access for anonymous users.
     - Full access (create, update, delete) for authenticated users.
+    - Queries are trimmed to the serialized columns (QueryPlannerMixin).
+    - Reads are cached until a category changes (CachedResponseMixin).
+    - Reads carry ETag / Last-Modified validators (ConditionalGetMixin).
     """
 
     queryset = Category.objects.all().order_by("-created_at")
@@ -31,6 +38,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
         permissions.IsAuthenticatedOrReadOnly
     ]  # Only authenticated users can modify
     lookup_field = "slug"  # Example: /api/categories/tech/
+    cache_dependencies = (Category,)
 
 
 class CategoryListView(ListView):
@@ -46,13 +54,14 @@ class CategoryListView(ListView):
     context_object_name = "categories"
 
 
-class CategoryDetailView(DetailView):
+class CategoryDetailView(ConditionalDetailMixin, DetailView):
     """
     View to display details of a single category.
 
     - Uses template: categories/category_detail.html
     - Fetches the category by 'slug' from the URL.
     - Provides the context variable 'category'.
+    - Answers conditional requests with 304 while the category is unchanged.
     """
 
     model = Category
@@ -3,6 +3,10 @@ ASGI config for ecommerce_api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Besides HTTP, the application answers the ASGI lifespan protocol: the
+payment gateways open their connection pools when it starts and close
+them when it stops (see payments/gateways/http.py).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -13,4 +17,25 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_api.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from payments.gateways.http import close_connection_pools, open_connection_pools  # noqa: E402
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            open_connection_pools()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_connection_pools()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    else:
+        await django_application(scope, receive, send)
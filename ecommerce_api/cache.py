@@ -0,0 +1,68 @@
+"""
+Versioned caching helpers.
+
+Every model that feeds cached data has a generation counter in the cache.
+Cache keys embed the current generation of the models they depend on, so
+bumping a counter makes all older entries unreachable at once, without
+scanning or deleting keys. Stale entries simply age out of the cache.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def get_cache():
+    """
+    Returns the cache used for versioned data.
+    """
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def generation_key(model):
+    return f"generation:{model._meta.label_lower}"
+
+
+def _new_generation():
+    # Seeded from the clock rather than 1, so a counter that was evicted
+    # never comes back with a value older entries were stored under.
+    return time.time_ns()
+
+
+def get_generations(models):
+    """
+    Returns the current generation of each model, in order.
+    """
+    cache = get_cache()
+    keys = [generation_key(model) for model in models]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, _new_generation(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump_generation(model):
+    """
+    Invalidates every cached entry that depends on the given model.
+    """
+    cache = get_cache()
+    key = generation_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_generation(), timeout=None)
+
+
+def versioned_key(prefix, models, *parts):
+    """
+    Builds a cache key tied to the current generations of the given models.
+    """
+    generations = get_generations(models)
+    digest = hashlib.sha256(
+        "|".join(str(part) for part in (*generations, *parts)).encode()
+    ).hexdigest()
+    return f"{prefix}:{digest}"
@@ -0,0 +1,169 @@
+"""
+Conditional GET support (ETag / Last-Modified) driven by updated_at.
+
+Validators are computed with one aggregate query, `MAX(updated_at)` of
+every watched column plus a row count, before any object is loaded. When
+the client's If-None-Match / If-Modified-Since still match, a 304 is
+returned and the ORM load and the rendering are skipped entirely. The
+count catches deletions, which don't move any `updated_at` forward.
+
+Viewsets with `cache_dependencies` (see CachedResponseMixin) keep the
+validators in the cache under the same generations as their responses,
+so a read served from the cache, 304 or not, runs no query at all.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .cache import get_cache, versioned_key
+
+
+def compute_validators(queryset, fields, *parts):
+    """
+    Returns (etag, last_modified timestamp) for a queryset.
+
+    `fields` are the datetime columns (possibly across relations) whose
+    latest value changes whenever the rendered output changes. `parts`
+    are mixed into the ETag, e.g. the URL and the response format.
+    Returns (etag, None) when the queryset is empty.
+    """
+    aggregates = {f"max_{index}": Max(field) for index, field in enumerate(fields)}
+    values = queryset.order_by().aggregate(
+        conditional_count=Count("pk", distinct=True), **aggregates
+    )
+    latest = [values[f"max_{index}"] for index in range(len(fields))]
+    digest = hashlib.sha256(
+        "|".join(
+            str(part)
+            for part in (
+                *parts,
+                values["conditional_count"],
+                *(value.isoformat() if value else "" for value in latest),
+            )
+        ).encode()
+    ).hexdigest()
+    present = [value for value in latest if value is not None]
+    last_modified = int(max(present).timestamp()) if present else None
+    return f'W/"{digest[:32]}"', last_modified
+
+
+def set_validators(response, etag, last_modified):
+    if response.status_code == 200:
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag / Last-Modified validators to list() and retrieve().
+
+    `conditional_fields` lists the datetime columns the rendered output
+    depends on; include the `updated_at` of nested objects, e.g.
+    `category__updated_at`. Mix it in before CachedResponseMixin so a 304
+    skips the response cache as well; the validators are then cached
+    until one of the `cache_dependencies` changes.
+    """
+
+    conditional_fields = ("updated_at",)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_conditional_queryset()
+        return self.conditional_response(
+            super().list, queryset, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.get_conditional_queryset().filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        return self.conditional_response(
+            super().retrieve, queryset, request, *args, **kwargs
+        )
+
+    def get_conditional_queryset(self):
+        """
+        Returns the rows whose changes invalidate the response.
+        """
+        return self.filter_queryset(self.get_queryset())
+
+    def get_validators(self, queryset, request):
+        """
+        Returns (etag, last_modified) for the response, from the cache when
+        the viewset declares its `cache_dependencies`.
+        """
+        parts = (
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            request.user.pk,
+        )
+        dependencies = getattr(self, "cache_dependencies", ())
+        if not dependencies:
+            return compute_validators(queryset, self.conditional_fields, *parts)
+
+        cache = get_cache()
+        key = versioned_key("validators", dependencies, *parts)
+        validators = cache.get(key)
+        if validators is None:
+            validators = compute_validators(queryset, self.conditional_fields, *parts)
+            cache.set(key, validators, settings.RESPONSE_CACHE_TIMEOUT)
+        return validators
+
+    def conditional_response(self, handler, queryset, request, *args, **kwargs):
+        """
+        Answers with a 304 when the client's copy is current, otherwise
+        runs the handler and adds the validators to its response.
+        """
+        etag, last_modified = self.get_validators(queryset, request)
+        if last_modified is None and self.action == "retrieve":
+            # No such object: let the handler return the 404.
+            return handler(request, *args, **kwargs)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+        return set_validators(handler(request, *args, **kwargs), etag, last_modified)
+
+
+class ConditionalDetailMixin:
+    """
+    Adds ETag / Last-Modified validators to a Django DetailView.
+
+    The page also depends on who is logged in (navigation, forms), so the
+    user is part of the ETag.
+    """
+
+    conditional_fields = ("updated_at",)
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        pk = self.kwargs.get(self.pk_url_kwarg)
+        slug = self.kwargs.get(self.slug_url_kwarg)
+        if pk is not None:
+            queryset = queryset.filter(pk=pk)
+        if slug is not None and (pk is None or self.query_pk_and_slug):
+            queryset = queryset.filter(**{self.get_slug_field(): slug})
+
+        etag, last_modified = compute_validators(
+            queryset,
+            self.conditional_fields,
+            request.get_full_path(),
+            request.user.pk,
+        )
+        if last_modified is None:
+            return super().get(request, *args, **kwargs)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+        return set_validators(
+            super().get(request, *args, **kwargs), etag, last_modified
+        )
@@ -0,0 +1,15 @@
+"""
+Date helpers shared by the apps.
+"""
+
+import datetime
+
+from django.utils import timezone
+
+
+def start_of_day(date):
+    """
+    Returns the aware datetime at which a date starts in the current time
+    zone, e.g. to filter a `created_at` column by inclusive dates.
+    """
+    return timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
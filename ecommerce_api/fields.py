@@ -0,0 +1,36 @@
+"""
+Serializer fields shared by the API apps.
+"""
+
+from django.conf import settings
+from rest_framework import serializers
+
+from .images import ready_field, variant_url
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Renders the URL of every resized variant of an image field.
+
+    The output maps each variant name in settings.IMAGE_VARIANTS to an
+    absolute URL, or is null when no image was uploaded.
+    """
+
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        # Columns read from the instance, for the API query planner.
+        self.source_fields = (image_field, ready_field(image_field))
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        image = getattr(instance, self.image_field)
+        if not image:
+            return None
+        request = self.context.get("request")
+        urls = {}
+        for variant in settings.IMAGE_VARIANTS:
+            url = variant_url(image, variant)
+            urls[variant] = request.build_absolute_uri(url) if request else url
+        return urls
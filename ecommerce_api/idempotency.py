@@ -0,0 +1,287 @@
+"""
+Idempotency-Key support for endpoints that create things.
+
+A client that times out on a POST can retry it with the same
+`Idempotency-Key` header. The first request claims the key in a shared
+store and runs normally; its response is then stored under the key, and
+every retry gets that stored response back without running the view
+again, so no order or payment is created twice.
+
+The store is a dedicated Django cache (settings.IDEMPOTENCY_CACHE_ALIAS,
+a database cache by default, so that all worker processes share it);
+keys expire after settings.IDEMPOTENCY_KEY_TTL seconds and the cache
+culls old rows on its own. Claiming uses cache.add(), which only one of
+several concurrent requests can win: the others wait for the winner's
+response instead of doing the work a second time.
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this idempotency key is still in progress."
+    default_code = "idempotency_conflict"
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This idempotency key was already used for a different request."
+    default_code = "idempotency_key_reused"
+
+
+def get_store():
+    """
+    Returns the cache holding idempotency keys.
+    """
+    return caches[settings.IDEMPOTENCY_CACHE_ALIAS]
+
+
+def get_idempotency_key(request):
+    """
+    Returns the client's Idempotency-Key, or None if it sent none.
+    """
+    key = request.headers.get(HEADER)
+    if key is None:
+        return None
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise ValidationError(
+            {HEADER: f"Must be 1 to {MAX_KEY_LENGTH} characters long."}
+        )
+    return key
+
+
+def _canonical(data):
+    if hasattr(data, "lists"):  # QueryDict
+        return sorted(data.lists())
+    return data
+
+
+def request_fingerprint(request, data):
+    """
+    Hashes what makes two requests "the same": method, path and payload.
+    """
+    payload = json.dumps(_canonical(data), sort_keys=True, default=str)
+    return hashlib.sha256(
+        f"{request.method}|{request.path}|{payload}".encode()
+    ).hexdigest()
+
+
+def store_key(user, key):
+    # Keys are scoped per user, so clients can't collide with each other.
+    digest = hashlib.sha256(f"{user.pk}|{key}".encode()).hexdigest()
+    return f"idempotency:{digest}"
+
+
+def run_idempotent(key, fingerprint, handler, freeze, thaw):
+    """
+    Runs `handler` once per key and replays its response afterwards.
+
+    `freeze` turns a response into something the cache can store and
+    `thaw` rebuilds a response from it. Server errors (and exceptions)
+    release the key, so the client can retry them. Raises
+    IdempotencyKeyReused when the key was used for a different request,
+    and IdempotencyConflict when the first request is still running after
+    settings.IDEMPOTENCY_WAIT_SECONDS.
+    """
+    store = get_store()
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while not store.add(
+        key,
+        {"fingerprint": fingerprint},
+        settings.IDEMPOTENCY_LOCK_TIMEOUT,
+    ):
+        record = store.get(key)
+        if record is None:
+            # Released or expired in between: try to claim it again.
+            continue
+        response = _replay(record, fingerprint, thaw, deadline)
+        if response is not None:
+            return response
+        time.sleep(0.05)
+
+    try:
+        response = handler()
+    except BaseException:
+        store.delete(key)
+        raise
+    if response.status_code >= 500:
+        store.delete(key)
+    else:
+        store.set(
+            key, _stored(fingerprint, response, freeze), settings.IDEMPOTENCY_KEY_TTL
+        )
+    return response
+
+
+async def arun_idempotent(key, fingerprint, handler, freeze, thaw):
+    """
+    run_idempotent() for async views: `handler` returns a coroutine, and
+    waiting for a concurrent duplicate doesn't block the event loop.
+    """
+    store = get_store()
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while not await store.aadd(
+        key,
+        {"fingerprint": fingerprint},
+        settings.IDEMPOTENCY_LOCK_TIMEOUT,
+    ):
+        record = await store.aget(key)
+        if record is None:
+            continue
+        response = _replay(record, fingerprint, thaw, deadline)
+        if response is not None:
+            return response
+        await asyncio.sleep(0.05)
+
+    try:
+        response = await handler()
+    except BaseException:
+        await store.adelete(key)
+        raise
+    if response.status_code >= 500:
+        await store.adelete(key)
+    else:
+        await store.aset(
+            key, _stored(fingerprint, response, freeze), settings.IDEMPOTENCY_KEY_TTL
+        )
+    return response
+
+
+def _replay(record, fingerprint, thaw, deadline):
+    """
+    Returns the stored response of a claimed key, or None if the request
+    holding it is still running.
+    """
+    if record["fingerprint"] != fingerprint:
+        raise IdempotencyKeyReused()
+    if "response" in record:
+        response = thaw(record["response"])
+        response[REPLAYED_HEADER] = "true"
+        return response
+    if time.monotonic() >= deadline:
+        raise IdempotencyConflict()
+    return None
+
+
+def _stored(fingerprint, response, freeze):
+    return {"fingerprint": fingerprint, "response": freeze(response)}
+
+
+def _stored_headers(response, names):
+    return {name: response[name] for name in names if name in response}
+
+
+class IdempotentCreateMixin:
+    """
+    Adds Idempotency-Key support to a viewset's create().
+
+    Requests without the header are handled as before. The stored
+    response is the serialized data, so a replay is rendered again in the
+    format the retry asks for.
+    """
+
+    def create(self, request, *args, **kwargs):
+        handler = super().create
+        key = get_idempotency_key(request)
+        if key is None or not request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+
+        def freeze(response):
+            return {
+                "status": response.status_code,
+                "data": response.data,
+                "headers": _stored_headers(response, ["Location"]),
+            }
+
+        def thaw(frozen):
+            return Response(
+                frozen["data"], status=frozen["status"], headers=frozen["headers"]
+            )
+
+        return run_idempotent(
+            store_key(request.user, key),
+            request_fingerprint(request, request.data),
+            lambda: handler(request, *args, **kwargs),
+            freeze,
+            thaw,
+        )
+
+
+def idempotent(view):
+    """
+    Adds Idempotency-Key support to the POST requests of a Django view.
+
+    Apply it below @login_required: keys are scoped to request.user.
+    Works for sync and async views.
+    """
+
+    def freeze(response):
+        return {
+            "status": response.status_code,
+            "content": response.content,
+            "headers": _stored_headers(response, ["Location", "Content-Type"]),
+        }
+
+    def thaw(frozen):
+        return HttpResponse(
+            frozen["content"], status=frozen["status"], headers=frozen["headers"]
+        )
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != "POST":
+            return view(request, *args, **kwargs)
+        try:
+            key = get_idempotency_key(request)
+            if key is None:
+                return view(request, *args, **kwargs)
+            return run_idempotent(
+                store_key(request.user, key),
+                request_fingerprint(request, request.POST),
+                lambda: view(request, *args, **kwargs),
+                freeze,
+                thaw,
+            )
+        except APIException as exc:
+            return JsonResponse({"detail": exc.detail}, status=exc.status_code)
+
+    if iscoroutinefunction(view):
+
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if request.method != "POST":
+                return await view(request, *args, **kwargs)
+            try:
+                key = get_idempotency_key(request)
+                if key is None:
+                    return await view(request, *args, **kwargs)
+                return await arun_idempotent(
+                    store_key(await request.auser(), key),
+                    request_fingerprint(request, request.POST),
+                    lambda: view(request, *args, **kwargs),
+                    freeze,
+                    thaw,
+                )
+            except APIException as exc:
+                return JsonResponse({"detail": exc.detail}, status=exc.status_code)
+
+        return async_wrapper
+
+    return wrapper
@@ -0,0 +1,182 @@
+"""
+Resized WebP variants of uploaded images.
+
+Every image uploaded to a Product, Category or user profile gets one WebP
+file per entry of settings.IMAGE_VARIANTS, stored next to the original
+under a `variants/` folder. The resizing runs as a background job (see
+jobs/queue.py and products/tasks.py), queued with the upload, so it never
+holds up the request and doesn't run in the web process.
+
+Once the files are written, the job records the image they belong to and
+their names on the row, in the `<image field>_variants_ready` column.
+Rendering URLs reads that column instead of asking the storage whether
+each file exists (one HTTP call per URL on remote storages). Until its
+variants are recorded, an image's variant URLs fall back to the original.
+"""
+
+import logging
+from pathlib import Path, PurePosixPath
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from jobs.queue import enqueue, is_pending
+
+from .cache import bump_generation
+
+logger = logging.getLogger(__name__)
+
+GENERATE_VARIANTS_JOB = "images.generate_variants"
+
+
+def variant_name(name, variant):
+    """
+    Returns the storage name of one variant of an image.
+
+    Example: `products/mouse.png` -> `products/variants/mouse.png_thumbnail.webp`
+
+    The original's extension is kept, so `mouse.png` and `mouse.jpg` don't
+    share their variants.
+    """
+    path = PurePosixPath(name)
+    return str(path.parent / "variants" / f"{path.name}_{variant}.webp")
+
+
+def ready_field(field_name):
+    """
+    Returns the name of the column recording the variants of an image field.
+    """
+    return f"{field_name}_variants_ready"
+
+
+def has_variants(recorded, name, variants=None):
+    """
+    Tells whether a `_variants_ready` value covers the given variants (all
+    of settings.IMAGE_VARIANTS by default) of the image `name`.
+    """
+    if not recorded or recorded.get("name") != name:
+        return False
+    return set(variants or settings.IMAGE_VARIANTS) <= set(recorded.get("variants", ()))
+
+
+def render_variants(source, targets, quality):
+    """
+    Writes resized WebP copies of an image file.
+
+    `targets` is a list of (destination path, (max width, max height))
+    pairs. Only touches Pillow and the filesystem, so it can run in worker
+    processes.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        for destination, size in targets:
+            resized = image.copy()
+            resized.thumbnail(size, Image.Resampling.LANCZOS)
+            Path(destination).parent.mkdir(parents=True, exist_ok=True)
+            resized.save(destination, "WEBP", quality=quality, method=4)
+    return len(targets)
+
+
+def variant_job(fieldfile):
+    """
+    Returns the arguments of render_variants() for an image.
+
+    Returns None if the image is missing or isn't stored on the local
+    filesystem.
+    """
+    if not fieldfile:
+        return None
+    storage = fieldfile.storage
+    try:
+        source = storage.path(fieldfile.name)
+        targets = [
+            (storage.path(variant_name(fieldfile.name, variant)), size)
+            for variant, size in settings.IMAGE_VARIANTS.items()
+        ]
+    except NotImplementedError:
+        logger.warning("Storage %r has no local paths, skipping variants.", storage)
+        return None
+    return source, targets, settings.IMAGE_VARIANT_QUALITY
+
+
+def record_variants(model, pk, field_name, name):
+    """
+    Records on a row that the variants of its image `name` exist.
+
+    Rows whose image was replaced in the meantime are left alone. The row's
+    `updated_at` moves on and cached responses of the model are
+    invalidated, so clients stop being sent the original image.
+    """
+    changes = {
+        ready_field(field_name): {
+            "name": name,
+            "variants": list(settings.IMAGE_VARIANTS),
+        }
+    }
+    if any(field.name == "updated_at" for field in model._meta.concrete_fields):
+        changes["updated_at"] = timezone.now()
+    if model._default_manager.filter(pk=pk, **{field_name: name}).update(**changes):
+        transaction.on_commit(lambda: bump_generation(model))
+
+
+def generate_variants(model, pk, field_name, name):
+    """
+    Renders the variants of a row's image and records them.
+
+    Does nothing if the row is gone or has another image by now (that one
+    has a job of its own). Returns the number of variants written.
+    """
+    instance = model._default_manager.filter(pk=pk).only("pk", field_name).first()
+    if instance is None or getattr(instance, field_name).name != name:
+        return 0
+    job = variant_job(getattr(instance, field_name))
+    if job is None:
+        return 0
+    written = render_variants(*job)
+    record_variants(model, pk, field_name, name)
+    return written
+
+
+def schedule_variants(fieldfile):
+    """
+    Queues the generation of an image's variants, unless they are
+    recorded already (the row was saved without a new image) or a job for
+    this image is already pending (the row was saved again before the
+    workers got to it).
+
+    The job is queued in the save's transaction, so the workers only see
+    it once the upload is committed.
+    """
+    if not fieldfile:
+        return
+    instance = fieldfile.instance
+    field_name = fieldfile.field.name
+    if has_variants(getattr(instance, ready_field(field_name)), fieldfile.name):
+        return
+    payload = {
+        "model": instance._meta.label_lower,
+        "pk": instance.pk,
+        "field": field_name,
+        "image": fieldfile.name,
+    }
+    if is_pending(GENERATE_VARIANTS_JOB, **payload):
+        return
+    enqueue(GENERATE_VARIANTS_JOB, **payload)
+
+
+def variant_url(fieldfile, variant):
+    """
+    Returns the URL of an image variant, or of the original if the variant
+    hasn't been generated yet.
+    """
+    if not fieldfile:
+        return None
+    recorded = getattr(fieldfile.instance, ready_field(fieldfile.field.name), None)
+    if has_variants(recorded, fieldfile.name, [variant]):
+        return fieldfile.storage.url(variant_name(fieldfile.name, variant))
+    return fieldfile.url
@@ -0,0 +1,245 @@
+"""
+Mixins shared by the API viewsets.
+"""
+
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import pagination, permissions, serializers
+from rest_framework.response import Response
+
+from .cache import get_cache, versioned_key
+
+
+class QueryPlan:
+    """
+    The select_related / prefetch_related / only() calls a serializer needs.
+
+    Built by walking the fields of a serializer instance. Each model level
+    of the tree either knows exactly which columns the serializer reads, or
+    (when a field reads something that is not a plain model field) loads
+    all of its columns.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.select_related = set()
+        self.prefetches = {}
+        self.columns = set()
+
+    def add_all_columns(self, model, prefix):
+        """
+        Marks every concrete column of a model level as needed.
+        """
+        for field in model._meta.concrete_fields:
+            self.columns.add(prefix + field.name)
+
+    def apply(self, queryset, restrict_columns=True):
+        """
+        Returns the queryset with the plan applied.
+        """
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetches:
+            queryset = queryset.prefetch_related(
+                *[
+                    Prefetch(
+                        path,
+                        queryset=plan.apply(
+                            plan.model._default_manager.all(), restrict_columns
+                        ),
+                    )
+                    for path, plan in self.prefetches.items()
+                ]
+            )
+        if restrict_columns and self.columns:
+            queryset = queryset.only(*sorted(self.columns))
+        return queryset
+
+
+def _str_related(model, prefix, plan):
+    """
+    Selects the relations a model's __str__ follows.
+
+    Models declare them in STR_RELATED_FIELDS so that StringRelatedField
+    does not trigger one extra query per row, and may list the columns
+    __str__ reads in STR_FIELDS so that only those are loaded.
+    """
+    for name in getattr(model, "STR_RELATED_FIELDS", ()):
+        plan.select_related.add(prefix + name)
+    plan.columns.update(prefix + name for name in getattr(model, "STR_FIELDS", ()))
+
+
+def _plan_fields(serializer, model, prefix, plan):
+    """
+    Adds the needs of every readable field of a serializer to the plan.
+    """
+    known_columns = True
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+
+        if field.source == "*":
+            source_fields = getattr(field, "source_fields", None)
+            if source_fields is None:
+                known_columns = False
+            else:
+                plan.columns.update(prefix + name for name in source_fields)
+            continue
+
+        attr = field.source_attrs[0]
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            # A property or method: we can't tell which columns it reads.
+            known_columns = False
+            continue
+
+        if not model_field.is_relation:
+            plan.columns.add(prefix + attr)
+            if len(field.source_attrs) > 1:
+                known_columns = False
+            continue
+
+        related_model = model_field.related_model
+        path = prefix + attr
+
+        if model_field.many_to_one or model_field.one_to_one:
+            if model_field.concrete:
+                plan.columns.add(path)
+            if isinstance(field, serializers.BaseSerializer):
+                plan.select_related.add(path)
+                _plan_fields(field, related_model, path + "__", plan)
+            elif isinstance(field, serializers.RelatedField) and (
+                field.use_pk_only_optimization() and model_field.concrete
+            ):
+                # Only the foreign key column is read.
+                continue
+            else:
+                plan.select_related.add(path)
+                _str_related(related_model, path + "__", plan)
+            continue
+
+        # Reverse foreign keys and many-to-many relations are prefetched.
+        child_plan = QueryPlan(related_model)
+        if isinstance(field, serializers.ListSerializer):
+            _plan_fields(field.child, related_model, "", child_plan)
+        elif isinstance(field, serializers.ManyRelatedField):
+            child_relation = field.child_relation
+            if not child_relation.use_pk_only_optimization():
+                _str_related(related_model, "", child_plan)
+            child_plan.add_all_columns(related_model, "")
+        else:
+            child_plan.add_all_columns(related_model, "")
+        if model_field.one_to_many:
+            # The prefetch matches rows back to their parent through this key.
+            child_plan.columns.add(model_field.field.name)
+        plan.prefetches[path] = child_plan
+        if len(field.source_attrs) > 1:
+            known_columns = False
+
+    if not known_columns:
+        plan.add_all_columns(model, prefix)
+
+
+def build_query_plan(serializer):
+    """
+    Returns the QueryPlan for a ModelSerializer instance.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    model = serializer.Meta.model
+    plan = QueryPlan(model)
+    _plan_fields(serializer, model, "", plan)
+    return plan
+
+
+class QueryPlannerMixin:
+    """
+    Optimizes a viewset's queryset for the serializer that renders it.
+
+    The serializer tree is inspected on every request and the matching
+    select_related(), prefetch_related() and only() calls are added, so
+    nested serializers and StringRelatedFields don't cause N+1 queries.
+    Column pruning is only done for safe (read) requests, so a deferred
+    field can never be skipped by a later save().
+
+    The plan is applied in filter_queryset(), which both list() and
+    get_object() go through, so viewsets can keep overriding get_queryset().
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        plan = build_query_plan(self.get_serializer())
+        if plan.columns:
+            plan.columns.update(self.get_pagination_columns())
+        return plan.apply(
+            queryset, restrict_columns=self.request.method in permissions.SAFE_METHODS
+        )
+
+    def get_pagination_columns(self):
+        """
+        Returns the columns a cursor paginator reads to build its links.
+
+        They must be loaded even when the serializer doesn't render them,
+        otherwise each page boundary costs a deferred-field query.
+        """
+        paginator = self.paginator
+        cursor_class = getattr(paginator, "cursor_pagination_class", None)
+        if cursor_class is None:
+            if not isinstance(paginator, pagination.CursorPagination):
+                return []
+            cursor_class = type(paginator)
+        ordering = cursor_class.ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        return [name.lstrip("-") for name in ordering]
+
+
+class CachedResponseMixin:
+    """
+    Caches the serialized output of list() and retrieve().
+
+    Cache keys are built from the action, the host, the path, the sorted
+    query parameters, the authentication class and the generation of every
+    model in `cache_dependencies`. A save or delete of one of those models
+    bumps its generation (see the app signal handlers), which invalidates
+    all cached responses depending on it in O(1).
+    """
+
+    cache_dependencies = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_response_cache_key(self, request):
+        authenticator = request.successful_authenticator
+        return versioned_key(
+            "response",
+            self.cache_dependencies,
+            self.action,
+            request.get_host(),
+            request.path,
+            urlencode(sorted(request.query_params.lists()), doseq=True),
+            type(authenticator).__name__ if authenticator else "anonymous",
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """
+        Serves a response from the cache, or renders and stores it.
+        """
+        cache = get_cache()
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
@@ -0,0 +1,74 @@
+"""
+Pagination classes shared by the API viewsets.
+"""
+
+from rest_framework import pagination
+
+
+class KeysetPagination(pagination.CursorPagination):
+    """
+    Cursor (keyset) pagination over the newest-first ordering.
+
+    Each page is fetched with a `WHERE created_at < <cursor>` condition
+    instead of an OFFSET, and no COUNT(*) is run, so deep pages cost the
+    same as the first one. The id tie-breaker keeps the order stable for
+    rows created in the same instant.
+    """
+
+    ordering = ("-created_at", "-id")
+
+
+class OptInCursorPagination(pagination.PageNumberPagination):
+    """
+    Page-number pagination that switches to keyset pagination on request.
+
+    Existing clients keep getting `?page=N` responses with a `count`.
+    Clients that send `?pagination=cursor` (or follow a `next` link that
+    carries a `cursor`) are served by KeysetPagination instead.
+    """
+
+    mode_query_param = "pagination"
+    cursor_pagination_class = KeysetPagination
+
+    def use_cursor(self, request):
+        """
+        Returns True if the request asked for cursor pagination.
+        """
+        return (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or self.cursor_pagination_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            page = self.cursor_paginator.paginate_queryset(queryset, request, view)
+            self.display_page_controls = self.cursor_paginator.display_page_controls
+            return page
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append(
+            {
+                "name": self.mode_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to 'cursor' to use keyset pagination.",
+                "schema": {"type": "string", "enum": ["cursor"]},
+            }
+        )
+        return parameters + self.cursor_pagination_class().get_schema_operation_parameters(
+            view
+        )
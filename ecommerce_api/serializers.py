@@ -0,0 +1,236 @@
+"""
+Serializer mixins shared by the API apps.
+"""
+
+import datetime
+import decimal
+import operator
+
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
+from rest_framework import ISO_8601, permissions, serializers
+from rest_framework.fields import (
+    CharField,
+    DateTimeField,
+    DecimalField,
+    IntegerField,
+    ReadOnlyField,
+    SkipField,
+)
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import api_settings
+
+
+class SparseFieldsetsMixin:
+    """
+    Lets clients choose the fields of a read response.
+
+    `?fields=id,name,price` keeps only the listed fields and
+    `?omit=description` drops the listed ones; both take comma-separated
+    top-level field names and unknown names are ignored. Only the
+    serializer built by the view (the one receiving the request in its
+    context) is pruned, and only for safe requests, so writes always see
+    the full set of fields.
+
+    Because QueryPlannerMixin plans the queryset from the view's
+    serializer, pruned fields are also left out of select_related() and
+    only(), and the database reads just the columns the response needs.
+    """
+
+    fields_param = "fields"
+    omit_param = "omit"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = kwargs.get("context", {}).get("request")
+        if request is None or request.method not in permissions.SAFE_METHODS:
+            return
+
+        params = getattr(request, "query_params", request.GET)
+        fields = self._split_param(params.get(self.fields_param))
+        omit = self._split_param(params.get(self.omit_param))
+        if not fields and not omit:
+            return
+
+        for name in list(self.fields):
+            if (fields and name not in fields) or name in omit:
+                self.fields.pop(name)
+
+    @staticmethod
+    def _split_param(value):
+        if not value:
+            return set()
+        return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def _decimal_converter(field):
+    """
+    Returns a fast to_representation() for a DecimalField.
+
+    Values read from a DecimalField column already have the field's number
+    of decimal places, so they can be formatted without quantizing again.
+    Anything else goes through the field.
+    """
+    coerce_to_string = getattr(
+        field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING
+    )
+    if not coerce_to_string or field.localize or field.normalize_output:
+        return field.to_representation
+    exponent = -field.decimal_places if field.decimal_places is not None else None
+    max_digits = field.max_digits
+    slow = field.to_representation
+
+    def convert(value):
+        if type(value) is decimal.Decimal:
+            _, digits, value_exponent = value.as_tuple()
+            if value_exponent == exponent and (
+                max_digits is None or len(digits) <= max_digits
+            ):
+                return f"{value:f}"
+        return slow(value)
+
+    return convert
+
+
+def _datetime_converter(field):
+    """
+    Returns a fast to_representation() for an ISO 8601 DateTimeField.
+
+    The output timezone is looked up once per serializer instead of once
+    per value. Naive values go through the field.
+    """
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    field_timezone = (
+        field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    )
+    if (
+        output_format is None
+        or output_format.lower() != ISO_8601
+        or field_timezone is None
+    ):
+        return field.to_representation
+    slow = field.to_representation
+
+    def convert(value):
+        if not isinstance(value, datetime.datetime) or value.tzinfo is None:
+            return slow(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    return convert
+
+
+# Converters of serializer fields whose to_representation() is a plain
+# type cast (None means the attribute is returned as is).
+SIMPLE_CONVERTERS = {IntegerField: int, CharField: str, ReadOnlyField: None}
+
+
+def _converter(field):
+    """
+    Returns the function turning a non-None attribute into its output.
+    """
+    field_class = type(field)
+    if field_class in SIMPLE_CONVERTERS:
+        return SIMPLE_CONVERTERS[field_class]
+    if field_class is DecimalField:
+        return _decimal_converter(field)
+    if field_class is DateTimeField:
+        return _datetime_converter(field)
+    return field.to_representation
+
+
+def _getter(field, model):
+    """
+    Returns a fast attribute getter for a field, or None.
+
+    Only plain model columns and forward relations rendered by a nested
+    serializer are read directly. Everything else goes through
+    field.get_attribute(), which handles defaults, callables, SkipField and
+    the primary-key-only optimization of related fields.
+    """
+    if field.source == "*" or len(field.source_attrs) != 1 or model is None:
+        return None
+    try:
+        model_field = model._meta.get_field(field.source_attrs[0])
+    except FieldDoesNotExist:
+        return None
+    if not model_field.concrete:
+        return None
+    if not model_field.is_relation:
+        return operator.attrgetter(model_field.attname)
+    if not isinstance(field, serializers.Serializer):
+        return None
+
+    name = model_field.name
+
+    def get_related(instance):
+        try:
+            return getattr(instance, name)
+        except ObjectDoesNotExist:
+            return None
+
+    return get_related
+
+
+class CompiledRepresentationMixin:
+    """
+    Renders model instances through a precompiled per-field plan.
+
+    DRF's to_representation() resolves every field's source, converter
+    and None handling again for every row, which dominates the cost of
+    large list responses. This mixin works that out once per serializer
+    instance (a ListSerializer shares one child across all rows) and then
+    only runs a getter and a converter per field. The output is identical
+    to the stock serializer's; fields the plan doesn't understand fall
+    back to the regular DRF calls.
+
+    Setting `compiled_representation = False` restores the stock code
+    path (the benchmark_serializers command uses it for comparison).
+    """
+
+    compiled_representation = True
+
+    def _compile_representation(self):
+        model = getattr(getattr(self, "Meta", None), "model", None)
+        plan = []
+        for field in self.fields.values():
+            if field.write_only:
+                continue
+            getter = _getter(field, model)
+            converter = _converter(field) if getter is not None else None
+            plan.append((field.field_name, field, getter, converter))
+        return plan
+
+    def to_representation(self, instance):
+        if not self.compiled_representation:
+            return super().to_representation(instance)
+        try:
+            plan = self._representation_plan
+        except AttributeError:
+            plan = self._representation_plan = self._compile_representation()
+
+        ret = {}
+        for name, field, getter, converter in plan:
+            if getter is not None:
+                attribute = getter(instance)
+                if attribute is None:
+                    ret[name] = None
+                elif converter is None:
+                    ret[name] = attribute
+                else:
+                    ret[name] = converter(attribute)
+                continue
+
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            check_for_none = (
+                attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            )
+            if check_for_none is None:
+                ret[name] = None
+            else:
+                ret[name] = field.to_representation(attribute)
+        return ret
@@ -34,7 +34,9 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     # Apps
+    "analytics",
     "categories",
+    "jobs",
     "orders",
     "payments",
     "products",
@@ -71,6 +73,9 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
             ],
+            "libraries": {
+                "images": "ecommerce_api.templatetags.images",
+            },
         },
     },
 ]
@@ -140,6 +145,126 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Largest number of rows accepted by POST /products/api/bulk-update/.
+PRODUCT_BULK_UPDATE_LIMIT = 5000
+
+# Largest number of orders accepted by POST /orders/api/bulk-status/.
+ORDER_BULK_STATUS_LIMIT = 5000
+
+# Rows fetched per query by the streaming export endpoints.
+EXPORT_CHUNK_SIZE = 2000
+
+# How long an order in "Pending Payment" holds its stock before
+# `manage.py release_expired_holds` cancels it and returns the units.
+STOCK_HOLD_TTL_SECONDS = 15 * 60
+
+# Background jobs (see jobs/queue.py): worker processes started by
+# `manage.py run_workers`, how long an idle worker sleeps (seconds), how
+# often a failing job is tried, the first retry delay (doubled on every
+# attempt, up to the maximum), after how long a claimed job is considered
+# abandoned by a crashed worker, and how long finished jobs are kept.
+JOB_WORKERS = 2
+JOB_POLL_INTERVAL = 1.0
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF = 5
+JOB_RETRY_BACKOFF_MAX = 60 * 60
+JOB_LOCK_TIMEOUT = 5 * 60
+JOB_RETENTION_SECONDS = 7 * 24 * 60 * 60
+
+# Delivered and cancelled orders unchanged for this many days are moved to
+# the archive tables by `manage.py archive_orders`.
+ORDER_ARCHIVE_AFTER_DAYS = 365
+
+# -------------------------------
+# Image variants
+# -------------------------------
+# Resized WebP copies generated for every uploaded image, as
+# name: (max width, max height). See ecommerce_api/images.py.
+IMAGE_VARIANTS = {
+    "thumbnail": (320, 320),
+    "medium": (960, 960),
+}
+IMAGE_VARIANT_QUALITY = 80
+# Processes resizing images in `manage.py generate_image_variants`. Uploads
+# are resized one by one by the job workers (`manage.py run_workers`).
+IMAGE_VARIANT_WORKERS = 2
+
+# -------------------------------
+# Caching
+# -------------------------------
+# Cached catalog responses and their generation counters (see
+# ecommerce_api/cache.py) must be shared by every worker process: a write
+# handled by one worker has to invalidate what the others cached. The
+# file-based cache is shared by the workers of one machine; when running
+# on several machines, point "default" at Redis or Memcached. Don't use
+# LocMemCache with more than one worker: each process would keep serving
+# its own stale copies after writes made elsewhere.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    # Shared by all processes; create the table with `manage.py createcachetable`.
+    "idempotency": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "idempotency_keys",
+        "OPTIONS": {"MAX_ENTRIES": 100000},
+    },
+}
+
+# Cache alias and lifetime (seconds) of cached catalog API responses.
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Idempotency-Key support for order and payment creation: the cache alias
+# holding the keys, how long a key replays its response (seconds), how
+# long a request may hold a key while running, and how long a concurrent
+# duplicate waits for it before getting a 409.
+IDEMPOTENCY_CACHE_ALIAS = "idempotency"
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+IDEMPOTENCY_WAIT_SECONDS = 10
+
+# -------------------------------
+# Payments
+# -------------------------------
+# The gateway charging each payment method (see payments/gateways). All
+# point at the local stub (`manage.py run_stub_gateway`) by default; set
+# the provider's BASE_URL, API_KEY and WEBHOOK_SECRET in production.
+# TIMEOUT is the total time (seconds) a call may take; after
+# FAILURE_THRESHOLD failures in a row a gateway's circuit opens for
+# RESET_TIMEOUT seconds. Webhook signatures older than WEBHOOK_TOLERANCE
+# seconds are refused.
+PAYMENT_CURRENCY = "USD"
+PAYMENT_GATEWAY_STUB_URL = "http://127.0.0.1:8765"
+PAYMENT_GATEWAY_STUB_SECRET = "stub-webhook-secret"
+PAYMENT_GATEWAYS = {
+    method: {
+        "BACKEND": "payments.gateways.http.HttpGateway",
+        "BASE_URL": f"{PAYMENT_GATEWAY_STUB_URL}/{slug}",
+        "API_KEY": "",
+        "WEBHOOK_SECRET": PAYMENT_GATEWAY_STUB_SECRET,
+        "WEBHOOK_TOLERANCE": 300,
+        "TIMEOUT": 10,
+        "CONNECT_TIMEOUT": 2,
+        "FAILURE_THRESHOLD": 5,
+        "RESET_TIMEOUT": 30,
+    }
+    for method, slug in (
+        ("Credit Card", "credit-card"),
+        ("PayPal", "paypal"),
+        ("Stripe", "stripe"),
+    )
+}
+
+# Webhook events (see payments/events.py): events applied per batch, how
+# long (seconds) an event waits for its payment to be recorded before it
+# is dropped, and the delay between two attempts to match it.
+PAYMENT_EVENT_BATCH_SIZE = 500
+PAYMENT_EVENT_MATCH_WINDOW = 60 * 60
+PAYMENT_EVENT_RETRY_DELAY = 60
+
 # -------------------------------
 # Default Primary Key
 # -------------------------------
@@ -0,0 +1,15 @@
+from django import template
+
+from ecommerce_api.images import variant_url
+
+register = template.Library()
+
+
+@register.filter
+def variant(image, name):
+    """
+    Returns the URL of a resized variant of an image.
+
+    Usage: `<img src="{{ product.image|variant:'thumbnail' }}">`
+    """
+    return variant_url(image, name) or ""
@@ -13,6 +13,7 @@ urlpatterns = [
     path("reviews/", include("reviews.urls")),
     path("payments/", include("payments.urls")),
     path("categories/", include("categories.urls")),
+    path("analytics/", include("analytics.urls")),
 ]
 
 if settings.DEBUG:
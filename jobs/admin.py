@@ -0,0 +1,23 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """
+    Admin view of the job queue, e.g. to inspect failed jobs.
+    """
+
+    list_display = ("id", "name", "status", "attempts", "run_at", "finished_at")
+    list_filter = ("status", "name")
+    search_fields = ("name",)
+    readonly_fields = ("created_at", "finished_at", "locked_by", "locked_at")
+    actions = ["retry"]
+
+    @admin.action(description="Retry selected jobs now")
+    def retry(self, request, queryset):
+        queryset.exclude(status="running").update(
+            status="queued", attempts=0, run_at=timezone.now(), finished_at=None
+        )
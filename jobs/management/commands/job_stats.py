@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from jobs.queue import queue_metrics
+
+
+class Command(BaseCommand):
+    """
+    Prints the state of the job queue: jobs per status, the due backlog,
+    the throughput over the last --window seconds and the lag of the
+    oldest due job.
+    """
+
+    help = "Show job queue metrics."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--window",
+            type=int,
+            default=60,
+            help="Seconds over which the throughput is measured.",
+        )
+
+    def handle(self, *args, **options):
+        for key, value in queue_metrics(window=options["window"]).items():
+            self.stdout.write(f"{key}: {value}")
@@ -0,0 +1,102 @@
+import os
+import signal
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.queue import claim_jobs, purge_finished, queue_metrics, run_job
+from jobs.worker import WorkerPool
+
+
+class Command(BaseCommand):
+    """
+    Runs background jobs with a pool of worker processes.
+
+    Every worker claims due jobs from the Jobs table on its own (see
+    jobs/queue.py), so several run_workers commands, on one or more
+    machines, can share the queue. The command logs queue metrics
+    (backlog, throughput and lag) every --metrics-interval seconds and
+    stops gracefully on SIGINT/SIGTERM, letting running jobs finish.
+    """
+
+    help = "Run background jobs with a pool of worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=settings.JOB_WORKERS,
+            help="Number of worker processes.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10,
+            help="Jobs claimed by a worker at a time.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.JOB_POLL_INTERVAL,
+            help="Seconds a worker waits when the queue is empty.",
+        )
+        parser.add_argument(
+            "--metrics-interval",
+            type=float,
+            default=60,
+            help="Seconds between two metrics log lines.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the due jobs in this process, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            self.drain(options["batch_size"])
+            return
+
+        pool = WorkerPool(
+            options["processes"], options["batch_size"], options["poll_interval"]
+        )
+        self.stdout.write(f"Started {len(pool.processes)} job workers.")
+
+        stopping = []
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stopping.append(True))
+        try:
+            while not stopping:
+                next_report = time.monotonic() + options["metrics_interval"]
+                while not stopping and time.monotonic() < next_report:
+                    time.sleep(0.5)
+                    if not stopping:
+                        for name in pool.restart_dead():
+                            self.stderr.write(f"{name} exited, restarted it.")
+                self.report(options["metrics_interval"])
+                purge_finished(settings.JOB_RETENTION_SECONDS)
+        finally:
+            pool.stop()
+        self.stdout.write("Job workers stopped.")
+
+    def report(self, window):
+        metrics = queue_metrics(window=int(max(window, 1)))
+        self.stdout.write(" ".join(f"{key}={value}" for key, value in metrics.items()))
+
+    def drain(self, batch_size):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        succeeded = failed = 0
+        while True:
+            jobs = claim_jobs(worker, batch_size)
+            if not jobs:
+                break
+            for job in jobs:
+                if run_job(job):
+                    succeeded += 1
+                else:
+                    failed += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Ran {succeeded} jobs ({failed} failed).")
+        )
@@ -0,0 +1,64 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    A unit of background work, stored in the database.
+
+    Jobs are inserted in the transaction of the change that needs them
+    (outbox style), so a job exists if and only if that change was
+    committed. `manage.py run_workers` claims and runs them (see
+    jobs/queue.py).
+
+    Attributes:
+        name (CharField): The registered handler to run.
+        payload (JSONField): The keyword arguments of the handler.
+        status (CharField): queued, running, done or failed.
+        attempts (IntegerField): How many times the job was started.
+        run_at (DateTimeField): When the job may run next (retries are
+            scheduled with a growing delay).
+        locked_by (CharField): The worker running the job.
+        locked_at (DateTimeField): When that worker claimed it.
+        last_error (TextField): The traceback of the last failure.
+        created_at (DateTimeField): When the job was enqueued.
+        finished_at (DateTimeField): When the job succeeded or gave up.
+    """
+
+    STATUS_CHOICES = (
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    )
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    attempts = models.IntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        """
+        Meta options for the Job model.
+
+        - db_table: Sets a custom table name in the database.
+        - indexes: Support claiming the next due jobs, finding the jobs of
+          crashed workers and the throughput metrics.
+        """
+
+        db_table = "Jobs"
+        indexes = [
+            models.Index(fields=["status", "run_at"]),
+            models.Index(fields=["status", "locked_at"]),
+            models.Index(fields=["status", "finished_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
@@ -0,0 +1,195 @@
+"""
+A small job queue on top of the database.
+
+Side effects that don't need to happen inside the request (rollups,
+notifications, calls to other services) are enqueued as Job rows in the
+request's own transaction and run later by `manage.py run_workers`:
+
+    @task("analytics.apply_rollup_deltas")
+    def apply_rollup_deltas(rows):
+        ...
+
+    enqueue("analytics.apply_rollup_deltas", rows=rows)
+
+Handlers live in a `tasks.py` module of their app and take the payload as
+keyword arguments; the payload must be JSON-serializable.
+
+Workers claim due jobs with `SELECT ... FOR UPDATE SKIP LOCKED`, so any
+number of them can poll the table without handing out a job twice. A
+handler runs in one transaction with the update marking its job done, so
+a job's database writes are applied exactly once. Failed jobs are retried
+with exponential backoff, up to settings.JOB_MAX_ATTEMPTS times; jobs of a
+worker that died are picked up again after settings.JOB_LOCK_TIMEOUT.
+"""
+
+import datetime
+import logging
+import random
+import traceback
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+
+
+def task(name):
+    """
+    Registers a function as the handler of the jobs called `name`.
+    """
+
+    def register(func):
+        REGISTRY[name] = func
+        return func
+
+    return register
+
+
+def enqueue(name, run_at=None, **payload):
+    """
+    Adds a job to the queue.
+
+    Call it inside the transaction of the change that needs the job: the
+    job is only visible to the workers once that transaction commits.
+    """
+    if name not in REGISTRY:
+        raise KeyError(f"No job handler registered for {name!r}.")
+    return Job.objects.create(
+        name=name, payload=payload, run_at=run_at or timezone.now()
+    )
+
+
+def enqueue_once(name, run_at=None):
+    """
+    Enqueues a job without payload, unless one will run by `run_at` anyway.
+
+    For jobs that process whatever is pending when they run: a burst of
+    changes then needs one job, not one per change.
+    """
+    run_at = run_at or timezone.now()
+    if Job.objects.filter(name=name, status="queued", run_at__lte=run_at).exists():
+        return None
+    return enqueue(name, run_at=run_at)
+
+
+def is_pending(name, **payload):
+    """
+    Tells whether a job with this name and payload is queued (retries
+    included) or running.
+    """
+    lookups = {f"payload__{key}": value for key, value in payload.items()}
+    return Job.objects.filter(
+        name=name, status__in=("queued", "running"), **lookups
+    ).exists()
+
+
+def retry_delay(attempts):
+    """
+    Seconds to wait before the next attempt: exponential, capped, with
+    jitter so that jobs failing together don't retry together.
+    """
+    delay = min(
+        settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1), settings.JOB_RETRY_BACKOFF_MAX
+    )
+    return delay * random.uniform(0.5, 1.0)
+
+
+def claim_jobs(worker, limit):
+    """
+    Marks up to `limit` due jobs as running for `worker` and returns them.
+    """
+    now = timezone.now()
+    stale = now - datetime.timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    with transaction.atomic():
+        due = Job.objects.filter(
+            Q(status="queued", run_at__lte=now)
+            | Q(status="running", locked_at__lt=stale)
+        ).order_by("run_at", "id")
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        else:
+            due = due.select_for_update()
+        ids = list(due.values_list("id", flat=True)[:limit])
+        if not ids:
+            return []
+        Job.objects.filter(pk__in=ids).update(
+            status="running",
+            locked_by=worker,
+            locked_at=now,
+            attempts=F("attempts") + 1,
+        )
+    return list(Job.objects.filter(pk__in=ids).order_by("run_at", "id"))
+
+
+def run_job(job):
+    """
+    Runs a claimed job and records the outcome. Returns True on success.
+    """
+    handler = REGISTRY.get(job.name)
+    try:
+        if handler is None:
+            raise KeyError(f"No job handler registered for {job.name!r}.")
+        with transaction.atomic():
+            handler(**job.payload)
+            finished = Job.objects.filter(
+                pk=job.pk, status="running", locked_by=job.locked_by
+            ).update(status="done", finished_at=timezone.now(), last_error="")
+            if not finished:
+                # The lock timed out and another worker took the job over:
+                # roll back and let that worker's run count.
+                transaction.set_rollback(True)
+        return bool(finished)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Job %s #%s failed (attempt %s)", job.name, job.pk, job.attempts)
+        now = timezone.now()
+        if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+            changes = {"status": "failed", "finished_at": now}
+        else:
+            changes = {
+                "status": "queued",
+                "run_at": now + datetime.timedelta(seconds=retry_delay(job.attempts)),
+            }
+        Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+            last_error=error, locked_by="", locked_at=None, **changes
+        )
+        return False
+
+
+def purge_finished(older_than):
+    """
+    Deletes done jobs finished more than `older_than` seconds ago.
+    Failed jobs are kept for inspection.
+    """
+    cutoff = timezone.now() - datetime.timedelta(seconds=older_than)
+    deleted, _ = Job.objects.filter(status="done", finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def queue_metrics(window=60):
+    """
+    Returns the state of the queue: jobs per status, how many are due,
+    how many finished in the last `window` seconds (throughput) and the
+    lag, i.e. how long the oldest due job has been waiting, in seconds.
+    """
+    now = timezone.now()
+    counts = dict.fromkeys(("queued", "running", "done", "failed"), 0)
+    for row in Job.objects.order_by().values("status").annotate(n=Count("id")):
+        counts[row["status"]] = row["n"]
+    due = Job.objects.filter(status="queued", run_at__lte=now)
+    oldest = due.aggregate(oldest=Min("run_at"))["oldest"]
+    finished = Job.objects.filter(
+        status="done", finished_at__gte=now - datetime.timedelta(seconds=window)
+    ).count()
+    return {
+        **counts,
+        "due": due.count(),
+        "throughput_per_second": round(finished / window, 2),
+        "lag_seconds": round((now - oldest).total_seconds(), 1) if oldest else 0.0,
+    }
@@ -0,0 +1,106 @@
+import datetime
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from categories.models import Category
+
+from .models import Job
+from .queue import (
+    claim_jobs,
+    enqueue,
+    enqueue_once,
+    is_pending,
+    retry_delay,
+    run_job,
+    task,
+)
+
+RECORD_JOB = "tests.record"
+FAIL_JOB = "tests.fail"
+
+
+@task(RECORD_JOB)
+def record(category=""):
+    if category:
+        Category.objects.create(name=category)
+
+
+@task(FAIL_JOB)
+def fail(category):
+    # Written, then rolled back with the failed job.
+    Category.objects.create(name=category)
+    raise RuntimeError("Gateway down")
+
+
+@override_settings(JOB_RETRY_BACKOFF=10, JOB_MAX_ATTEMPTS=2, JOB_LOCK_TIMEOUT=60)
+class QueueTests(TestCase):
+    def test_unknown_jobs_are_rejected(self):
+        with self.assertRaises(KeyError):
+            enqueue("tests.unknown")
+
+    def test_claimed_jobs_are_handed_out_once(self):
+        job = enqueue(RECORD_JOB, category="Claimed")
+        enqueue(RECORD_JOB, run_at=timezone.now() + datetime.timedelta(hours=1))
+        [claimed] = claim_jobs("worker-1", 10)
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual((claimed.status, claimed.attempts), ("running", 1))
+        self.assertEqual(claim_jobs("worker-2", 10), [])
+
+        self.assertTrue(run_job(claimed))
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, "done")
+        self.assertTrue(Category.objects.filter(name="Claimed").exists())
+
+    def test_jobs_of_dead_workers_are_claimed_again(self):
+        job = enqueue(RECORD_JOB)
+        claim_jobs("worker-1", 10)
+        Job.objects.filter(pk=job.pk).update(
+            locked_at=timezone.now() - datetime.timedelta(minutes=5)
+        )
+        [claimed] = claim_jobs("worker-2", 10)
+        self.assertEqual((claimed.locked_by, claimed.attempts), ("worker-2", 2))
+        # The first worker finishing late doesn't count.
+        job.refresh_from_db()
+        job.locked_by = "worker-1"
+        self.assertFalse(run_job(job))
+        self.assertTrue(run_job(claimed))
+
+    def test_failed_jobs_are_retried_with_backoff(self):
+        job = enqueue(FAIL_JOB, category="Rolled back")
+        [claimed] = claim_jobs("worker-1", 10)
+        before = timezone.now()
+        self.assertFalse(run_job(claimed))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "queued")
+        self.assertIn("Gateway down", job.last_error)
+        self.assertGreaterEqual(job.run_at, before + datetime.timedelta(seconds=5))
+        self.assertFalse(Category.objects.filter(name="Rolled back").exists())
+        # Not due yet.
+        self.assertEqual(claim_jobs("worker-1", 10), [])
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        [claimed] = claim_jobs("worker-1", 10)
+        self.assertFalse(run_job(claimed))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+
+    def test_retry_delay_grows_up_to_the_cap(self):
+        with self.settings(JOB_RETRY_BACKOFF_MAX=100):
+            delays = [retry_delay(attempts) for attempts in (1, 2, 3, 10)]
+        self.assertTrue(5 <= delays[0] <= 10)
+        self.assertTrue(10 <= delays[1] <= 20)
+        self.assertTrue(20 <= delays[2] <= 40)
+        self.assertTrue(50 <= delays[3] <= 100)
+
+    def test_enqueue_once(self):
+        self.assertIsNotNone(enqueue_once(RECORD_JOB))
+        self.assertIsNone(enqueue_once(RECORD_JOB))
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_is_pending_matches_the_payload(self):
+        job = enqueue(RECORD_JOB, category="Pending")
+        self.assertTrue(is_pending(RECORD_JOB, category="Pending"))
+        self.assertFalse(is_pending(RECORD_JOB, category="Other"))
+        Job.objects.filter(pk=job.pk).update(status="done")
+        self.assertFalse(is_pending(RECORD_JOB, category="Pending"))
@@ -0,0 +1,89 @@
+"""
+The worker processes started by `manage.py run_workers`.
+"""
+
+import logging
+import multiprocessing
+import os
+import socket
+import time
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+def work(stop, batch_size, poll_interval):
+    """
+    Claims and runs jobs until `stop` is set.
+
+    Sleeps for `poll_interval` seconds whenever the queue is empty.
+    """
+    # Imported here: the module is loaded by spawned processes before
+    # Django is set up.
+    from .queue import claim_jobs, run_job
+
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    while not stop.is_set():
+        close_old_connections()
+        jobs = claim_jobs(worker, batch_size)
+        for job in jobs:
+            run_job(job)
+        if not jobs:
+            stop.wait(poll_interval)
+
+
+def worker_process(stop, batch_size, poll_interval):
+    """
+    Entry point of a worker process (started with the spawn method, so
+    Django must be set up again).
+    """
+    import django
+
+    django.setup()
+    try:
+        work(stop, batch_size, poll_interval)
+    except KeyboardInterrupt:
+        pass
+
+
+class WorkerPool:
+    """
+    A set of worker processes sharing one stop event.
+    """
+
+    def __init__(self, processes, batch_size, poll_interval):
+        self.context = multiprocessing.get_context("spawn")
+        self.stop_event = self.context.Event()
+        self.args = (self.stop_event, batch_size, poll_interval)
+        self.processes = [self.spawn(index) for index in range(processes)]
+
+    def spawn(self, index):
+        process = self.context.Process(
+            target=worker_process, args=self.args, name=f"job-worker-{index}"
+        )
+        process.start()
+        return process
+
+    def restart_dead(self):
+        """
+        Replaces workers that exited unexpectedly. Returns their names.
+        """
+        dead = []
+        for index, process in enumerate(self.processes):
+            if not process.is_alive():
+                dead.append(process.name)
+                self.processes[index] = self.spawn(index)
+        return dead
+
+    def stop(self, timeout=30):
+        """
+        Asks the workers to finish their current jobs and waits for them.
+        """
+        self.stop_event.set()
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning("Worker %s did not stop, terminating it", process.name)
+                process.terminate()
@@ -1,5 +1,8 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
+
 from .models import Order, OrderItem
+from .status import bulk_transition
 
 
 class OrderItemInline(admin.TabularInline):
@@ -10,7 +13,12 @@ class OrderItemInline(admin.TabularInline):
 
     model = OrderItem
     # Make all fields read-only. An admin should not change items of a placed order.
-    readonly_fields = ("product", "quantity", "price_at_order_time")
+    readonly_fields = (
+        "product",
+        "quantity",
+        "price_at_order_time",
+        "category_at_order_time",
+    )
     extra = 0  # Don't show extra forms for adding new items.
     can_delete = False  # Prevent deleting items from an order.
 
@@ -29,6 +37,10 @@ class OrderAdmin(admin.ModelAdmin):
     list_filter = ("status", "created_at")
     search_fields = ("id", "user__username", "user__email")
     inlines = [OrderItemInline]
+    list_select_related = ("user",)
+
+    # Bulk status changes, one UPDATE per action (see orders/status.py).
+    actions = ["mark_processing", "mark_shipped", "mark_delivered", "mark_cancelled"]
 
     # Make critical fields read-only on the detail page.
     # The admin's main job here is to update the status.
@@ -48,5 +60,55 @@ class OrderAdmin(admin.ModelAdmin):
         # Order creation should go through the API to ensure all logic is applied.
         return True
 
+    def save_model(self, request, obj, form, change):
+        """
+        Changes the status of an edited order with bulk_transition(), like
+        the actions do, so that cancelling an order returns its stock.
+        """
+        if not (change and "status" in form.changed_data):
+            return super().save_model(request, obj, form, change)
+        status = obj.status
+        obj.status = form.initial["status"]
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            counts = bulk_transition([obj.pk], status)
+        if counts["rejected"]:
+            self.message_user(
+                request,
+                f"Order #{obj.pk} is {obj.status} and can't move to {status}.",
+                messages.WARNING,
+            )
+        obj.refresh_from_db()
+
+    def transition(self, request, queryset, status):
+        """
+        Moves the selected orders to `status` with one UPDATE and reports
+        how many moved (see orders/status.py).
+        """
+        counts = bulk_transition(queryset.values_list("pk", flat=True), status)
+        self.message_user(
+            request,
+            f"{counts['updated']} orders marked as {status}, "
+            f"{counts['unchanged']} already {status}, "
+            f"{counts['rejected']} not allowed to move to {status}.",
+            messages.WARNING if counts["rejected"] else messages.SUCCESS,
+        )
+
+    @admin.action(description="Mark selected orders as Processing")
+    def mark_processing(self, request, queryset):
+        self.transition(request, queryset, "Processing")
+
+    @admin.action(description="Mark selected orders as Shipped")
+    def mark_shipped(self, request, queryset):
+        self.transition(request, queryset, "Shipped")
+
+    @admin.action(description="Mark selected orders as Delivered")
+    def mark_delivered(self, request, queryset):
+        self.transition(request, queryset, "Delivered")
+
+    @admin.action(description="Cancel selected orders and restock their items")
+    def mark_cancelled(self, request, queryset):
+        self.transition(request, queryset, "Cancelled")
+
 
 # We no longer need admin.site.register(OrderItem) because it's handled by the inline.
@@ -0,0 +1,95 @@
+"""
+Archiving of cold orders.
+
+Delivered and cancelled orders that haven't changed for
+settings.ORDER_ARCHIVE_AFTER_DAYS are moved, with their items and
+payment, from the hot tables (`Orders`, `OrderItems`, `Payments`) to the
+archive tables, a batch at a time: each batch is copied with bulk inserts
+and deleted in one transaction, so an order is always in exactly one of
+the two places. Archived rows keep their ids, so links to an order keep
+working and detail reads can simply fall back to the archive.
+
+Archiving is a move, not a deletion: the sales rollups keep counting
+archived orders (see is_archiving()).
+"""
+
+import contextvars
+import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from payments.models import ArchivedPayment, Payment
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from .snapshots import snapshot_queryset, write_snapshots
+
+TERMINAL_STATUSES = ("Delivered", "Cancelled")
+
+_archiving = contextvars.ContextVar("archiving", default=False)
+
+
+def is_archiving():
+    """
+    True while orders are being deleted because they moved to the archive.
+    """
+    return _archiving.get()
+
+
+def _copy(queryset, archive_model):
+    """
+    Inserts the rows of a queryset into the matching archive table.
+    """
+    source_columns = {field.attname for field in queryset.model._meta.concrete_fields}
+    columns = [
+        field.attname
+        for field in archive_model._meta.concrete_fields
+        if field.attname in source_columns
+    ]
+    archive_model.objects.bulk_create(
+        [archive_model(**row) for row in queryset.order_by().values(*columns)]
+    )
+
+
+def archive_batch(order_ids):
+    """
+    Moves orders with their items and payment to the archive.
+
+    Must run in a transaction, with the orders locked.
+    """
+    # The archive serves orders from their snapshot.
+    write_snapshots(
+        list(snapshot_queryset().filter(pk__in=order_ids, snapshot__isnull=True))
+    )
+    _copy(Order.objects.filter(pk__in=order_ids), ArchivedOrder)
+    _copy(OrderItem.objects.filter(order_id__in=order_ids), ArchivedOrderItem)
+    _copy(Payment.objects.filter(order_id__in=order_ids), ArchivedPayment)
+
+    token = _archiving.set(True)
+    try:
+        Order.objects.filter(pk__in=order_ids).delete()
+    finally:
+        _archiving.reset(token)
+
+
+def archive_orders(days, batch_size):
+    """
+    Archives every terminal order unchanged for `days` days.
+
+    Yields the number of orders moved by each batch.
+    """
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    while True:
+        with transaction.atomic():
+            cold = Order.objects.filter(
+                status__in=TERMINAL_STATUSES, updated_at__lt=cutoff
+            ).order_by("pk")
+            if connection.features.has_select_for_update_skip_locked:
+                cold = cold.select_for_update(skip_locked=True)
+            else:
+                cold = cold.select_for_update()
+            order_ids = list(cold.values_list("pk", flat=True)[:batch_size])
+            if not order_ids:
+                return
+            archive_batch(order_ids)
+        yield len(order_ids)
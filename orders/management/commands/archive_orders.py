@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.archive import archive_orders
+
+
+class Command(BaseCommand):
+    """
+    Moves old delivered and cancelled orders to the archive tables.
+
+    Orders are moved with their items and payment in batches, one
+    transaction per batch, so the command can be stopped and resumed at
+    any time. Run it regularly, e.g. nightly from cron.
+    """
+
+    help = "Archive delivered/cancelled orders that haven't changed for a while."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+            help="Archive orders unchanged for this many days.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Orders moved per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        archived = 0
+        for moved in archive_orders(options["days"], options["batch_size"]):
+            archived += moved
+            if options["verbosity"] > 1:
+                self.stdout.write(f"Archived {archived} orders...")
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} orders."))
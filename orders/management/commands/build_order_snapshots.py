@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce_api.exports import iterate_in_chunks
+from orders.snapshots import snapshot_queryset, write_snapshots
+
+
+class Command(BaseCommand):
+    """
+    Builds the snapshot of orders that don't have one yet.
+
+    Needed once for orders placed before snapshots existed, and after
+    loading orders from fixtures. Orders are read in primary-key batches
+    with their items, products, users and addresses preloaded.
+    """
+
+    help = "Build the read snapshots of orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Orders read and written per batch.",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild the snapshots of all orders, not only missing ones.",
+        )
+
+    def handle(self, *args, **options):
+        orders = snapshot_queryset()
+        if not options["all"]:
+            orders = orders.filter(snapshot__isnull=True)
+
+        written = 0
+        for batch in iterate_in_chunks(orders, options["batch_size"]):
+            written += write_snapshots(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Built {written} order snapshots."))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from orders.reservations import release_expired_holds
+
+
+class Command(BaseCommand):
+    """
+    Cancels "Pending Payment" orders whose stock hold has expired.
+
+    Orders are cancelled and their stock returned in batches, each with a
+    fixed number of queries. Run it periodically, e.g. every minute from
+    cron.
+    """
+
+    help = "Release expired stock holds and cancel their orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Orders released per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        released = 0
+        while True:
+            batch = release_expired_holds(options["batch_size"], now=now)
+            if not batch:
+                break
+            released += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Released {released} expired holds."))
@@ -0,0 +1,108 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from rest_framework.test import APIClient
+
+from categories.models import Category
+from orders.models import Order
+from products.models import Product
+from users.models import Users
+
+
+class Command(BaseCommand):
+    """
+    Hammers the checkout endpoint from several threads at once.
+
+    Creates a throw-away product with a small stock, lets every thread
+    place orders for it through POST /orders/api/ and then checks that the
+    units sold match the stock taken and that the stock never went below
+    zero. Reports the checkout throughput. Meant for development and
+    staging databases only: it writes (and afterwards deletes) real rows.
+    """
+
+    help = "Concurrent checkout stress test (checks for overselling)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--username", required=True, help="User placing the orders."
+        )
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--orders-per-thread", type=int, default=50)
+        parser.add_argument("--stock", type=int, default=100)
+        parser.add_argument("--quantity", type=int, default=1)
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the test product and orders."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = Users.objects.get(username=options["username"])
+        except Users.DoesNotExist:
+            raise CommandError(f"No user '{options['username']}'.")
+        address = user.address_set.first()
+        category = Category.objects.first()
+        if address is None or category is None:
+            raise CommandError("The user needs an address and a category must exist.")
+
+        product = Product.objects.create(
+            name="Stress test product",
+            price=1,
+            stack=options["stock"],
+            category=category,
+        )
+        payload = {
+            "address_id": address.pk,
+            "items": [{"product_id": product.pk, "quantity": options["quantity"]}],
+        }
+        results = {"created": 0, "rejected": 0, "errors": 0}
+        lock = threading.Lock()
+
+        def worker():
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                for _ in range(options["orders_per_thread"]):
+                    try:
+                        status = client.post("/orders/api/", payload, format="json")
+                        status = status.status_code
+                    except Exception:
+                        status = None
+                    outcome = {201: "created", 400: "rejected"}.get(status, "errors")
+                    with lock:
+                        results[outcome] += 1
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        product.refresh_from_db()
+        orders = Order.objects.filter(items__product=product)
+        sold = options["quantity"] * orders.count()
+        attempts = sum(results.values())
+        self.stdout.write(
+            f"{attempts} checkouts in {elapsed:.1f}s ({attempts / elapsed:.0f}/s): "
+            f"{results['created']} created, {results['rejected']} rejected for "
+            f"stock, {results['errors']} errors."
+        )
+        self.stdout.write(
+            f"Stock {options['stock']} -> {product.stack}, {sold} units sold."
+        )
+        consistent = product.stack >= 0 and sold == options["stock"] - product.stack
+        if consistent:
+            self.stdout.write(self.style.SUCCESS("No oversell."))
+        else:
+            self.stdout.write(self.style.ERROR("Stock and orders disagree!"))
+
+        if not options["keep"]:
+            orders.delete()
+            product.delete()
+        if not consistent:
+            raise CommandError("Oversell detected.")
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:45
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_created_at(apps, schema_editor):
+    # Existing orders haven't changed since they were placed, as far as
+    # we know.
+    Order = apps.get_model("orders", "Order")
+    Order.objects.update(updated_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0002_keyset_pagination_indexes"),
+        ("users", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["updated_at"], name="Orders_updated_5a0c98_idx"),
+        ),
+    ]
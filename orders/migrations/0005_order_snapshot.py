@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:55
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0004_order_stock_holds"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="snapshot",
+            field=models.JSONField(
+                blank=True,
+                editable=False,
+                encoder=django.core.serializers.json.DjangoJSONEncoder,
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:24
+
+from django.db import migrations, models
+
+
+def mark_held_orders(apps, schema_editor):
+    # Orders still holding stock certainly took it at checkout. For the
+    # others it can't be told any more, so they are left unmarked: giving
+    # nothing back beats restocking units that were never taken.
+    Order = apps.get_model("orders", "Order")
+    Order.objects.filter(hold_expires_at__isnull=False).update(stock_reserved=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0006_order_archive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="stock_reserved",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(mark_held_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_product_categories(apps, schema_editor):
+    # The category an older item was ordered in isn't known any more: use
+    # its product's current one, which is what the rollups counted so far.
+    Product = apps.get_model("products", "Product")
+    category = Subquery(
+        Product.objects.filter(pk=OuterRef("product_id")).values("category_id")[:1]
+    )
+    for name in ("OrderItem", "ArchivedOrderItem"):
+        apps.get_model("orders", name).objects.update(category_at_order_time=category)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("categories", "0002_image_variants_ready"),
+        ("orders", "0007_order_stock_reserved"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="archivedorderitem",
+            name="category_at_order_time",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="categories.category",
+            ),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="category_at_order_time",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="categories.category",
+            ),
+        ),
+        migrations.RunPython(copy_product_categories, migrations.RunPython.noop),
+    ]
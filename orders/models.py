@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 from users.models import Address
 
 
@@ -13,27 +15,59 @@ class Order(models.Model):
     Attributes:
         user (ForeignKey): The user who placed the order.
         created_at (DateTimeField): The date and time when the order was created.
+        updated_at (DateTimeField): The date and time of the last change.
         status (CharField): The current status of the order (e.g., 'Pending', 'Completed').
         total_amount (DecimalField): The total cost of the order.
+        hold_expires_at (DateTimeField): While the order awaits payment, the
+            time its stock hold runs out (see orders/reservations.py).
+            Null once the hold was converted or released.
+        stock_reserved (BooleanField): Whether the order's units were taken
+            from stock at checkout and not given back yet. Orders placed
+            before checkout took stock have it unset, so cancelling or
+            deleting them doesn't restock anything.
+        snapshot (JSONField): The customer, shipping address and items as
+            they were when the order was placed, rendered once for the
+            order pages and the API (see orders/snapshots.py).
     """
 
     STATUS_CHOICES = (
         ("Pending", "Pending"),
+        ("Pending Payment", "Pending Payment"),
         ("Processing", "Processing"),
         ("Shipped", "Shipped"),
         ("Delivered", "Delivered"),
         ("Cancelled", "Cancelled"),
     )
 
+    # The statuses each status may move to. Delivered and Cancelled are final.
+    ALLOWED_TRANSITIONS = {
+        "Pending": ("Processing", "Cancelled"),
+        "Pending Payment": ("Processing", "Cancelled"),
+        "Processing": ("Shipped", "Cancelled"),
+        "Shipped": ("Delivered",),
+        "Delivered": (),
+        "Cancelled": (),
+    }
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="orders"
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Pending")
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     address = models.ForeignKey(
         Address, on_delete=models.SET_NULL, null=True, blank=True
     )
+    hold_expires_at = models.DateTimeField(null=True, blank=True)
+    stock_reserved = models.BooleanField(default=False, editable=False)
+    snapshot = models.JSONField(
+        null=True, blank=True, editable=False, encoder=DjangoJSONEncoder
+    )
+
+    # Columns read by __str__, the only ones the API query planner loads
+    # when an order is shown as a string (keeps the snapshot out).
+    STR_FIELDS = ("id", "status")
 
     class Meta:
         """
@@ -41,10 +75,20 @@ class Order(models.Model):
 
         - db_table: Sets a custom table name in the database.
         - ordering: Sets the default sort order for orders to be by creation date.
+        - indexes: Support the newest-first keyset pagination, both for staff
+          (all orders) and for customers (their own orders), the
+          `updated_after` filter of incremental exports and the expired
+          hold sweep.
         """
 
         db_table = "Orders"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"]),
+            models.Index(fields=["user", "-created_at", "-id"]),
+            models.Index(fields=["updated_at"]),
+            models.Index(fields=["status", "hold_expires_at"]),
+        ]
 
     def __str__(self):
         """
@@ -65,12 +109,25 @@ class OrderItem(models.Model):
         product (ForeignKey): The product being ordered.
         quantity (PositiveIntegerField): The quantity of the product ordered.
         price_at_order_time (DecimalField): The price of the product when the order was made.
+        category_at_order_time (ForeignKey): The category of the product when
+            the order was made; the sales rollups count the item there even
+            if the product moves to another category later.
     """
 
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey("products.Product", on_delete=models.PROTECT)
     quantity = models.PositiveIntegerField()
     price_at_order_time = models.DecimalField(max_digits=10, decimal_places=2)
+    category_at_order_time = models.ForeignKey(
+        "categories.Category",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
+    # Relations followed by __str__, selected up front by the API query planner.
+    STR_RELATED_FIELDS = ("product",)
 
     class Meta:
         """
@@ -86,3 +143,83 @@ class OrderItem(models.Model):
         Returns a human-readable string representation of the order item.
         """
         return f"{self.quantity} x {self.product.name}"
+
+
+class ArchivedOrder(models.Model):
+    """
+    An old, finished order moved out of the `Orders` table.
+
+    Delivered and cancelled orders that haven't changed for a while are
+    moved here with their items and payment by `manage.py archive_orders`
+    (see orders/archive.py), so the hot tables only hold recent and open
+    orders. Rows keep their original ids and columns, and order detail
+    reads fall back to this table, so archived orders look the same to
+    customers and the API.
+
+    Attributes:
+        The columns of Order (except the stock hold), plus:
+        archived_at (DateTimeField): When the order was archived.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="archived_orders",
+    )
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    address = models.ForeignKey(
+        Address, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    snapshot = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        """
+        Meta options for the ArchivedOrder model.
+
+        - db_table: Sets a custom table name in the database.
+        - ordering: Newest first, like Order.
+        - indexes: Support a customer's archived order history.
+        """
+
+        db_table = "ArchivedOrders"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-id"]),
+        ]
+
+    def __str__(self):
+        return f"Order #{self.id} - {self.status} (archived)"
+
+
+class ArchivedOrderItem(models.Model):
+    """
+    An item of an archived order, with the columns of OrderItem.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(
+        ArchivedOrder, on_delete=models.CASCADE, related_name="items"
+    )
+    product = models.ForeignKey(
+        "products.Product", on_delete=models.PROTECT, related_name="+"
+    )
+    quantity = models.PositiveIntegerField()
+    price_at_order_time = models.DecimalField(max_digits=10, decimal_places=2)
+    category_at_order_time = models.ForeignKey(
+        "categories.Category",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
+    class Meta:
+        db_table = "ArchivedOrderItems"
+
+    def __str__(self):
+        return f"{self.quantity} x product {self.product_id}"
@@ -0,0 +1,141 @@
+"""
+Stock holds for orders awaiting payment.
+
+An order placed through checkout takes its stock right away (see
+products/stock.py), is marked `stock_reserved` and enters "Pending
+Payment" with `hold_expires_at` set. A successful payment converts the hold: the order moves on and the
+stock stays sold. If the customer never pays, the sweeper
+(`manage.py release_expired_holds`) cancels the order once the hold has
+expired and puts the units back.
+
+Every transition is a conditional UPDATE on the order status, so a
+payment and the sweeper racing for the same order can't both win.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from analytics.rollups import record_status_change
+from products.stock import decrement_stock, restock
+
+from .models import Order, OrderItem
+
+PENDING_PAYMENT = "Pending Payment"
+
+
+def hold_expiry():
+    """
+    Returns the expiry time of a hold placed now.
+    """
+    return timezone.now() + datetime.timedelta(seconds=settings.STOCK_HOLD_TTL_SECONDS)
+
+
+def place_hold(quantities):
+    """
+    Takes stock for an order about to enter Pending Payment.
+
+    Raises products.stock.InsufficientStock if some product is short.
+    Returns the `hold_expires_at` value for the order. Must run in the
+    transaction that creates the order.
+    """
+    decrement_stock(quantities)
+    return hold_expiry()
+
+
+def convert_hold(order, status="Processing"):
+    """
+    Turns an order's hold into a sale after a successful payment.
+
+    Returns False if the order no longer awaits payment, e.g. because the
+    sweeper cancelled it first.
+    """
+    converted = Order.objects.filter(pk=order.pk, status=PENDING_PAYMENT).update(
+        status=status, hold_expires_at=None, updated_at=timezone.now()
+    )
+    if converted:
+        record_status_change([order.pk], PENDING_PAYMENT, status)
+        order.status = status
+        order.hold_expires_at = None
+    return bool(converted)
+
+
+def ordered_quantities(order_ids):
+    """
+    Returns the units ordered per product id across the given orders.
+    """
+    return dict(
+        OrderItem.objects.filter(order_id__in=list(order_ids))
+        .order_by()
+        .values("product_id")
+        .annotate(total=Sum("quantity"))
+        .values_list("product_id", "total")
+    )
+
+
+def return_stock(order_ids):
+    """
+    Gives back the units the given orders took at checkout.
+
+    Only orders marked `stock_reserved` return anything, and they are
+    unmarked, so an order's units come back at most once. Must run in a
+    transaction. Returns the ids of the orders that returned stock.
+    """
+    reserved = list(
+        Order.objects.select_for_update()
+        .filter(pk__in=list(order_ids), stock_reserved=True)
+        .values_list("pk", flat=True)
+    )
+    if reserved:
+        Order.objects.filter(pk__in=reserved).update(stock_reserved=False)
+        restock(ordered_quantities(reserved))
+    return reserved
+
+
+def release_holds(order_ids):
+    """
+    Cancels held orders and returns their stock.
+
+    Orders that no longer hold stock are left alone. Works on any number
+    of orders with a fixed number of queries. Returns the ids of the
+    cancelled orders.
+    """
+    with transaction.atomic():
+        held = list(
+            Order.objects.select_for_update()
+            .filter(
+                pk__in=list(order_ids),
+                status=PENDING_PAYMENT,
+                hold_expires_at__isnull=False,
+            )
+            .values_list("pk", flat=True)
+        )
+        if not held:
+            return []
+        Order.objects.filter(pk__in=held).update(
+            status="Cancelled", hold_expires_at=None, updated_at=timezone.now()
+        )
+        record_status_change(held, PENDING_PAYMENT, "Cancelled")
+        return_stock(held)
+    return held
+
+
+def release_expired_holds(batch_size, now=None):
+    """
+    Releases one batch of expired holds. Returns the cancelled order ids.
+
+    Rows locked by a concurrent payment or sweeper are skipped rather than
+    waited for, so several sweepers can run side by side.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        expired = Order.objects.filter(
+            status=PENDING_PAYMENT, hold_expires_at__lte=now
+        ).order_by("hold_expires_at")
+        if connection.features.has_select_for_update_skip_locked:
+            expired = expired.select_for_update(skip_locked=True)
+        ids = list(expired.values_list("pk", flat=True)[:batch_size])
+        return release_holds(ids)
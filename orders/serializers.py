@@ -1,10 +1,12 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Order, OrderItem
 from products.models import Product
 from users.models import Address
+from ecommerce_api.serializers import CompiledRepresentationMixin, SparseFieldsetsMixin
 
 
-class ProductLiteSerializer(serializers.ModelSerializer):
+class ProductLiteSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """
     A simple serializer for the Product model.
     It only includes the id, name, and price of the product.
@@ -15,7 +17,7 @@ class ProductLiteSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "price")
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """
     A serializer for the OrderItem model.
     It shows the product details, quantity, and the price when the order was made.
@@ -28,17 +30,68 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = ("id", "product", "quantity", "price_at_order_time")
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSnapshotField(serializers.Field):
+    """
+    Renders one part (`user`, `address` or `items`) of an order's snapshot.
+
+    Orders placed before snapshots existed get theirs built on the fly
+    until `manage.py build_order_snapshots` has been run.
+    """
+
+    # Columns read from the order, for the API query planner.
+    source_fields = ("snapshot",)
+
+    def __init__(self, key, **kwargs):
+        self.key = key
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, order):
+        if order.snapshot is None:
+            # Imported here: orders.snapshots renders with the serializers above.
+            from .snapshots import build_snapshot
+
+            order.snapshot = build_snapshot(order)
+        return order.snapshot[self.key]
+
+
+class OrderSerializer(
+    SparseFieldsetsMixin, CompiledRepresentationMixin, serializers.ModelSerializer
+):
     """
     A serializer for the Order model.
     It shows all the details of an order, including the user, address,
     status, total amount, and all the items in the order.
-    """
+    Read requests can pick fields with `?fields=` / `?omit=`. The status
+    can only be changed by staff.
 
-    user = serializers.StringRelatedField(read_only=True)
-    address = serializers.StringRelatedField(read_only=True)
+    The user, address and items are served from the order's snapshot
+    (see orders/snapshots.py), so reading orders needs no joins.
+    """
 
-    items = OrderItemSerializer(many=True, read_only=True)
+    user = OrderSnapshotField("user")
+    address = OrderSnapshotField("address")
+
+    items = OrderSnapshotField("items")
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if request is None or not request.user.is_staff:
+            # Only staff change statuses here: moving an order on would
+            # turn its stock hold into a sale without a payment. Customers
+            # cancel from the order page.
+            fields["status"].read_only = True
+        return fields
+
+    def validate_status(self, value):
+        if self.instance is not None and value != self.instance.status:
+            if value not in Order.ALLOWED_TRANSITIONS[self.instance.status]:
+                raise serializers.ValidationError(
+                    f"An order can't move from {self.instance.status} to {value}."
+                )
+        return value
 
     class Meta:
         model = Order
@@ -82,3 +135,19 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         fields = ("address_id", "items")
         # We don't include user, total_amount, or status
         # because they will be set automatically in the view.
+
+
+class OrderBulkStatusSerializer(serializers.Serializer):
+    """
+    Validates a bulk status change: the order ids and their new status.
+    """
+
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+
+    def validate_ids(self, value):
+        if len(value) > settings.ORDER_BULK_STATUS_LIMIT:
+            raise serializers.ValidationError(
+                f"Send at most {settings.ORDER_BULK_STATUS_LIMIT} orders per request."
+            )
+        return value
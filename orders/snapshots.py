@@ -0,0 +1,78 @@
+"""
+Read model of placed orders.
+
+Everything an order page shows besides its status (the items with their
+product names and prices, the customer and the shipping address) is
+fixed once the order is placed. It is rendered once, at creation time,
+into `Order.snapshot`, so reading an order is a single-row query with no
+joins to items, products, users or addresses, however many lines it has.
+
+The snapshot has the same shape as the `user`, `address` and `items`
+fields of the API, and is built with the same serializers, so the API can
+return it unchanged.
+"""
+
+from django.db.models import Prefetch
+
+from .models import Order, OrderItem
+from .serializers import OrderItemSerializer
+
+
+def item_queryset():
+    return (
+        OrderItem.objects.select_related("product")
+        .only(
+            "order_id",
+            "product",
+            "quantity",
+            "price_at_order_time",
+            "product__name",
+            "product__price",
+        )
+        .order_by("pk")
+    )
+
+
+def build_snapshot(order, items=None):
+    """
+    Returns the snapshot of an order.
+
+    `items` are the order's items with their products, if already loaded;
+    otherwise they are read with one query.
+    """
+    if items is None:
+        items = item_queryset().filter(order=order)
+    return {
+        "user": str(order.user),
+        "address": str(order.address) if order.address_id else None,
+        "items": OrderItemSerializer(items, many=True).data,
+    }
+
+
+def write_snapshot(order):
+    """
+    Builds and stores the snapshot of a newly placed order.
+    """
+    order.snapshot = build_snapshot(order)
+    Order.objects.filter(pk=order.pk).update(snapshot=order.snapshot)
+
+
+def write_snapshots(orders):
+    """
+    Builds and stores the snapshots of a batch of orders.
+
+    `orders` must come from snapshot_queryset(). Returns the number of
+    orders written.
+    """
+    for order in orders:
+        order.snapshot = build_snapshot(order, order.items.all())
+    return Order.objects.bulk_update(orders, ["snapshot"])
+
+
+def snapshot_queryset():
+    """
+    Returns orders with everything build_snapshot() reads preloaded.
+    """
+    return Order.objects.select_related("user", "address__user").prefetch_related(
+        Prefetch("items", queryset=item_queryset())
+    )
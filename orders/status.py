@@ -0,0 +1,73 @@
+"""
+Bulk order status changes.
+
+Moving many orders to a new status takes one UPDATE for the whole
+selection, whatever their current statuses. The orders are locked and
+their statuses read first, so each one is checked against
+Order.ALLOWED_TRANSITIONS; orders that may not move are reported, not
+changed. Everything derived from the status follows in the same
+transaction: cancelled orders return the stock they took at checkout (and
+drop their stock hold) and the sales rollups move between status rows.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from analytics.rollups import record_status_change
+from .models import Order
+from .reservations import return_stock
+
+
+def allowed_sources(status):
+    """
+    Returns the statuses an order may move to `status` from.
+    """
+    return [
+        source
+        for source, targets in Order.ALLOWED_TRANSITIONS.items()
+        if status in targets
+    ]
+
+
+def bulk_transition(order_ids, status):
+    """
+    Moves the given orders to `status`.
+
+    Returns counts: `updated`, `unchanged` (already in that status),
+    `rejected` (not allowed to move there) and `not_found`.
+    """
+    order_ids = set(order_ids)
+    sources = allowed_sources(status)
+    with transaction.atomic():
+        current = dict(
+            Order.objects.select_for_update()
+            .filter(pk__in=order_ids)
+            .order_by("pk")
+            .values_list("pk", "status")
+        )
+        by_source = {}
+        rejected = unchanged = 0
+        for order_id, old_status in current.items():
+            if old_status == status:
+                unchanged += 1
+            elif old_status in sources:
+                by_source.setdefault(old_status, []).append(order_id)
+            else:
+                rejected += 1
+
+        moving = [order_id for ids in by_source.values() for order_id in ids]
+        if moving:
+            Order.objects.filter(pk__in=moving).update(
+                status=status, hold_expires_at=None, updated_at=timezone.now()
+            )
+            for old_status, ids in by_source.items():
+                record_status_change(ids, old_status, status)
+            if status == "Cancelled":
+                return_stock(moving)
+
+    return {
+        "updated": len(moving),
+        "unchanged": unchanged,
+        "rejected": rejected,
+        "not_found": len(order_ids) - len(current),
+    }
@@ -1,3 +1,297 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from categories.models import Category
+from products.models import Product
+from users.models import Address, Users
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from .reservations import PENDING_PAYMENT, release_expired_holds
+
+
+class OrderTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Users.objects.create_user(
+            username="customer", email="customer@example.com", password="x"
+        )
+        cls.staff = Users.objects.create_user(
+            username="staff", email="staff@example.com", password="x", is_staff=True
+        )
+        cls.address = Address.objects.create(
+            user=cls.customer,
+            street="1 Main St",
+            city="Cairo",
+            state="Cairo",
+            country="Egypt",
+            postal_code="11511",
+        )
+        cls.category = Category.objects.create(name="Orders")
+        cls.product = Product.objects.create(
+            name="Mouse", price=10, stack=10, category=cls.category
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.customer)
+
+    def place(self, quantity=2):
+        response = self.api.post(
+            "/orders/api/",
+            {
+                "address_id": self.address.pk,
+                "items": [{"product_id": self.product.pk, "quantity": quantity}],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return Order.objects.latest("pk")
+
+    def assertStock(self, stack):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stack, stack)
+
+
+class OrderApiQueryTests(OrderTestCase):
+    """
+    Orders are read from their snapshot: a page costs a fixed number of
+    queries, however many items the orders have.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.orders = [self.place(quantity) for quantity in (1, 2, 3)]
+
+    def test_list_queries(self):
+        # Count and page; items come from the snapshots.
+        with self.assertNumQueries(2):
+            response = self.api.get("/orders/api/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 3)
+
+    def test_detail_queries(self):
+        with self.assertNumQueries(1):
+            response = self.api.get(f"/orders/api/{self.orders[0].pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["items"][0]["quantity"], 1)
+
+
+class StockHoldTests(OrderTestCase):
+    def test_checkout_takes_stock_and_holds_it(self):
+        order = self.place(3)
+        self.assertStock(7)
+        self.assertEqual(order.status, PENDING_PAYMENT)
+        self.assertTrue(order.stock_reserved)
+        self.assertIsNotNone(order.hold_expires_at)
+        item = order.items.get()
+        self.assertEqual(item.category_at_order_time_id, self.category.pk)
+
+    def test_checkout_rejects_short_stock(self):
+        response = self.api.post(
+            "/orders/api/",
+            {
+                "address_id": self.address.pk,
+                "items": [{"product_id": self.product.pk, "quantity": 11}],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertStock(10)
+        self.assertFalse(Order.objects.exists())
+
+    def test_delete_returns_held_stock(self):
+        order = self.place(3)
+        response = self.api.delete(f"/orders/api/{order.pk}/")
+        self.assertEqual(response.status_code, 204)
+        self.assertStock(10)
+
+    def test_cancelling_order_without_reserved_stock_does_not_restock(self):
+        # Placed before checkout took stock: nothing was taken, so
+        # nothing may be given back.
+        order = Order.objects.create(
+            user=self.customer, address=self.address, total_amount=30
+        )
+        OrderItem.objects.create(
+            order=order, product=self.product, quantity=3, price_at_order_time=10
+        )
+        self.api.force_authenticate(self.staff)
+        response = self.api.patch(
+            f"/orders/api/{order.pk}/", {"status": "Cancelled"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertStock(10)
+
+    def test_cancel_page_returns_stock_once(self):
+        order = self.place(3)
+        self.client.force_login(self.customer)
+        self.client.post(f"/orders/{order.pk}/cancel/")
+        self.client.post(f"/orders/{order.pk}/cancel/")
+        order.refresh_from_db()
+        self.assertEqual(order.status, "Cancelled")
+        self.assertFalse(order.stock_reserved)
+        self.assertStock(10)
+
+    def test_staff_patch_cancel_returns_stock(self):
+        order = self.place(3)
+        self.api.force_authenticate(self.staff)
+        response = self.api.patch(
+            f"/orders/api/{order.pk}/", {"status": "Cancelled"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data["status"], "Cancelled")
+        self.assertStock(10)
+
+    def test_expired_holds_are_released(self):
+        order = self.place(3)
+        Order.objects.filter(pk=order.pk).update(hold_expires_at=order.created_at)
+        self.assertEqual(release_expired_holds(batch_size=10), [order.pk])
+        order.refresh_from_db()
+        self.assertEqual(order.status, "Cancelled")
+        self.assertStock(10)
+
+
+class StatusTests(OrderTestCase):
+    def test_customer_cannot_set_status(self):
+        order = self.place(3)
+        response = self.api.patch(
+            f"/orders/api/{order.pk}/", {"status": "Processing"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        order.refresh_from_db()
+        self.assertEqual(order.status, PENDING_PAYMENT)
+        self.assertIsNotNone(order.hold_expires_at)
+
+    def test_customers_cannot_bulk_transition(self):
+        order = self.place(3)
+        response = self.api.post(
+            "/orders/api/bulk-status/",
+            {"ids": [order.pk], "status": "Cancelled"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_bulk_transition_counts(self):
+        cancelled = self.place(3)
+        shipped = self.place(2)
+        pending = self.place(1)
+        Order.objects.filter(pk=cancelled.pk).update(status="Cancelled")
+        Order.objects.filter(pk=shipped.pk).update(status="Shipped")
+        self.api.force_authenticate(self.staff)
+        response = self.api.post(
+            "/orders/api/bulk-status/",
+            {
+                "ids": [cancelled.pk, shipped.pk, pending.pk, 999999],
+                "status": "Cancelled",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            response.data, {"updated": 1, "unchanged": 1, "rejected": 1, "not_found": 1}
+        )
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, "Cancelled")
+        self.assertIsNone(pending.hold_expires_at)
+        # Only the order that was just cancelled gave its stock back.
+        self.assertStock(5)
+
+
+class IdempotentCheckoutTests(OrderTestCase):
+    def post(self, quantity, key="checkout-1"):
+        return self.api.post(
+            "/orders/api/",
+            {
+                "address_id": self.address.pk,
+                "items": [{"product_id": self.product.pk, "quantity": quantity}],
+            },
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays_the_first_response(self):
+        first = self.post(2)
+        retry = self.post(2)
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertStock(8)
+
+    def test_key_reused_for_another_request(self):
+        self.post(2)
+        response = self.post(3)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_keys_are_scoped_per_user(self):
+        self.post(2)
+        self.api.force_authenticate(self.staff)
+        self.address = Address.objects.create(
+            user=self.staff,
+            street="2 Main St",
+            city="Cairo",
+            state="Cairo",
+            country="Egypt",
+            postal_code="11511",
+        )
+        self.assertEqual(self.post(2).status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+
+
+class ArchiveTests(OrderTestCase):
+    def archive(self, status="Delivered", days=40):
+        order = self.place(3)
+        Order.objects.filter(pk=order.pk).update(
+            status=status, updated_at=timezone.now() - timezone.timedelta(days=days)
+        )
+        call_command("archive_orders", "--days", "30", stdout=StringIO())
+        return order
+
+    def test_old_terminal_orders_are_moved(self):
+        order = self.archive()
+        recent = self.archive(days=1)
+        pending = self.archive(status=PENDING_PAYMENT)
+        self.assertFalse(Order.objects.filter(pk=order.pk).exists())
+        self.assertEqual(
+            list(Order.objects.order_by("pk").values_list("pk", flat=True)),
+            [recent.pk, pending.pk],
+        )
+        archived = ArchivedOrder.objects.get()
+        self.assertEqual(archived.pk, order.pk)
+        self.assertIsNotNone(archived.snapshot)
+        self.assertEqual(ArchivedOrderItem.objects.get().quantity, 3)
+
+    def test_reads_fall_back_to_the_archive(self):
+        order = self.archive()
+        response = self.api.get(f"/orders/api/{order.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["items"][0]["quantity"], 3)
+        response = self.api.get("/orders/api/archived/")
+        self.assertEqual([row["id"] for row in response.data["results"]], [order.pk])
+
+        self.client.force_login(self.customer)
+        self.assertEqual(self.client.get(f"/orders/{order.pk}/").status_code, 200)
+
+    def test_archived_orders_are_read_only(self):
+        order = self.archive()
+        response = self.api.patch(
+            f"/orders/api/{order.pk}/", {"status": "Processing"}, format="json"
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.api.delete(f"/orders/api/{order.pk}/").status_code, 404)
+        self.assertTrue(ArchivedOrder.objects.filter(pk=order.pk).exists())
 
-# Create your tests here.
+    def test_other_customers_cannot_read_archived_orders(self):
+        order = self.archive()
+        other = Users.objects.create_user(
+            username="other", email="other@example.com", password="x"
+        )
+        self.api.force_authenticate(other)
+        self.assertEqual(self.api.get(f"/orders/api/{order.pk}/").status_code, 404)
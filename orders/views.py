@@ -3,28 +3,64 @@ from users.models import Address
 
 from django.db import transaction
 from django.urls import reverse_lazy, reverse
-from django.http import HttpResponseForbidden
+from django.http import Http404, HttpResponseForbidden
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, DetailView
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
-from django.shortcuts import redirect
+from django.shortcuts import get_object_or_404, redirect
 
 from rest_framework import viewsets, status, serializers
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
-from .models import Order, OrderItem
+from ecommerce_api.exports import stream_export
+from ecommerce_api.idempotency import IdempotentCreateMixin
+from ecommerce_api.mixins import QueryPlannerMixin
+from ecommerce_api.pagination import OptInCursorPagination
 
-from .serializers import OrderSerializer, OrderCreateSerializer
+from .models import ArchivedOrder, Order, OrderItem
+
+from .serializers import (
+    OrderBulkStatusSerializer,
+    OrderCreateSerializer,
+    OrderSerializer,
+)
+from .status import bulk_transition
 from .permissions import IsOwnerOrAdmin
+from .reservations import (
+    PENDING_PAYMENT,
+    hold_expiry,
+    place_hold,
+    release_holds,
+)
+from .snapshots import build_snapshot, write_snapshot
+from analytics.rollups import record_orders_placed
 from products.models import Product
+from products.stock import InsufficientStock
 
 
 # -----------------------------------------------------------------------------
 # API Views (using Django REST Framework)
 # -----------------------------------------------------------------------------
-class OrderViewSet(viewsets.ModelViewSet):
-    # ... (Code remains the same) ...
+class OrderViewSet(IdempotentCreateMixin, QueryPlannerMixin, viewsets.ModelViewSet):
+    """
+    API endpoint for orders.
+
+    Items, products, users and addresses are loaded with a fixed number of
+    queries per page (QueryPlannerMixin), however many orders are listed.
+    Staff can stream all orders with their items from `export/`.
+
+    New orders hold their stock in "Pending Payment" until they are paid
+    or the hold expires (see orders/reservations.py). Clients may send an
+    `Idempotency-Key` header to retry a create safely.
+
+    Archived orders (see orders/archive.py) are listed by `archived/`, and
+    retrieving one by id falls back to the archive transparently.
+    """
+
+    pagination_class = OptInCursorPagination  # ?pagination=cursor for keyset pages
+
     def get_queryset(self):
         """
         This view should return a list of all the orders
@@ -35,6 +71,26 @@ class OrderViewSet(viewsets.ModelViewSet):
             return Order.objects.all()
         return Order.objects.filter(user=user)
 
+    def get_archive_queryset(self):
+        """
+        The archived orders the current user may read.
+        """
+        user = self.request.user
+        if user.is_staff:
+            return ArchivedOrder.objects.all()
+        return ArchivedOrder.objects.filter(user=user)
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            # Only reads fall back: archived orders can't be changed.
+            if self.action != "retrieve":
+                raise
+        order = get_object_or_404(self.get_archive_queryset(), pk=self.kwargs["pk"])
+        self.check_object_permissions(self.request, order)
+        return order
+
     def get_serializer_class(self):
         if self.action == "create":
             return OrderCreateSerializer
@@ -44,8 +100,10 @@ class OrderViewSet(viewsets.ModelViewSet):
         """
         Instantiates and returns the list of permissions that this view requires.
         """
-        if self.action in ["list", "retrieve", "create"]:
+        if self.action in ["list", "retrieve", "create", "archived"]:
             permission_classes = [IsAuthenticated]
+        elif self.action in ["export", "bulk_status"]:
+            permission_classes = [IsAdminUser]
         else:  # For update, partial_update, destroy
             permission_classes = [IsOwnerOrAdmin]
         return [permission() for permission in permission_classes]
@@ -58,47 +116,67 @@ class OrderViewSet(viewsets.ModelViewSet):
         address_id = validated_data.pop("address_id")
 
         try:
-            address = Address.objects.get(id=address_id, user=user)
+            address = Address.objects.select_related("user").get(
+                id=address_id, user=user
+            )
         except Address.DoesNotExist:
             raise serializers.ValidationError(
                 {"address_id": "This address does not exist or does not belong to you."}
             )
 
+        # Units per product; a product may appear on several lines.
+        quantities = {}
+        for item_data in items_data:
+            if item_data["quantity"] <= 0:
+                raise serializers.ValidationError("Quantity must be a positive number.")
+            product_id = item_data["product_id"]
+            quantities[product_id] = (
+                quantities.get(product_id, 0) + item_data["quantity"]
+            )
+
+        products = Product.objects.only("id", "price", "category_id").in_bulk(
+            list(quantities)
+        )
+        for product_id in quantities:
+            if product_id not in products:
+                raise serializers.ValidationError(
+                    {"product_id": f"Product with id {product_id} does not exist."}
+                )
+
         with transaction.atomic():
+            try:
+                hold_expires_at = place_hold(quantities)
+            except InsufficientStock as exc:
+                raise serializers.ValidationError(
+                    {
+                        "items": [
+                            f"Not enough stock for product {product_id}."
+                            for product_id in exc.product_ids
+                        ]
+                    }
+                )
+
             total_amount = 0
             order_items_to_create = []
-
             for item_data in items_data:
-                try:
-                    product = Product.objects.get(id=item_data["product_id"])
-                    price = product.price
-                    quantity = item_data["quantity"]
-
-                    if quantity <= 0:
-                        raise serializers.ValidationError(
-                            "Quantity must be a positive number."
-                        )
-
-                    total_amount += price * quantity
-
-                    order_items_to_create.append(
-                        OrderItem(
-                            product=product,
-                            quantity=quantity,
-                            price_at_order_time=price,
-                        )
-                    )
-                except Product.DoesNotExist:
-                    raise serializers.ValidationError(
-                        {
-                            "product_id": f"Product with id {item_data['product_id']} does not exist."
-                        }
+                product = products[item_data["product_id"]]
+                total_amount += product.price * item_data["quantity"]
+                order_items_to_create.append(
+                    OrderItem(
+                        product=product,
+                        quantity=item_data["quantity"],
+                        price_at_order_time=product.price,
+                        category_at_order_time_id=product.category_id,
                     )
+                )
 
             order = Order.objects.create(
                 user=user,
                 address=address,
                 total_amount=total_amount,
+                status=PENDING_PAYMENT,
+                hold_expires_at=hold_expires_at,
+                stock_reserved=True,
                 **validated_data,
             )
 
@@ -106,9 +184,69 @@ class OrderViewSet(viewsets.ModelViewSet):
                 item.order = order
 
             OrderItem.objects.bulk_create(order_items_to_create)
+            write_snapshot(order)
+            record_orders_placed([order.pk])
 
             serializer.instance = order
 
+    def perform_update(self, serializer):
+        """
+        Saves the other fields, and changes the status with
+        bulk_transition() so that cancelling an order returns its stock.
+        """
+        status = serializer.validated_data.pop("status", None)
+        with transaction.atomic():
+            order = serializer.save()
+            if status is not None and status != order.status:
+                if bulk_transition([order.pk], status)["rejected"]:
+                    # Moved by a concurrent request since it was validated.
+                    raise serializers.ValidationError(
+                        {"status": f"An order can't move to {status} any more."}
+                    )
+                order.refresh_from_db()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # A held order gives its units back before it goes.
+            release_holds([instance.pk])
+            instance.delete()
+
+    @action(detail=False, methods=["post"], url_path="bulk-status")
+    def bulk_status(self, request):
+        """
+        Moves many orders to one status (staff only).
+
+        Expects `{"ids": [...], "status": "Shipped"}`. All allowed moves are
+        made with a single UPDATE; orders whose current status can't move
+        there are left alone. Answers with counts: `updated`, `unchanged`,
+        `rejected` and `not_found`.
+        """
+        serializer = OrderBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        counts = bulk_transition(
+            serializer.validated_data["ids"], serializer.validated_data["status"]
+        )
+        return Response(counts)
+
+    @action(detail=False, methods=["get"])
+    def archived(self, request):
+        """
+        Lists the archived orders of the user (all of them for staff).
+        """
+        page = self.paginate_queryset(self.get_archive_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        Streams all orders with their items as NDJSON or CSV (staff only).
+
+        Accepts `?output=ndjson|csv` and `?updated_after=`; see
+        ecommerce_api/exports.py.
+        """
+        return stream_export(self, self.filter_queryset(self.get_queryset()), "orders")
+
 
 # -----------------------------------------------------------------------------
 # Template-Based Views (using standard Django)
@@ -122,7 +260,18 @@ class OrderListView(LoginRequiredMixin, ListView):
     paginate_by = 10
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).order_by("-created_at")
+        # ?archived=1 lists the orders moved to the archive.
+        model = ArchivedOrder if self.request.GET.get("archived") else Order
+        return (
+            model.objects.filter(user=self.request.user)
+            .defer("snapshot")
+            .order_by("-created_at")
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["archived"] = bool(self.request.GET.get("archived"))
+        return context
 
 
 class OrderDetailView(LoginRequiredMixin, DetailView):
@@ -131,7 +280,23 @@ class OrderDetailView(LoginRequiredMixin, DetailView):
     context_object_name = "order"
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return Order.objects.filter(user=self.request.user).select_related("payment")
+
+    def get_object(self, queryset=None):
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            # The order may have been moved to the archive.
+            archived = ArchivedOrder.objects.filter(user=self.request.user)
+            return get_object_or_404(
+                archived.select_related("payment"), pk=self.kwargs["pk"]
+            )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Items, product names and the address come from the order snapshot.
+        context["snapshot"] = self.object.snapshot or build_snapshot(self.object)
+        return context
 
 
 class OrderCreateView(LoginRequiredMixin, CreateView):
@@ -159,8 +324,11 @@ class OrderCreateView(LoginRequiredMixin, CreateView):
     def form_valid(self, form):
         form.instance.user = self.request.user
         form.instance.total_amount = 0
-        form.instance.status = "Pending Payment"
-        return super().form_valid(form)
+        form.instance.status = PENDING_PAYMENT
+        form.instance.hold_expires_at = hold_expiry()
+        response = super().form_valid(form)
+        write_snapshot(self.object)
+        return response
 
     def get_success_url(self):
         # Redirect to the payment page for the newly created order.
@@ -186,8 +354,9 @@ class OrderCancelView(LoginRequiredMixin, UpdateView):
         if order.status not in ["Pending", "Pending Payment"]:
             return HttpResponseForbidden("This order cannot be cancelled.")
 
-        order.status = "Cancelled"
-        order.save()
+        # Cancels the order (unless a concurrent request did) and gives back
+        # the units it took at checkout, if any.
+        bulk_transition([order.pk], "Cancelled")
         return super().post(request, *args, **kwargs)
 
 
@@ -198,3 +367,9 @@ class OrderDeleteView(LoginRequiredMixin, DeleteView):
 
     def get_queryset(self):
         return Order.objects.filter(user=self.request.user)
+
+    def form_valid(self, form):
+        with transaction.atomic():
+            # A held order gives its units back before it goes.
+            release_holds([self.object.pk])
+            return super().form_valid(form)
@@ -1,5 +1,23 @@
 from django.contrib import admin
-from .models import Payment
+from .models import Payment, PaymentEvent
+
+
+class RefundDueFilter(admin.SimpleListFilter):
+    """
+    Completed payments whose order was cancelled: the customer was charged
+    for nothing, and a refund job is queued (see payments/events.py).
+    """
+
+    title = "refund due"
+    parameter_name = "refund_due"
+
+    def lookups(self, request, model_admin):
+        return (("yes", "Refund due"),)
+
+    def queryset(self, request, queryset):
+        if self.value() == "yes":
+            return queryset.filter(status="Completed", order__status="Cancelled")
+        return queryset
 
 
 # Register your models here.
@@ -14,7 +32,32 @@ class paymentAdmin(admin.ModelAdmin):
         "created_at",
         "updated_at",
     )
-    list_filter = ("status", "payment_method")
+    list_filter = ("status", "payment_method", RefundDueFilter)
     search_fields = ("order__id", "transaction_id")
     ordering = ("-created_at",)
     readonly_fields = ("created_at", "updated_at")
+
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the events received from the payment gateways.
+    """
+
+    list_display = (
+        "event_id",
+        "gateway",
+        "transaction_id",
+        "status",
+        "received_at",
+        "processed_at",
+    )
+    list_filter = ("gateway", "status")
+    search_fields = ("event_id", "transaction_id")
+    ordering = ("-id",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
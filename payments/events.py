@@ -0,0 +1,178 @@
+"""
+Payment webhook events.
+
+Gateways report status changes in bursts, and deliver each event at
+least once. The webhook only verifies and records the events, with one
+INSERT per delivery that skips events already recorded, and queues a
+job (see payments/tasks.py). The job applies the pending events in
+batches: per batch, one query finds the payments by transaction id,
+there is one UPDATE per new payment status, the orders follow with
+bulk_transition() and one more UPDATE marks the events processed. A
+burst of thousands of events thus costs a few queries per batch instead
+of a few per event. Each batch is a job of its own, which queues the
+next one, so that it commits on its own: a long burst doesn't keep the
+events and payments locked until it is drained.
+
+Events may arrive out of order, so a payment only moves forward:
+Pending, then Failed or Completed, then Refunded.
+
+A charge may succeed after its order was cancelled (the stock hold
+expired while the customer was paying, and the sweeper gave the stock
+back). The payment is still recorded as Completed, and a job refunds it
+(see payments/tasks.py); until then the admin lists it under "Refund
+due".
+"""
+
+import datetime
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from jobs.queue import enqueue, enqueue_once
+from orders.models import Order
+from orders.status import bulk_transition
+
+from .models import Payment, PaymentEvent
+
+logger = logging.getLogger(__name__)
+
+APPLY_EVENTS_JOB = "payments.apply_events"
+REFUND_PAYMENT_JOB = "payments.refund_payment"
+
+STATUS_RANK = {"Pending": 0, "Failed": 1, "Completed": 2, "Refunded": 3}
+
+# The status an order moves to when its payment reaches a status.
+ORDER_STATUSES = {"Completed": "Processing", "Refunded": "Cancelled"}
+
+
+def record_events(gateway, events):
+    """
+    Records the events of a webhook delivery and queues their application.
+
+    Events already recorded are skipped. Events of other kinds than
+    payment status changes are kept, but marked processed right away.
+    """
+    now = timezone.now()
+    rows = [
+        PaymentEvent(
+            gateway=gateway.method,
+            event_id=event["id"],
+            transaction_id=event["transaction_id"],
+            status=event["status"] or "",
+            payload=event["payload"],
+            processed_at=None if event["status"] else now,
+        )
+        for event in events
+    ]
+    with transaction.atomic():
+        PaymentEvent.objects.bulk_create(rows, ignore_conflicts=True)
+        if any(row.status for row in rows):
+            enqueue_once(APPLY_EVENTS_JOB)
+
+
+def apply_events(events, now):
+    """
+    Applies a batch of events to their payments and orders.
+
+    Must run in a transaction. Returns the events whose payment wasn't
+    found.
+    """
+    payments = (
+        Payment.objects.select_for_update()
+        .only("id", "order_id", "status", "transaction_id")
+        .in_bulk(
+            {event.transaction_id for event in events}, field_name="transaction_id"
+        )
+    )
+
+    targets = {}
+    unmatched = []
+    for event in events:
+        payment = payments.get(event.transaction_id)
+        if payment is None:
+            unmatched.append(event)
+            continue
+        current = targets.get(payment.transaction_id, payment.status)
+        if STATUS_RANK[event.status] > STATUS_RANK[current]:
+            targets[payment.transaction_id] = event.status
+
+    by_status = {}
+    for transaction_id, status in targets.items():
+        by_status.setdefault(status, []).append(payments[transaction_id])
+    for status, moving in by_status.items():
+        Payment.objects.filter(pk__in=[payment.pk for payment in moving]).update(
+            status=status, updated_at=now
+        )
+        if status in ORDER_STATUSES:
+            counts = bulk_transition(
+                [payment.order_id for payment in moving], ORDER_STATUSES[status]
+            )
+            if counts["rejected"]:
+                logger.warning(
+                    "%s %s payments whose order can't move to %s",
+                    counts["rejected"],
+                    status,
+                    ORDER_STATUSES[status],
+                )
+        if status == "Completed":
+            refund_cancelled(moving)
+    return unmatched
+
+
+def refund_cancelled(payments):
+    """
+    Queues the refund of the completed payments whose order is cancelled.
+    """
+    cancelled = set(
+        Order.objects.filter(
+            pk__in=[payment.order_id for payment in payments], status="Cancelled"
+        ).values_list("pk", flat=True)
+    )
+    for payment in payments:
+        if payment.order_id in cancelled:
+            logger.warning(
+                "Payment %s completed for cancelled order #%s, refunding it",
+                payment.transaction_id,
+                payment.order_id,
+            )
+            enqueue(REFUND_PAYMENT_JOB, payment_id=payment.pk)
+
+
+def apply_pending_batch(after=0, batch_size=None):
+    """
+    Applies the next batch of recorded events not applied yet, those with
+    an id above `after`.
+
+    Must run in a transaction, which should end with the batch: its
+    events and payments stay locked until it commits. An event whose
+    payment isn't found may have overtaken the request that stores the
+    transaction id: it stays pending for settings.PAYMENT_EVENT_MATCH_WINDOW
+    seconds, then is marked processed without effect.
+
+    Returns the id to continue after, or None once the pending events are
+    exhausted, and the number of events left pending.
+    """
+    batch_size = batch_size or settings.PAYMENT_EVENT_BATCH_SIZE
+    now = timezone.now()
+    give_up = now - datetime.timedelta(seconds=settings.PAYMENT_EVENT_MATCH_WINDOW)
+    pending = PaymentEvent.objects.filter(
+        processed_at__isnull=True, pk__gt=after
+    ).order_by("pk")
+    if connection.features.has_select_for_update_skip_locked:
+        pending = pending.select_for_update(skip_locked=True)
+    else:
+        pending = pending.select_for_update()
+    events = list(
+        pending.only("id", "transaction_id", "status", "received_at")[:batch_size]
+    )
+    if not events:
+        return None, 0
+
+    unmatched = apply_events(events, now)
+    kept = {event.pk for event in unmatched if event.received_at >= give_up}
+    PaymentEvent.objects.filter(
+        pk__in=[event.pk for event in events if event.pk not in kept]
+    ).update(processed_at=now)
+    return (events[-1].pk if len(events) == batch_size else None), len(kept)
@@ -0,0 +1,71 @@
+import datetime
+
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from ecommerce_api.dates import start_of_day
+
+from .models import Payment
+
+
+class PaymentFilterParamsSerializer(serializers.Serializer):
+    """
+    Validates the query parameters accepted by PaymentFilter.
+    """
+
+    status = serializers.MultipleChoiceField(
+        choices=Payment.STATUS_CHOICES, required=False
+    )
+    method = serializers.MultipleChoiceField(
+        choices=Payment.PAYMENT_METHOD_CHOICES, required=False
+    )
+    created_after = serializers.DateField(required=False)
+    created_before = serializers.DateField(required=False)
+
+    def to_internal_value(self, data):
+        # Accept comma separated values as well as repeated parameters.
+        data = {
+            name: (
+                [
+                    value.strip()
+                    for values in data.getlist(name)
+                    for value in values.split(",")
+                    if value.strip()
+                ]
+                if name in ("status", "method")
+                else data.get(name)
+            )
+            for name in data
+            if name in self.fields
+        }
+        return super().to_internal_value(data)
+
+
+class PaymentFilter(BaseFilterBackend):
+    """
+    Filters payments by status, payment method and creation date.
+
+    - `status`: one or more statuses, comma separated.
+    - `method`: one or more payment methods, comma separated.
+    - `created_after` / `created_before`: inclusive dates (YYYY-MM-DD).
+
+    Example: `/payments/api/?status=Failed&created_after=2025-01-01`
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = PaymentFilterParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+
+        if data.get("status"):
+            queryset = queryset.filter(status__in=sorted(data["status"]))
+        if data.get("method"):
+            queryset = queryset.filter(payment_method__in=sorted(data["method"]))
+        if data.get("created_after"):
+            queryset = queryset.filter(
+                created_at__gte=start_of_day(data["created_after"])
+            )
+        if data.get("created_before"):
+            next_day = data["created_before"] + datetime.timedelta(days=1)
+            queryset = queryset.filter(created_at__lt=start_of_day(next_day))
+        return queryset
@@ -0,0 +1,68 @@
+"""
+Payment gateway adapters.
+
+Each payment method (Payment.PAYMENT_METHOD_CHOICES) is charged through
+the gateway configured for it in settings.PAYMENT_GATEWAYS:
+
+    PAYMENT_GATEWAYS = {
+        "Stripe": {
+            "BACKEND": "payments.gateways.http.HttpGateway",
+            "BASE_URL": "https://...",
+            "API_KEY": "...",
+            "TIMEOUT": 10,
+        },
+    }
+
+Gateways are created once per process and reused, with their connection
+pool and circuit breaker. A gateway posts status events to
+/payments/webhooks/<slug>/, where the slug is the slugified payment
+method (e.g. `credit-card`).
+"""
+
+import functools
+
+from django.conf import settings
+from django.utils.text import slugify
+from django.utils.module_loading import import_string
+
+from .base import (
+    CircuitBreaker,
+    GatewayError,
+    GatewayUnavailable,
+    PaymentDeclined,
+    PaymentGateway,
+    WebhookError,
+)
+
+__all__ = [
+    "CircuitBreaker",
+    "GatewayError",
+    "GatewayUnavailable",
+    "PaymentDeclined",
+    "PaymentGateway",
+    "WebhookError",
+    "get_gateway",
+    "get_gateway_by_slug",
+]
+
+
+@functools.cache
+def get_gateway(method):
+    """
+    Returns the gateway of a payment method.
+    """
+    try:
+        config = settings.PAYMENT_GATEWAYS[method]
+    except KeyError:
+        raise GatewayError(f"No payment gateway configured for {method!r}.")
+    return import_string(config["BACKEND"])(method, config)
+
+
+def get_gateway_by_slug(slug):
+    """
+    Returns the gateway whose slugified payment method is `slug`.
+    """
+    for method in settings.PAYMENT_GATEWAYS:
+        if slugify(method) == slug:
+            return get_gateway(method)
+    raise GatewayError(f"No payment gateway configured for {slug!r}.")
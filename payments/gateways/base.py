@@ -0,0 +1,120 @@
+import threading
+import time
+
+
+class GatewayError(Exception):
+    """
+    The gateway rejected the request (bad credentials, invalid data...).
+    """
+
+
+class GatewayUnavailable(GatewayError):
+    """
+    The gateway could not be reached, timed out, failed, or its circuit is
+    open. The outcome of the call is unknown: the charge may have gone
+    through.
+    """
+
+
+class PaymentDeclined(GatewayError):
+    """
+    The gateway declined the payment.
+    """
+
+    def __init__(self, message, transaction_id=None):
+        super().__init__(message)
+        self.transaction_id = transaction_id
+
+
+class WebhookError(Exception):
+    """
+    A webhook delivery is malformed or its signature is invalid.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing gateway for a while.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls fail immediately instead of tying up a worker until they time
+    out. After `reset_timeout` seconds one trial call is let through: its
+    success closes the circuit, its failure opens it again.
+
+    The state is per process, which is enough to shed load quickly.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """
+        Returns whether a call may be made now.
+        """
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Half open: let this call through, hold the others back
+                # until it reports.
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class PaymentGateway:
+    """
+    Base class of the payment gateway adapters.
+
+    An adapter is created once per process for a payment method, with the
+    method's entry of settings.PAYMENT_GATEWAYS as `config`. Its calls are
+    coroutines, so that a request waiting on the gateway doesn't hold a
+    worker thread.
+    """
+
+    def __init__(self, method, config):
+        self.method = method
+        self.config = config
+        self.breaker = CircuitBreaker(
+            config.get("FAILURE_THRESHOLD", 5), config.get("RESET_TIMEOUT", 30)
+        )
+
+    async def charge(self, amount, currency, reference, idempotency_key):
+        """
+        Charges `amount` and returns the gateway's transaction id.
+
+        Raises PaymentDeclined, GatewayUnavailable or GatewayError. Calls
+        repeated with the same `idempotency_key` charge only once.
+        """
+        raise NotImplementedError
+
+    async def refund(self, transaction_id):
+        """
+        Refunds a charge in full.
+        """
+        raise NotImplementedError
+
+    def parse_webhook(self, headers, body):
+        """
+        Verifies a webhook delivery and returns its events, as dicts with
+        `id`, `transaction_id`, `status` (the Payment status the event
+        reports, None for other kinds of events) and `payload`.
+
+        Raises WebhookError for unsigned or malformed deliveries.
+        """
+        raise NotImplementedError
@@ -0,0 +1,249 @@
+import asyncio
+import contextlib
+import hashlib
+import hmac
+import json
+import time
+
+import httpx
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import (
+    GatewayError,
+    GatewayUnavailable,
+    PaymentDeclined,
+    PaymentGateway,
+    WebhookError,
+)
+
+SIGNATURE_HEADER = "Gateway-Signature"
+
+# The event loop of the ASGI application and the gateways with a
+# connection pool on it (see open_connection_pools()).
+_app_loop = None
+_pooled_gateways = []
+
+# The Payment status reported by each kind of webhook event.
+EVENT_STATUSES = {
+    "charge.succeeded": "Completed",
+    "charge.failed": "Failed",
+    "charge.refunded": "Refunded",
+}
+
+
+def sign_webhook(secret, body, timestamp=None):
+    """
+    Returns the signature header of a webhook body: `t=<unix time>,v1=<hex>`
+    where v1 is the HMAC-SHA256 of "<t>.<body>" keyed with the secret.
+    """
+    timestamp = int(time.time() if timestamp is None else timestamp)
+    digest = hmac.new(
+        secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256
+    ).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def verify_webhook(secret, header, body, tolerance):
+    """
+    Checks a signature made by sign_webhook(), no older than `tolerance`
+    seconds (so captured deliveries can't be replayed later).
+    """
+    if not secret:
+        raise WebhookError("No webhook secret configured.")
+    try:
+        parts = dict(part.split("=", 1) for part in header.split(","))
+        timestamp = int(parts["t"])
+        signature = parts["v1"]
+    except (KeyError, ValueError):
+        raise WebhookError("Missing or malformed signature.")
+    if abs(time.time() - timestamp) > tolerance:
+        raise WebhookError("Signature timestamp out of tolerance.")
+    expected = sign_webhook(secret, body, timestamp).split("v1=", 1)[1]
+    if not hmac.compare_digest(expected, signature):
+        raise WebhookError("Invalid signature.")
+
+
+def open_connection_pools():
+    """
+    Lets gateways pool connections on the running event loop.
+
+    Called by the ASGI application when it starts (see
+    ecommerce_api/asgi.py): an ASGI server runs every request of a process
+    on that one loop, so a pool lives as long as the process.
+    """
+    global _app_loop
+    _app_loop = asyncio.get_running_loop()
+
+
+async def close_connection_pools():
+    """
+    Closes the gateways' connection pools, when the ASGI application stops.
+    """
+    global _app_loop
+    while _pooled_gateways:
+        gateway = _pooled_gateways.pop()
+        client, gateway._client = gateway._client, None
+        await client.aclose()
+    _app_loop = None
+
+
+@contextlib.asynccontextmanager
+async def connection_pools():
+    """
+    Opens the gateways' connection pools for the duration of the block,
+    for code calling a gateway outside of the ASGI application (jobs).
+    """
+    open_connection_pools()
+    try:
+        yield
+    finally:
+        await close_connection_pools()
+
+
+class HttpGateway(PaymentGateway):
+    """
+    A gateway with a JSON API:
+
+        POST {BASE_URL}/charges               {amount, currency, reference}
+        POST {BASE_URL}/charges/{id}/refund
+
+    answering `{"id": ..., "status": ...}`, with 402 for declined payments.
+    Webhook deliveries carry `{"events": [{"id", "type", "charge"}, ...]}`
+    signed with sign_webhook(). This is the API of the stub gateway
+    (`manage.py run_stub_gateway`); adapters for other providers subclass
+    it and override charge(), refund() and parse_webhook().
+
+    Connections are pooled by one httpx.AsyncClient per process, opened on
+    the event loop of the ASGI application and closed when it stops.
+    Outside of ASGI (runserver, WSGI servers) every request runs on an
+    event loop of its own, which would leave a pool with open sockets
+    behind each request: calls fail with ImproperlyConfigured instead.
+    Jobs open and close a pool around their calls with connection_pools().
+    """
+
+    def __init__(self, method, config):
+        super().__init__(method, config)
+        self._client = None
+
+    def build_client(self):
+        api_key = self.config.get("API_KEY")
+        return httpx.AsyncClient(
+            base_url=self.config["BASE_URL"],
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else {},
+            timeout=httpx.Timeout(
+                self.config.get("TIMEOUT", 10),
+                connect=self.config.get("CONNECT_TIMEOUT", 2),
+            ),
+            limits=httpx.Limits(
+                max_connections=self.config.get("MAX_CONNECTIONS", 100),
+                max_keepalive_connections=self.config.get(
+                    "MAX_KEEPALIVE_CONNECTIONS", 20
+                ),
+            ),
+        )
+
+    def client(self):
+        """
+        Returns the connection pool of the gateway.
+        """
+        if _app_loop is None or asyncio.get_running_loop() is not _app_loop:
+            raise ImproperlyConfigured(
+                f"The {self.method} gateway can only be called from the ASGI "
+                "application (e.g. `uvicorn ecommerce_api.asgi:application`) "
+                "or inside connection_pools()."
+            )
+        if self._client is None:
+            self._client = self.build_client()
+            _pooled_gateways.append(self)
+        return self._client
+
+    def read_json(self, response):
+        """
+        Returns the JSON object of a response, or raises `GatewayUnavailable`
+        (the outcome of the call can't be known) if there is none.
+        """
+        content_type = response.headers.get("Content-Type", "")
+        try:
+            if not content_type.startswith("application/json"):
+                raise ValueError(f"Content-Type {content_type!r}")
+            data = response.json()
+            if not isinstance(data, dict):
+                raise ValueError("not a JSON object")
+        except ValueError as exc:
+            raise GatewayUnavailable(
+                f"{self.method} gateway answered {response.status_code} "
+                f"with an unreadable body ({exc})."
+            ) from exc
+        return data
+
+    async def post(self, path, data, idempotency_key=None):
+        """
+        Sends a request through the circuit breaker. Returns the response.
+        """
+        if not self.breaker.allow():
+            raise GatewayUnavailable(f"{self.method} gateway circuit is open.")
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+        try:
+            response = await self.client().post(path, json=data, headers=headers)
+        except httpx.TransportError as exc:
+            self.breaker.record_failure()
+            raise GatewayUnavailable(f"{self.method} gateway: {exc!r}") from exc
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            raise GatewayUnavailable(
+                f"{self.method} gateway answered {response.status_code}."
+            )
+        self.breaker.record_success()
+        return response
+
+    async def charge(self, amount, currency, reference, idempotency_key):
+        response = await self.post(
+            "/charges",
+            {"amount": str(amount), "currency": currency, "reference": reference},
+            idempotency_key,
+        )
+        if response.status_code == 402:
+            try:
+                data = self.read_json(response)
+            except GatewayUnavailable:
+                # Declined all the same; only the details are missing.
+                data = {}
+            raise PaymentDeclined(data.get("reason", "declined"), data.get("id"))
+        if response.status_code != 200:
+            raise GatewayError(
+                f"{self.method} gateway answered {response.status_code}."
+            )
+        transaction_id = self.read_json(response).get("id")
+        if not transaction_id:
+            raise GatewayUnavailable(
+                f"{self.method} gateway answered 200 without a charge id."
+            )
+        return str(transaction_id)
+
+    async def refund(self, transaction_id):
+        response = await self.post(f"/charges/{transaction_id}/refund", {})
+        if response.status_code != 200:
+            raise GatewayError(
+                f"{self.method} gateway answered {response.status_code}."
+            )
+
+    def parse_webhook(self, headers, body):
+        verify_webhook(
+            self.config.get("WEBHOOK_SECRET"),
+            headers.get(SIGNATURE_HEADER, ""),
+            body,
+            self.config.get("WEBHOOK_TOLERANCE", 300),
+        )
+        try:
+            data = json.loads(body)
+            return [
+                {
+                    "id": str(event["id"]),
+                    "transaction_id": str(event["charge"]),
+                    "status": EVENT_STATUSES.get(event.get("type")),
+                    "payload": event,
+                }
+                for event in data["events"]
+            ]
+        except (ValueError, TypeError, KeyError):
+            raise WebhookError("Malformed webhook body.")
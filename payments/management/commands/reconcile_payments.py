@@ -0,0 +1,286 @@
+import csv
+import datetime
+import decimal
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date, parse_datetime
+
+from ecommerce_api.dates import start_of_day
+from payments.models import ArchivedPayment, Payment
+
+# Settlement statuses as gateways write them, and the Payment status each
+# one means. Statuses not listed are compared as they are.
+SETTLEMENT_STATUSES = {
+    "settled": "Completed",
+    "succeeded": "Completed",
+    "completed": "Completed",
+    "paid": "Completed",
+    "refunded": "Refunded",
+    "failed": "Failed",
+    "declined": "Failed",
+    "pending": "Pending",
+}
+
+FIELDS = ("id", "order_id", "transaction_id", "amount", "status")
+
+OUTPUT_COLUMNS = [
+    "line",
+    "transaction_id",
+    "problem",
+    "settled",
+    "recorded",
+    "payment_id",
+    "order_id",
+]
+
+
+class Command(BaseCommand):
+    """
+    Checks a gateway settlement file against the recorded payments.
+
+    The file is a CSV with `transaction_id`, `amount` and `status`
+    columns. It is read as a stream, a chunk of lines at a time: the
+    payments of a chunk are fetched with one in_bulk() query on the
+    unique transaction id (the archive is searched for the ones not
+    found) and the lines are matched against that dict, so the work is
+    a couple of queries per chunk.
+
+    Every mismatch is written as a CSV line: `missing` (settled but not
+    recorded), `amount` or `status` (recorded differently), or `invalid`
+    (unreadable line).
+
+    Recorded payments the file doesn't list are reported too, as
+    `unlisted`: once the file is read, the payments with a transaction id
+    created in the file's date range (the days of its optional `date`
+    column, or --from and --to) are walked in chunks and checked against
+    the transaction ids seen. Those ids are all that is kept of the file,
+    so memory grows by one short string per line, not by whole lines.
+    Without a date range there is no such check.
+    """
+
+    help = "Compare a settlement CSV (use '-' for stdin) with the recorded payments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Settlement file, or '-' to read stdin.")
+        parser.add_argument(
+            "--output",
+            default="-",
+            help="Where to write the mismatches (CSV). Defaults to stdout.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Lines matched per query.",
+        )
+        parser.add_argument(
+            "--from",
+            dest="from_date",
+            type=datetime.date.fromisoformat,
+            help="First day (YYYY-MM-DD) the file covers. Defaults to its first date.",
+        )
+        parser.add_argument(
+            "--to",
+            dest="to_date",
+            type=datetime.date.fromisoformat,
+            help="Last day (YYYY-MM-DD) the file covers. Defaults to its last date.",
+        )
+        parser.add_argument(
+            "--method",
+            choices=[method for method, _ in Payment.PAYMENT_METHOD_CHOICES],
+            help="Only look for unlisted payments of this payment method, "
+            "the one whose gateway wrote the file.",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+
+        started = time.monotonic()
+        source = (
+            sys.stdin
+            if options["path"] == "-"
+            else open(options["path"], newline="", encoding="utf-8")
+        )
+        output = (
+            sys.stdout
+            if options["output"] == "-"
+            else open(options["output"], "w", newline="", encoding="utf-8")
+        )
+        # Keep the summary out of the mismatch CSV when both go to stdout.
+        log = self.stderr if output is sys.stdout else self.stdout
+        try:
+            reader = csv.DictReader(source)
+            missing_columns = {"transaction_id", "amount", "status"} - set(
+                reader.fieldnames or ()
+            )
+            if missing_columns:
+                raise CommandError(
+                    f"Missing columns: {', '.join(sorted(missing_columns))}."
+                )
+            self.writer = csv.DictWriter(output, OUTPUT_COLUMNS)
+            self.writer.writeheader()
+            self.lines = self.mismatches = 0
+            self.seen = set()
+            self.first_date = self.last_date = None
+
+            chunk = []
+            for row in reader:
+                chunk.append((reader.line_num, row))
+                if len(chunk) >= options["chunk_size"]:
+                    self.reconcile(chunk)
+                    chunk = []
+            self.reconcile(chunk)
+
+            first_date = options["from_date"] or self.first_date
+            last_date = options["to_date"] or self.last_date
+            if first_date and last_date:
+                self.report_unlisted(
+                    first_date, last_date, options["method"], options["chunk_size"]
+                )
+            else:
+                log.write(
+                    self.style.WARNING(
+                        "No date range (no `date` column, --from or --to): "
+                        "recorded payments missing from the file weren't looked for."
+                    )
+                )
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if output is not sys.stdout:
+                output.close()
+
+        elapsed = time.monotonic() - started
+        rate = self.lines / elapsed if elapsed else 0
+        style = self.style.WARNING if self.mismatches else self.style.SUCCESS
+        log.write(
+            style(
+                f"Checked {self.lines} settlement lines, found {self.mismatches} "
+                f"mismatches in {elapsed:.1f}s ({rate:.0f} lines/s)."
+            )
+        )
+
+    def fetch_payments(self, transaction_ids):
+        """
+        Returns the payments (hot or archived) of the given transaction
+        ids, keyed by transaction id.
+        """
+        payments = Payment.objects.only(*FIELDS).in_bulk(
+            transaction_ids, field_name="transaction_id"
+        )
+        missing = set(transaction_ids) - payments.keys()
+        if missing:
+            # The archive has no unique index on transaction_id, so no in_bulk().
+            for payment in ArchivedPayment.objects.filter(
+                transaction_id__in=missing
+            ).only(*FIELDS):
+                payments[payment.transaction_id] = payment
+        return payments
+
+    def reconcile(self, chunk):
+        """
+        Matches a chunk of settlement lines against the payments.
+        """
+        if not chunk:
+            return
+        self.lines += len(chunk)
+        transaction_ids = {(row["transaction_id"] or "").strip() for _, row in chunk}
+        transaction_ids.discard("")
+        self.seen |= transaction_ids
+        payments = self.fetch_payments(list(transaction_ids))
+        for line, row in chunk:
+            transaction_id = (row["transaction_id"] or "").strip()
+            status = (row["status"] or "").strip()
+            status = SETTLEMENT_STATUSES.get(status.lower(), status)
+            try:
+                amount = decimal.Decimal(row["amount"])
+            except (decimal.InvalidOperation, TypeError):
+                self.report(line, transaction_id, "invalid", row["amount"])
+                continue
+            if not transaction_id:
+                self.report(line, transaction_id, "invalid", "no transaction id")
+                continue
+            if not self.track_date(row.get("date")):
+                self.report(line, transaction_id, "invalid", row["date"])
+                continue
+
+            payment = payments.get(transaction_id)
+            if payment is None:
+                self.report(line, transaction_id, "missing", f"{amount} {status}")
+                continue
+            if amount != payment.amount:
+                self.report(
+                    line, transaction_id, "amount", amount, payment.amount, payment
+                )
+            if status != payment.status:
+                self.report(
+                    line, transaction_id, "status", status, payment.status, payment
+                )
+
+    def track_date(self, value):
+        """
+        Widens the file's date range to a line's `date` (a date or a
+        datetime). Returns False if the date can't be read.
+        """
+        value = (value or "").strip()
+        if not value:
+            return True
+        try:
+            date = parse_date(value)
+            if date is None:
+                date = parse_datetime(value)
+                date = date and date.date()
+        except ValueError:
+            date = None
+        if date is None:
+            return False
+        if self.first_date is None or date < self.first_date:
+            self.first_date = date
+        if self.last_date is None or date > self.last_date:
+            self.last_date = date
+        return True
+
+    def report_unlisted(self, first_date, last_date, method, chunk_size):
+        """
+        Reports the recorded payments (hot or archived) created from
+        first_date to last_date whose transaction id the file didn't list.
+        """
+        start = start_of_day(first_date)
+        end = start_of_day(last_date + datetime.timedelta(days=1))
+        for model in (Payment, ArchivedPayment):
+            payments = (
+                model.objects.filter(created_at__gte=start, created_at__lt=end)
+                .exclude(transaction_id__isnull=True)
+                .exclude(transaction_id="")
+                .only(*FIELDS)
+                .order_by("pk")
+            )
+            if method:
+                payments = payments.filter(payment_method=method)
+            for payment in payments.iterator(chunk_size=chunk_size):
+                if payment.transaction_id not in self.seen:
+                    self.report(
+                        "",
+                        payment.transaction_id,
+                        "unlisted",
+                        "",
+                        f"{payment.amount} {payment.status}",
+                        payment,
+                    )
+
+    def report(self, line, transaction_id, problem, settled, recorded="", payment=None):
+        self.mismatches += 1
+        self.writer.writerow(
+            {
+                "line": line,
+                "transaction_id": transaction_id,
+                "problem": problem,
+                "settled": settled,
+                "recorded": recorded,
+                "payment_id": payment.pk if payment else "",
+                "order_id": payment.order_id if payment else "",
+            }
+        )
@@ -0,0 +1,232 @@
+import json
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from payments.gateways.http import SIGNATURE_HEADER, sign_webhook
+
+CHARGE_PATH = re.compile(r"/charges$")
+REFUND_PATH = re.compile(r"/charges/(?P<id>[\w-]+)/refund$")
+
+
+class StubGatewayHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so clients can reuse their connections as with a real gateway.
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            data = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self.send_json(400, {"error": "invalid JSON"})
+
+        server = self.server
+        time.sleep(max(0.0, random.gauss(server.latency, server.latency / 4)))
+        if random.random() < server.error_rate:
+            return self.send_json(500, {"error": "internal error"})
+
+        # Any prefix works, e.g. /credit-card/charges and /paypal/charges.
+        match = CHARGE_PATH.search(self.path)
+        if match:
+            return self.charge(self.path[: match.start()].strip("/"), data)
+        match = REFUND_PATH.search(self.path)
+        if match:
+            return self.refund(self.path[: match.start()].strip("/"), match["id"])
+        return self.send_json(404, {"error": "not found"})
+
+    def charge(self, prefix, data):
+        server = self.server
+        key = self.headers.get("Idempotency-Key")
+        with server.lock:
+            if key and key in server.replies:
+                return self.send_json(*server.replies[key])
+            charge_id = f"ch_{uuid.uuid4().hex}"
+            if random.random() < server.decline_rate:
+                reply = (
+                    402,
+                    {"id": charge_id, "status": "declined", "reason": "card_declined"},
+                )
+                server.emit(prefix, "charge.failed", charge_id)
+            else:
+                reply = (200, {"id": charge_id, "status": "succeeded", **data})
+                server.charges[charge_id] = "succeeded"
+                server.emit(prefix, "charge.succeeded", charge_id)
+            if key:
+                server.replies[key] = reply
+        self.send_json(*reply)
+
+    def refund(self, prefix, charge_id):
+        server = self.server
+        with server.lock:
+            if charge_id not in server.charges:
+                return self.send_json(404, {"error": "no such charge"})
+            server.charges[charge_id] = "refunded"
+        server.emit(prefix, "charge.refunded", charge_id)
+        self.send_json(200, {"id": charge_id, "status": "refunded"})
+
+
+class StubGatewayServer(ThreadingHTTPServer):
+    """
+    Keeps the stub's state and delivers its webhook events.
+
+    Events are posted in batches to `<webhook_url>/<prefix>/`, like real
+    gateways deliver them: at least once (a share of them twice) and
+    again later when the delivery fails.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, options):
+        super().__init__(address, StubGatewayHandler)
+        self.latency = options["latency"]
+        self.decline_rate = options["decline_rate"]
+        self.error_rate = options["error_rate"]
+        self.verbose = options["verbose_requests"]
+        self.webhook_url = options["webhook_url"]
+        self.webhook_secret = options["webhook_secret"]
+        self.duplicate_rate = options["duplicate_rate"]
+        self.webhook_batch_size = options["webhook_batch_size"]
+        self.lock = threading.Lock()
+        self.charges = {}
+        self.replies = {}
+        self.events = queue.Queue()
+
+    def emit(self, prefix, kind, charge_id):
+        if not self.webhook_url:
+            return
+        event = {
+            "id": f"evt_{uuid.uuid4().hex}",
+            "type": kind,
+            "charge": charge_id,
+            "created": int(time.time()),
+        }
+        self.events.put((prefix, event))
+        if random.random() < self.duplicate_rate:
+            self.events.put((prefix, event))
+
+    def deliver_events(self):
+        with httpx.Client(timeout=10) as client:
+            while True:
+                time.sleep(0.2)
+                batches = {}
+                while not self.events.empty():
+                    prefix, event = self.events.get()
+                    batches.setdefault(prefix, []).append(event)
+                for prefix, events in batches.items():
+                    for start in range(0, len(events), self.webhook_batch_size):
+                        self.post_events(
+                            client,
+                            prefix,
+                            events[start : start + self.webhook_batch_size],
+                        )
+
+    def post_events(self, client, prefix, events):
+        body = json.dumps({"events": events}).encode()
+        try:
+            response = client.post(
+                f"{self.webhook_url.rstrip('/')}/{prefix}/",
+                content=body,
+                headers={
+                    "Content-Type": "application/json",
+                    SIGNATURE_HEADER: sign_webhook(self.webhook_secret, body),
+                },
+            )
+            delivered = response.status_code == 200
+        except httpx.HTTPError:
+            delivered = False
+        if not delivered:
+            for event in events:
+                self.events.put((prefix, event))
+
+
+class Command(BaseCommand):
+    """
+    Runs a local stand-in for the payment gateways.
+
+    It speaks the API of payments.gateways.http.HttpGateway, which the
+    default settings.PAYMENT_GATEWAYS point at, so the payment flow can be
+    exercised and load-tested without network access or provider
+    accounts. Latency, declines and server errors are simulated; repeated
+    Idempotency-Keys get the first reply back. With --webhook-url, status
+    events are posted to the site's webhooks, with duplicates. State lives
+    in memory only.
+    """
+
+    help = "Run a local stub payment gateway."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument(
+            "--latency", type=float, default=0.2, help="Mean response time in seconds."
+        )
+        parser.add_argument(
+            "--decline-rate",
+            type=float,
+            default=0.0,
+            help="Share of charges declined (0 to 1).",
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.0,
+            help="Share of requests answered with a 500 (0 to 1).",
+        )
+        parser.add_argument(
+            "--webhook-url",
+            help="Base URL of the webhooks, e.g. http://127.0.0.1:8000/payments/webhooks",
+        )
+        parser.add_argument(
+            "--webhook-secret", default=settings.PAYMENT_GATEWAY_STUB_SECRET
+        )
+        parser.add_argument(
+            "--duplicate-rate",
+            type=float,
+            default=0.1,
+            help="Share of webhook events delivered twice (0 to 1).",
+        )
+        parser.add_argument(
+            "--webhook-batch-size",
+            type=int,
+            default=100,
+            help="Events per webhook delivery.",
+        )
+        parser.add_argument(
+            "--verbose-requests", action="store_true", help="Log every request."
+        )
+
+    def handle(self, *args, **options):
+        server = StubGatewayServer((options["host"], options["port"]), options)
+        if server.webhook_url:
+            threading.Thread(target=server.deliver_events, daemon=True).start()
+
+        self.stdout.write(
+            f"Stub payment gateway listening on "
+            f"http://{options['host']}:{options['port']}/"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0002_archivedpayment"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaymentEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "gateway",
+                    models.CharField(
+                        choices=[
+                            ("Credit Card", "Credit Card"),
+                            ("PayPal", "PayPal"),
+                            ("Stripe", "Stripe"),
+                        ],
+                        max_length=50,
+                    ),
+                ),
+                ("event_id", models.CharField(max_length=100)),
+                ("transaction_id", models.CharField(max_length=100)),
+                (
+                    "status",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("Pending", "Pending"),
+                            ("Completed", "Completed"),
+                            ("Failed", "Failed"),
+                            ("Refunded", "Refunded"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("payload", models.JSONField()),
+                ("received_at", models.DateTimeField(auto_now_add=True)),
+                ("processed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "db_table": "PaymentEvents",
+                "indexes": [
+                    models.Index(
+                        fields=["processed_at", "id"],
+                        name="PaymentEven_process_c82aab_idx",
+                    ),
+                    models.Index(
+                        fields=["transaction_id"], name="PaymentEven_transac_d78e03_idx"
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("gateway", "event_id"), name="unique_payment_event"
+                    )
+                ],
+            },
+        ),
+    ]
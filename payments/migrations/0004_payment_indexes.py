@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0006_order_archive"),
+        ("payments", "0003_payment_events"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="Payments_created_b9fd54_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["status", "-created_at", "-id"],
+                name="Payments_status_3a872f_idx",
+            ),
+        ),
+    ]
@@ -46,19 +46,111 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Relations followed by __str__, selected up front by the API query planner.
+    STR_RELATED_FIELDS = ("order",)
+
     class Meta:
         """
         Meta options for the Payment model.
 
         - db_table: Sets a custom table name in the database.
         - ordering: Sets the default sort order for payments to be by creation date.
+        - indexes: Support the newest-first keyset pagination of the payments
+          API, both unfiltered and filtered by status.
         """
 
         db_table = "Payments"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"]),
+            models.Index(fields=["status", "-created_at", "-id"]),
+        ]
 
     def __str__(self):
         """
         Returns a human-readable string representation of the payment.
         """
         return f"Payment for Order #{self.order.id} - ${self.amount} - {self.status}"
+
+
+class ArchivedPayment(models.Model):
+    """
+    The payment of an archived order, with the columns of Payment.
+
+    Moved here together with its order by `manage.py archive_orders`.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    order = models.OneToOneField(
+        "orders.ArchivedOrder", on_delete=models.CASCADE, related_name="payment"
+    )
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    payment_method = models.CharField(
+        max_length=50, choices=Payment.PAYMENT_METHOD_CHOICES, default="Credit Card"
+    )
+    transaction_id = models.CharField(max_length=100, blank=True, null=True)
+    status = models.CharField(max_length=20, choices=Payment.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "ArchivedPayments"
+
+    def __str__(self):
+        return f"Payment for Order #{self.order_id} - ${self.amount} - {self.status}"
+
+
+class PaymentEvent(models.Model):
+    """
+    A status event sent by a payment gateway to the webhook.
+
+    Events are recorded as received and never changed, except for
+    `processed_at`, set once the event was applied to its payment (see
+    payments/events.py). Gateways deliver events at least once, so the
+    same event may arrive several times: the unique (gateway, event_id)
+    pair keeps one row per event.
+
+    Attributes:
+        gateway (CharField): The payment method whose gateway sent the event.
+        event_id (CharField): The gateway's id of the event.
+        transaction_id (CharField): The gateway's id of the charge.
+        status (CharField): The payment status the event reports, blank
+            for events of other kinds.
+        payload (JSONField): The event as received.
+        received_at (DateTimeField): When the webhook received the event.
+        processed_at (DateTimeField): When the event was applied.
+    """
+
+    gateway = models.CharField(max_length=50, choices=Payment.PAYMENT_METHOD_CHOICES)
+    event_id = models.CharField(max_length=100)
+    transaction_id = models.CharField(max_length=100)
+    status = models.CharField(
+        max_length=20, choices=Payment.STATUS_CHOICES, blank=True
+    )
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        """
+        Meta options for the PaymentEvent model.
+
+        - db_table: Sets a custom table name in the database.
+        - constraints: One row per gateway event, however often it is delivered.
+        - indexes: Support finding the events still to apply and the
+          events of a charge.
+        """
+
+        db_table = "PaymentEvents"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["gateway", "event_id"], name="unique_payment_event"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["processed_at", "id"]),
+            models.Index(fields=["transaction_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.gateway} event {self.event_id} ({self.status or 'ignored'})"
@@ -0,0 +1,85 @@
+"""
+The database side of a payment attempt.
+
+The gateway is called outside of any transaction, between
+start_payment() and complete_payment() / fail_payment(), so that no row
+stays locked while the gateway answers.
+
+An order has a single Payment row, shared by all its attempts (a retry
+after a decline, a double submit, a second tab). Once an attempt has
+completed the payment, the others never touch the row again: they can
+only find out that their own charge, if it differs, must be refunded.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from orders.reservations import convert_hold
+
+from .models import Payment
+
+
+def start_payment(order, method):
+    """
+    Creates the order's payment, or resets it for a new attempt, as Pending.
+
+    Returns None if the payment was already completed by another attempt.
+    """
+    values = {
+        "amount": order.total_amount,
+        "payment_method": method,
+        "status": "Pending",
+        "transaction_id": None,
+    }
+    payment, created = Payment.objects.get_or_create(order=order, defaults=values)
+    if created:
+        return payment
+    reset = (
+        Payment.objects.filter(pk=payment.pk)
+        .exclude(status="Completed")
+        .update(updated_at=timezone.now(), **values)
+    )
+    if not reset:
+        return None
+    for name, value in values.items():
+        setattr(payment, name, value)
+    return payment
+
+
+def complete_payment(payment, transaction_id):
+    """
+    Records a successful charge and turns the order's stock hold into a sale.
+
+    Returns False if the charge must be refunded: either the hold expired
+    while the gateway was charging (the payment is then marked Failed), or
+    another attempt already paid the order with a different charge (the
+    payment is left as that attempt recorded it).
+    """
+    with transaction.atomic():
+        if convert_hold(payment.order):
+            payment.status = "Completed"
+            payment.transaction_id = transaction_id
+            payment.save(update_fields=["status", "transaction_id", "updated_at"])
+            return True
+        recorded = Payment.objects.select_for_update().get(pk=payment.pk)
+        if recorded.status == "Completed":
+            # Same charge (a replay of the winning attempt's key) or another one.
+            return recorded.transaction_id == transaction_id
+        payment.status = "Failed"
+        payment.transaction_id = transaction_id
+        payment.save(update_fields=["status", "transaction_id", "updated_at"])
+    return False
+
+
+def fail_payment(payment, status="Failed", transaction_id=None):
+    """
+    Records a declined (or refunded) attempt. The order keeps its hold, so
+    the customer can try again until it expires.
+
+    A payment completed by another attempt in the meantime is left alone.
+    """
+    Payment.objects.filter(pk=payment.pk).exclude(status="Completed").update(
+        status=status, transaction_id=transaction_id, updated_at=timezone.now()
+    )
+    payment.status = status
+    payment.transaction_id = transaction_id
@@ -1,13 +1,15 @@
 from rest_framework import serializers
 from .models import Payment
+from ecommerce_api.serializers import SparseFieldsetsMixin
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """
     Serializer for the Payment model.
 
     Handles the conversion of Payment model instances to JSON format for API
     responses and validates incoming data for creating or updating payments.
+    Read requests can pick fields with `?fields=` / `?omit=`.
     """
 
     # To make the API response more readable, we can display the order's
@@ -0,0 +1,59 @@
+import asyncio
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from jobs.queue import enqueue, enqueue_once, task
+
+from .events import APPLY_EVENTS_JOB, REFUND_PAYMENT_JOB, apply_pending_batch
+from .gateways import get_gateway
+from .gateways.http import connection_pools
+from .models import Payment
+
+
+@task(APPLY_EVENTS_JOB)
+def apply_events(after=0):
+    """
+    Applies a batch of pending webhook events, and queues the next batch
+    as a job of its own so that this one commits right away. Events
+    waiting for their payment are tried again a little later.
+    """
+    next_after, waiting = apply_pending_batch(after)
+    if next_after is not None:
+        enqueue(APPLY_EVENTS_JOB, after=next_after)
+    if waiting:
+        enqueue_once(
+            APPLY_EVENTS_JOB,
+            run_at=timezone.now()
+            + datetime.timedelta(seconds=settings.PAYMENT_EVENT_RETRY_DELAY),
+        )
+
+
+async def _refund(gateway, transaction_id):
+    async with connection_pools():
+        await gateway.refund(transaction_id)
+
+
+@task(REFUND_PAYMENT_JOB)
+def refund_payment(payment_id):
+    """
+    Refunds a completed payment whose order was cancelled in the meantime.
+
+    Does nothing if the payment was refunded or its order revived since.
+    A gateway error fails the job, which is then retried; one that keeps
+    failing is left failed in the job queue for staff to look at.
+    """
+    payment = (
+        Payment.objects.filter(
+            pk=payment_id, status="Completed", order__status="Cancelled"
+        )
+        .only("id", "payment_method", "transaction_id")
+        .first()
+    )
+    if payment is None:
+        return
+    asyncio.run(_refund(get_gateway(payment.payment_method), payment.transaction_id))
+    Payment.objects.filter(pk=payment.pk, status="Completed").update(
+        status="Refunded", updated_at=timezone.now()
+    )
@@ -1,3 +1,460 @@
-from django.test import TestCase
+import csv
+import datetime
+import json
+import os
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ecommerce_api.asgi import application
+from jobs.models import Job
+from orders.models import Order
+from orders.reservations import PENDING_PAYMENT, hold_expiry
+from users.models import Users
+
+from .events import REFUND_PAYMENT_JOB
+from .gateways import GatewayError, GatewayUnavailable, PaymentDeclined, WebhookError
+from .gateways.http import (
+    HttpGateway,
+    close_connection_pools,
+    open_connection_pools,
+    sign_webhook,
+    verify_webhook,
+)
+from .models import ArchivedPayment, Payment, PaymentEvent
+from .processing import complete_payment, fail_payment, start_payment
+
+
+class PaymentTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Users.objects.create_user(
+            username="customer", email="customer@example.com", password="x"
+        )
+
+    def held_order(self):
+        return Order.objects.create(
+            user=self.customer,
+            total_amount=10,
+            status=PENDING_PAYMENT,
+            hold_expires_at=hold_expiry(),
+            stock_reserved=True,
+        )
+
+
+class HttpGatewayTests(SimpleTestCase):
+    def gateway(self, status, body=b"", content_type="application/json"):
+        def handler(request):
+            return httpx.Response(
+                status, content=body, headers={"Content-Type": content_type}
+            )
+
+        gateway = HttpGateway("Stripe", {"BASE_URL": "http://gateway.test"})
+        gateway.build_client = lambda: httpx.AsyncClient(
+            base_url="http://gateway.test", transport=httpx.MockTransport(handler)
+        )
+        return gateway
+
+    async def charge(self, gateway):
+        open_connection_pools()
+        try:
+            return await gateway.charge(10, "USD", "order-1", "key")
+        finally:
+            await close_connection_pools()
+
+    async def test_charge(self):
+        gateway = self.gateway(200, b'{"id": "ch_1", "status": "succeeded"}')
+        self.assertEqual(await self.charge(gateway), "ch_1")
+
+    async def test_declined(self):
+        gateway = self.gateway(402, b'{"id": "ch_1", "reason": "insufficient funds"}')
+        with self.assertRaisesMessage(PaymentDeclined, "insufficient funds"):
+            await self.charge(gateway)
+        gateway = self.gateway(402, b"<html>Declined</html>", "text/html")
+        with self.assertRaisesMessage(PaymentDeclined, "declined"):
+            await self.charge(gateway)
+
+    async def test_rejected_request(self):
+        gateway = self.gateway(400, b"Bad Request", "text/plain")
+        with self.assertRaises(GatewayError) as raised:
+            await self.charge(gateway)
+        self.assertNotIsInstance(raised.exception, GatewayUnavailable)
+
+    async def test_unreadable_success_has_an_unknown_outcome(self):
+        for body, content_type in (
+            (b"<html>OK</html>", "text/html"),
+            (b"{not json", "application/json"),
+            (b'{"status": "succeeded"}', "application/json"),
+            (b'["ch_1"]', "application/json"),
+        ):
+            with self.subTest(body=body):
+                with self.assertRaises(GatewayUnavailable):
+                    await self.charge(self.gateway(200, body, content_type))
+
+    async def test_server_errors_are_unavailable(self):
+        with self.assertRaises(GatewayUnavailable):
+            await self.charge(self.gateway(503))
+
+    async def test_calls_outside_the_asgi_application_fail(self):
+        gateway = self.gateway(200, b'{"id": "ch_1"}')
+        with self.assertRaises(ImproperlyConfigured):
+            await gateway.charge(10, "USD", "order-1", "key")
+
+    async def test_lifespan_opens_and_closes_the_pools(self):
+        gateway = self.gateway(200, b'{"id": "ch_1"}')
+        messages = [{"type": "lifespan.startup"}]
+        sent = []
+        used = []
+
+        async def receive():
+            if not messages:
+                # The server shuts down once the gateway has been used.
+                self.assertEqual(
+                    await gateway.charge(10, "USD", "order-1", "key"), "ch_1"
+                )
+                used.append(gateway._client)
+                return {"type": "lifespan.shutdown"}
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        await application({"type": "lifespan"}, receive, send)
+        self.assertEqual(
+            sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        )
+        self.assertTrue(used[0].is_closed)
+        self.assertIsNone(gateway._client)
+
+
+class PaymentApiQueryTests(PaymentTestCase):
+    """
+    The payment API joins the order in the same query: a page costs a
+    fixed number of queries, however many payments it shows.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.payments = [
+            Payment.objects.create(
+                order=self.held_order(), amount=10, payment_method="Stripe"
+            )
+            for _ in range(4)
+        ]
+        self.api = APIClient()
+        self.api.force_authenticate(self.customer)
+
+    def test_list_queries(self):
+        # Validators, count, and the page with its orders.
+        with self.assertNumQueries(3):
+            response = self.api.get("/payments/api/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 4)
+
+    def test_detail_queries(self):
+        # Validators, and the payment with its order.
+        with self.assertNumQueries(2):
+            response = self.api.get(f"/payments/api/{self.payments[0].pk}/")
+        self.assertEqual(response.status_code, 200)
+
+
+class PaymentAttemptTests(PaymentTestCase):
+    def test_completed_payment_converts_the_hold(self):
+        order = self.held_order()
+        payment = start_payment(order, "Stripe")
+        self.assertTrue(complete_payment(payment, "ch_1"))
+        order.refresh_from_db()
+        self.assertEqual(order.status, "Processing")
+        self.assertIsNone(order.hold_expires_at)
+
+    def test_second_attempt_cannot_overwrite_a_completed_payment(self):
+        order = self.held_order()
+        first = start_payment(order, "Stripe")
+        second = start_payment(Order.objects.get(pk=order.pk), "Stripe")
+        self.assertTrue(complete_payment(first, "ch_1"))
+
+        # The second charge went through too: it must be refunded, and
+        # the payment keeps the first one.
+        self.assertFalse(complete_payment(second, "ch_2"))
+        fail_payment(second, "Refunded", "ch_2")
+        payment = Payment.objects.get(order=order)
+        self.assertEqual(
+            (payment.status, payment.transaction_id), ("Completed", "ch_1")
+        )
+        self.assertIsNone(start_payment(order, "Stripe"))
+
+    def test_replayed_completion_is_not_refunded(self):
+        order = self.held_order()
+        payment = start_payment(order, "Stripe")
+        self.assertTrue(complete_payment(payment, "ch_1"))
+        self.assertTrue(complete_payment(payment, "ch_1"))
+
+    def test_payment_after_the_hold_expired_is_refunded(self):
+        order = self.held_order()
+        payment = start_payment(order, "Stripe")
+        Order.objects.filter(pk=order.pk).update(
+            status="Cancelled", hold_expires_at=None
+        )
+        self.assertFalse(complete_payment(payment, "ch_1"))
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, "Failed")
+
+
+class WebhookTests(PaymentTestCase):
+    url = "/payments/webhooks/stripe/"
+
+    def setUp(self):
+        self.payments = {}
+        for index in range(3):
+            payment = start_payment(self.held_order(), "Stripe")
+            Payment.objects.filter(pk=payment.pk).update(transaction_id=f"ch_{index}")
+            self.payments[f"ch_{index}"] = payment
+
+    def deliver(self, *events, secret=settings.PAYMENT_GATEWAY_STUB_SECRET):
+        body = json.dumps(
+            {
+                "events": [
+                    {"id": event_id, "type": kind, "charge": charge}
+                    for event_id, kind, charge in events
+                ]
+            }
+        ).encode()
+        return self.client.post(
+            self.url,
+            body,
+            content_type="application/json",
+            HTTP_GATEWAY_SIGNATURE=sign_webhook(secret, body),
+        )
+
+    def run_jobs(self):
+        call_command("run_workers", "--once", stdout=StringIO())
+
+    def status(self, transaction_id):
+        return Payment.objects.get(transaction_id=transaction_id).status
+
+    def test_signatures_are_checked(self):
+        body = b'{"events": []}'
+        verify_webhook("secret", sign_webhook("secret", body), body, 300)
+        for header in (
+            sign_webhook("other", body),
+            sign_webhook("secret", body, time.time() - 600),
+            "v1=abc",
+        ):
+            with self.subTest(header=header):
+                with self.assertRaises(WebhookError):
+                    verify_webhook("secret", header, body, 300)
+
+        response = self.deliver(("evt_1", "charge.succeeded", "ch_0"), secret="x")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_redelivered_events_are_recorded_once(self):
+        for _ in range(2):
+            response = self.deliver(("evt_1", "charge.succeeded", "ch_0"))
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+        self.assertEqual(Job.objects.filter(status="queued").count(), 1)
+
+    def test_batch_is_applied_in_order_of_status(self):
+        self.deliver(
+            ("evt_1", "charge.refunded", "ch_0"),
+            ("evt_2", "charge.succeeded", "ch_0"),  # Late: stays refunded.
+            ("evt_3", "charge.succeeded", "ch_1"),
+            ("evt_4", "charge.failed", "ch_2"),
+            ("evt_5", "charge.disputed", "ch_2"),  # Not a status change.
+        )
+        with self.settings(PAYMENT_EVENT_BATCH_SIZE=2):
+            self.run_jobs()
+        self.assertEqual(
+            [self.status(f"ch_{index}") for index in range(3)],
+            ["Refunded", "Completed", "Failed"],
+        )
+        self.assertFalse(PaymentEvent.objects.filter(processed_at=None).exists())
+        order = self.payments["ch_1"].order
+        order.refresh_from_db()
+        self.assertEqual(order.status, "Processing")
+
+    def test_completed_payment_of_a_cancelled_order_is_refunded(self):
+        order = self.payments["ch_0"].order
+        Order.objects.filter(pk=order.pk).update(
+            status="Cancelled", hold_expires_at=None
+        )
+        self.deliver(("evt_1", "charge.succeeded", "ch_0"))
+        with mock.patch.object(HttpGateway, "refund") as refund:
+            self.run_jobs()
+        refund.assert_called_once_with("ch_0")
+        self.assertEqual(self.status("ch_0"), "Refunded")
+        order.refresh_from_db()
+        self.assertEqual(order.status, "Cancelled")
+
+    def test_refund_is_retried_and_listed_until_done(self):
+        Order.objects.filter(pk=self.payments["ch_0"].order_id).update(
+            status="Cancelled", hold_expires_at=None
+        )
+        self.deliver(("evt_1", "charge.succeeded", "ch_0"))
+        with mock.patch.object(
+            HttpGateway, "refund", side_effect=GatewayUnavailable("down")
+        ):
+            self.run_jobs()
+        self.assertEqual(self.status("ch_0"), "Completed")
+        job = Job.objects.get(name=REFUND_PAYMENT_JOB)
+        self.assertEqual(job.status, "queued")
+
+        admin = Users.objects.create_superuser(
+            username="admin", email="admin@example.com", password="x"
+        )
+        self.client.force_login(admin)
+        response = self.client.get("/admin/payments/payment/?refund_due=yes")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [payment.transaction_id for payment in response.context["cl"].result_list],
+            ["ch_0"],
+        )
+
+
+class ReconcileTests(PaymentTestCase):
+    def setUp(self):
+        day = timezone.make_aware(datetime.datetime(2025, 1, 31, 12))
+        for index, (status, method) in enumerate(
+            [
+                ("Completed", "Stripe"),
+                ("Completed", "Stripe"),
+                ("Failed", "Stripe"),
+                ("Completed", "PayPal"),
+            ]
+        ):
+            payment = start_payment(self.held_order(), method)
+            Payment.objects.filter(pk=payment.pk).update(
+                transaction_id=f"ch_{index}", status=status, created_at=day
+            )
+        # Created the day after, outside the file's range.
+        payment = start_payment(self.held_order(), "Stripe")
+        Payment.objects.filter(pk=payment.pk).update(
+            transaction_id="ch_late", created_at=day + datetime.timedelta(days=1)
+        )
+
+    def reconcile(self, content, *args):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "settlement.csv")
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            file.write(content)
+        output = os.path.join(directory.name, "mismatches.csv")
+        call_command(
+            "reconcile_payments",
+            path,
+            "--output",
+            output,
+            "--chunk-size",
+            "2",
+            *args,
+            stdout=StringIO(),
+        )
+        with open(output, newline="", encoding="utf-8") as file:
+            return [
+                (row["line"], row["transaction_id"], row["problem"])
+                for row in csv.DictReader(file)
+            ]
+
+    def test_mismatches(self):
+        rows = self.reconcile(
+            "transaction_id,amount,status\n"
+            "ch_0,10.00,settled\n"
+            "ch_1,12.00,settled\n"
+            "ch_2,10.00,settled\n"
+            "ch_x,10.00,settled\n"
+            "ch_3,ten,paid\n"
+            ",10.00,paid\n"
+            "ch_short\n"
+        )
+        self.assertEqual(
+            rows,
+            [
+                ("3", "ch_1", "amount"),
+                ("4", "ch_2", "status"),
+                ("5", "ch_x", "missing"),
+                ("6", "ch_3", "invalid"),
+                ("7", "", "invalid"),
+                ("8", "ch_short", "invalid"),
+            ],
+        )
+
+    def test_unlisted_payments_of_the_files_days(self):
+        content = (
+            "transaction_id,amount,status,date\n"
+            "ch_0,10.00,settled,2025-01-31\n"
+            "ch_2,10.00,failed,2025-01-31T18:00:00Z\n"
+        )
+        self.assertEqual(
+            self.reconcile(content, "--method", "Stripe"),
+            [("", "ch_1", "unlisted")],
+        )
+        self.assertEqual(
+            self.reconcile(content),
+            [("", "ch_1", "unlisted"), ("", "ch_3", "unlisted")],
+        )
+        self.assertEqual(
+            self.reconcile(content, "--method", "Stripe", "--to", "2025-02-01"),
+            [("", "ch_1", "unlisted"), ("", "ch_late", "unlisted")],
+        )
+
+    def test_unlisted_needs_a_date_range(self):
+        content = "transaction_id,amount,status\nch_0,10.00,settled\n"
+        self.assertEqual(self.reconcile(content, "--method", "Stripe"), [])
+        self.assertEqual(
+            self.reconcile(
+                content,
+                "--method",
+                "Stripe",
+                "--from",
+                "2025-01-31",
+                "--to",
+                "2025-01-31",
+            ),
+            [("", "ch_1", "unlisted"), ("", "ch_2", "unlisted")],
+        )
+        rows = self.reconcile(
+            "transaction_id,amount,status,date\nch_0,10.00,settled,yesterday\n"
+        )
+        self.assertEqual(rows, [("2", "ch_0", "invalid")])
+
+    def test_archived_payments_are_matched(self):
+        payment = Payment.objects.get(transaction_id="ch_0")
+        Order.objects.filter(pk=payment.order_id).update(
+            status="Delivered", updated_at=timezone.now() - datetime.timedelta(days=40)
+        )
+        call_command("archive_orders", "--days", "30", stdout=StringIO())
+        self.assertTrue(ArchivedPayment.objects.filter(transaction_id="ch_0").exists())
+        content = (
+            "transaction_id,amount,status,date\n"
+            "ch_1,10.00,settled,2025-01-31\n"
+            "ch_2,10.00,failed,2025-01-31\n"
+            "ch_0,11.00,settled,2025-01-31\n"
+        )
+        self.assertEqual(
+            self.reconcile(content, "--method", "Stripe"), [("4", "ch_0", "amount")]
+        )
+        rows = self.reconcile(
+            "transaction_id,amount,status,date\nch_1,10.00,settled,2025-01-31\n",
+            "--method",
+            "Stripe",
+        )
+        self.assertEqual(rows, [("", "ch_2", "unlisted"), ("", "ch_0", "unlisted")])
+
+    def test_short_lines(self):
+        rows = self.reconcile("amount,status,transaction_id\n10.00,settled\n10.00\n")
+        self.assertEqual(rows, [("2", "", "invalid"), ("3", "", "invalid")])
+
+    def test_missing_columns(self):
+        with self.assertRaisesMessage(CommandError, "Missing columns: status."):
+            self.reconcile("transaction_id,amount\nch_0,10.00\n")
@@ -1,8 +1,15 @@
 # payments/urls.py
-from django.urls import path
+from django.urls import path, include
 from . import views
 
+from rest_framework.routers import DefaultRouter
+
+api_router = DefaultRouter()
+api_router.register(r"", views.PaymentViewSet, basename="payment-api")
+
 urlpatterns = [
     # The URL now accepts an integer called 'order_id'
     path("create/<int:order_id>/", views.create_payment, name="create_payment"),
+    path("webhooks/<slug:gateway>/", views.payment_webhook, name="payment_webhook"),
+    path("api/", include(api_router.urls)),
 ]
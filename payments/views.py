@@ -1,45 +1,185 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import logging
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.urls import reverse
+from django.http import Http404, JsonResponse
+from django.shortcuts import aget_object_or_404, redirect, render
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import viewsets
+from rest_framework.permissions import IsAuthenticated
+
+from ecommerce_api.conditional import ConditionalGetMixin
 
+from ecommerce_api.idempotency import HEADER, idempotent
+from ecommerce_api.mixins import QueryPlannerMixin
+from ecommerce_api.pagination import OptInCursorPagination
 from orders.models import Order
+from orders.reservations import PENDING_PAYMENT
+from .events import record_events
+from .filters import PaymentFilter
+from .gateways import (
+    GatewayError,
+    PaymentDeclined,
+    WebhookError,
+    get_gateway,
+    get_gateway_by_slug,
+)
 from .models import Payment
-# Assuming you have a form, if not, we can remove it.
-# from .forms import PaymentForm
+from .processing import complete_payment, fail_payment, start_payment
+from .serializers import PaymentSerializer
+
+logger = logging.getLogger(__name__)
+
+# Templates may touch the lazy request.user, which queries the database.
+arender = sync_to_async(render)
 
 
 @login_required
-def create_payment(request, order_id):
+@idempotent
+async def create_payment(request, order_id):
     """
     View to handle the payment process for a specific order.
+
+    The view is async: while the gateway answers, the request waits on
+    the event loop instead of holding a worker. Gateways can only be
+    called under ASGI (see payments/gateways/http.py).
     """
     # 1. Fetch the specific order for the logged-in user, or return a 404 error if not found.
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    user = await request.auser()
+    order = await aget_object_or_404(Order, id=order_id, user=user)
 
     # Prevent re-payment for an already paid or non-pending order
-    if order.status != "Pending Payment":
+    if order.status != PENDING_PAYMENT or (
+        order.hold_expires_at and order.hold_expires_at <= timezone.now()
+    ):
         # You can redirect to the order detail page with a message
         return redirect("order_detail", pk=order.id)
 
-    if request.method == "POST":
-        # This is where you would integrate a real payment gateway (e.g., Stripe, PayPal).
-        # For this example, we will simulate a successful payment.
+    # Every rendering of the form carries a fresh attempt key. Submitting
+    # the same form twice sends the same key, so the gateway charges once.
+    context = {
+        "order": order,
+        "methods": Payment.PAYMENT_METHOD_CHOICES,
+        "attempt": uuid.uuid4().hex,
+    }
+    if request.method != "POST":
+        # If it's a GET request, just display the payment page with the order info.
+        return await arender(request, "payments/create_payment.html", context)
+
+    method = request.POST.get("payment_method", "Credit Card")
+    attempt = request.headers.get(HEADER) or request.POST.get("attempt", "")[:64]
+    context["attempt"] = attempt or context["attempt"]
+    if method not in dict(Payment.PAYMENT_METHOD_CHOICES):
+        context["error"] = "Please choose a payment method."
+        return await arender(
+            request, "payments/create_payment.html", context, status=400
+        )
 
-        # 2. Create a new Payment record and link it to the order.
-        Payment.objects.create(
-            order=order,
+    # 2. Record the attempt, then charge through the method's gateway. A
+    # retry or double submit of the same attempt reuses its key, so the
+    # gateway charges once; a client sending no key gets one per order.
+    payment = await sync_to_async(start_payment)(order, method)
+    if payment is None:
+        # Another attempt paid the order in the meantime.
+        return redirect("order_detail", pk=order.id)
+    gateway = get_gateway(method)
+    idempotency_key = f"order-{order.id}"
+    if attempt:
+        idempotency_key += f"-{attempt}"
+    try:
+        transaction_id = await gateway.charge(
             amount=order.total_amount,
-            status="Completed",
-            transaction_id="dummy_transaction_12345",  # This would come from the payment gateway
+            currency=settings.PAYMENT_CURRENCY,
+            reference=f"order-{order.id}",
+            idempotency_key=idempotency_key,
+        )
+    except PaymentDeclined as exc:
+        await sync_to_async(fail_payment)(payment, transaction_id=exc.transaction_id)
+        # Trying again is a new attempt, with a new key.
+        context["attempt"] = uuid.uuid4().hex
+        context["error"] = f"Your payment was declined ({exc})."
+        return await arender(
+            request, "payments/create_payment.html", context, status=402
+        )
+    except GatewayError as exc:
+        # Unknown outcome: the payment stays Pending, and a 5xx lets the
+        # client retry with the same Idempotency-Key.
+        logger.warning("Payment for order #%s failed: %s", order.id, exc)
+        context["error"] = "The payment provider is not responding, please try again."
+        return await arender(
+            request, "payments/create_payment.html", context, status=503
         )
 
-        # 3. Update the order's status to 'Processing' or 'Completed'.
-        order.status = "Processing"
-        order.save()
+    # 3. Turn the stock hold into a sale and move the order to 'Processing'.
+    # If the hold expired during the charge, the order was cancelled, and
+    # if another attempt paid it with another charge, this one is extra:
+    # give the money back.
+    if not await sync_to_async(complete_payment)(payment, transaction_id):
+        try:
+            await gateway.refund(transaction_id)
+        except GatewayError:
+            logger.exception(
+                "Refund of %s for expired order #%s failed", transaction_id, order.id
+            )
+        else:
+            await sync_to_async(fail_payment)(payment, "Refunded", transaction_id)
 
-        # 4. Redirect the user to the order detail page to show the confirmation.
-        return redirect("order_detail", pk=order.id)
+    # 4. Redirect the user to the order detail page to show the confirmation.
+    return redirect("order_detail", pk=order.id)
+
+
+@csrf_exempt
+@require_POST
+def payment_webhook(request, gateway):
+    """
+    Receives status events from a payment gateway.
+
+    The events are only verified and recorded here, and applied by a
+    background job (see payments/events.py), so the gateway gets its 200
+    quickly and stops redelivering them.
+    """
+    try:
+        gateway = get_gateway_by_slug(gateway)
+    except GatewayError:
+        raise Http404("Unknown payment gateway.")
+    try:
+        events = gateway.parse_webhook(request.headers, request.body)
+    except WebhookError as exc:
+        return JsonResponse({"detail": str(exc)}, status=400)
+    record_events(gateway, events)
+    return JsonResponse({"received": len(events)})
+
+
+class PaymentViewSet(
+    ConditionalGetMixin, QueryPlannerMixin, viewsets.ReadOnlyModelViewSet
+):
+    """
+    API endpoint for payments (read-only: payments are made through the
+    payment page and gateway webhooks).
+
+    Customers see the payments of their own orders, staff see all of them.
+    The order is joined in the same query (QueryPlannerMixin), and reads
+    carry ETag / Last-Modified validators (ConditionalGetMixin).
+
+    Filtering: `?status=`, `?method=`, `?created_after=` and
+    `?created_before=` (see payments/filters.py). Long date ranges page
+    efficiently with `?pagination=cursor`.
+    """
+
+    serializer_class = PaymentSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [PaymentFilter]
+    pagination_class = OptInCursorPagination  # ?pagination=cursor for keyset pages
+    # The order's status is part of its string representation.
+    conditional_fields = ("updated_at", "order__updated_at")
 
-    # If it's a GET request, just display the payment page with the order info.
-    context = {"order": order}
-    return render(request, "payments/create_payment.html", context)
+    def get_queryset(self):
+        queryset = Payment.objects.order_by("-created_at", "-id")
+        user = self.request.user
+        if user.is_staff:  # Admin can see all payments
+            return queryset
+        return queryset.filter(order__user=user)
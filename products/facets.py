@@ -0,0 +1,99 @@
+"""
+Facet counts for the product API.
+
+Each facet is counted with one grouped query (GROUP BY category, price
+bucket or availability) instead of one COUNT per facet value. Counts for
+a facet ignore that facet's own filter, so a client can show how many
+products every other category or price range would return.
+"""
+
+from django.db.models import Case, Count, IntegerField, Value, When
+
+from .models import Product
+
+# Upper bounds of the price buckets; the last bucket is open-ended.
+PRICE_BUCKETS = (25, 50, 100, 250, 500, 1000)
+
+
+def _without_aggregates(queryset):
+    """
+    Returns a plain queryset over the same rows.
+
+    Search results are grouped and annotated, so they are re-selected
+    through a subquery before they can be grouped again by facet.
+    """
+    if queryset.query.annotations:
+        return Product.objects.filter(pk__in=queryset.values("pk"))
+    return queryset.order_by()
+
+
+def _filtered(queryset, filters, facet):
+    for name, condition in filters.items():
+        if name != facet:
+            queryset = queryset.filter(condition)
+    return _without_aggregates(queryset)
+
+
+def category_facet(queryset):
+    rows = (
+        queryset.values("category__slug", "category__name")
+        .annotate(count=Count("pk"))
+        .order_by("category__name")
+    )
+    return [
+        {
+            "slug": row["category__slug"],
+            "name": row["category__name"],
+            "count": row["count"],
+        }
+        for row in rows
+    ]
+
+
+def price_facet(queryset):
+    bucket = Case(
+        *[
+            When(price__lt=upper, then=Value(index))
+            for index, upper in enumerate(PRICE_BUCKETS)
+        ],
+        default=Value(len(PRICE_BUCKETS)),
+        output_field=IntegerField(),
+    )
+    counts = dict(
+        queryset.annotate(bucket=bucket)
+        .values("bucket")
+        .annotate(count=Count("pk"))
+        .values_list("bucket", "count")
+        .order_by()
+    )
+    bounds = (0, *PRICE_BUCKETS, None)
+    return [
+        {"min": bounds[index], "max": bounds[index + 1], "count": counts.get(index, 0)}
+        for index in range(len(PRICE_BUCKETS) + 1)
+    ]
+
+
+def availability_facet(queryset):
+    counts = dict(
+        queryset.values("is_available")
+        .annotate(count=Count("pk"))
+        .values_list("is_available", "count")
+        .order_by()
+    )
+    return {"true": counts.get(True, 0), "false": counts.get(False, 0)}
+
+
+def compute_facets(queryset, filters):
+    """
+    Returns the facet counts for a (searched, unfiltered) product queryset.
+
+    `filters` maps facet names to their filter conditions, as returned by
+    ProductFacetFilter.get_filters().
+    """
+    return {
+        "category": category_facet(_filtered(queryset, filters, "category")),
+        "price": price_facet(_filtered(queryset, filters, "price")),
+        "is_available": availability_facet(
+            _filtered(queryset, filters, "is_available")
+        ),
+    }
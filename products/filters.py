@@ -0,0 +1,103 @@
+import datetime
+
+from django.db.models import Q
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from ecommerce_api.dates import start_of_day
+
+from .search import search_products
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    Filters products with the full-text search (see products/search.py).
+
+    Example: `/products/api/?search=wireless charger` returns the products
+    matching every word, most relevant first.
+    """
+
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "").strip()
+        if not query:
+            return queryset
+        return search_products(queryset, query)
+
+
+class ProductFilterParamsSerializer(serializers.Serializer):
+    """
+    Validates the query parameters accepted by ProductFacetFilter.
+    """
+
+    category = serializers.CharField(required=False)
+    min_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0, required=False
+    )
+    max_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0, required=False
+    )
+    is_available = serializers.BooleanField(required=False, allow_null=True)
+    created_after = serializers.DateField(required=False)
+    created_before = serializers.DateField(required=False)
+    min_rating = serializers.DecimalField(
+        max_digits=3, decimal_places=2, min_value=0, max_value=5, required=False
+    )
+
+
+class ProductFacetFilter(BaseFilterBackend):
+    """
+    Filters products by category, price range, availability and creation date.
+
+    - `category`: one or more category slugs, comma separated.
+    - `min_price` / `max_price`: inclusive price range.
+    - `is_available`: `true` or `false`.
+    - `created_after` / `created_before`: inclusive dates (YYYY-MM-DD).
+    - `min_rating`: lowest average review rating, e.g. `4` or `4.5`.
+
+    Example: `/products/api/?category=electronics&max_price=50&is_available=true`
+    """
+
+    def get_filters(self, request):
+        """
+        Returns the active filter conditions, keyed by facet name.
+
+        Keeping them apart lets facet counts for one facet be computed with
+        all the other filters applied but not its own.
+        """
+        params = ProductFilterParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+
+        filters = {}
+        if data.get("category"):
+            slugs = [
+                slug.strip() for slug in data["category"].split(",") if slug.strip()
+            ]
+            filters["category"] = Q(category__slug__in=slugs)
+        price = Q()
+        if data.get("min_price") is not None:
+            price &= Q(price__gte=data["min_price"])
+        if data.get("max_price") is not None:
+            price &= Q(price__lte=data["max_price"])
+        if price:
+            filters["price"] = price
+        if data.get("is_available") is not None:
+            filters["is_available"] = Q(is_available=data["is_available"])
+        created = Q()
+        if data.get("created_after"):
+            created &= Q(created_at__gte=start_of_day(data["created_after"]))
+        if data.get("created_before"):
+            next_day = data["created_before"] + datetime.timedelta(days=1)
+            created &= Q(created_at__lt=start_of_day(next_day))
+        if created:
+            filters["created_at"] = created
+        if data.get("min_rating") is not None:
+            filters["rating"] = Q(rating_avg__gte=data["min_rating"])
+        return filters
+
+    def filter_queryset(self, request, queryset, view):
+        for condition in self.get_filters(request).values():
+            queryset = queryset.filter(condition)
+        return queryset
@@ -0,0 +1,125 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.test import APIClient
+
+from categories.models import Category
+from products.models import Product
+from users.models import Users
+
+
+class Command(BaseCommand):
+    """
+    Measures the bulk price/stock endpoint against the per-item path.
+
+    Creates throw-away products, then changes the price and stock of
+    each one twice: once with a PATCH per product (`/products/api/{id}/`)
+    and once through `/products/api/bulk-update/`, in requests of
+    --chunk-size rows. Reports rows per second and queries per row for
+    both paths, and checks that every product ended with the values sent.
+
+    Everything runs in one transaction that is rolled back at the end,
+    but it writes real rows meanwhile: meant for development and staging
+    databases only.
+    """
+
+    help = "Benchmark bulk price/stock updates against per-item PATCH requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--username", required=True, help="Staff user sending the updates."
+        )
+        parser.add_argument(
+            "--rows", type=int, default=1000, help="Products to change (default 1000)."
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Rows per bulk request (default 1000).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = Users.objects.get(username=options["username"])
+        except Users.DoesNotExist:
+            raise CommandError(f"No user '{options['username']}'.")
+        if not user.is_staff:
+            raise CommandError("The bulk update endpoint is for staff users only.")
+        category = Category.objects.first()
+        if category is None:
+            raise CommandError("A category must exist.")
+        if options["rows"] < 1 or options["chunk_size"] < 1:
+            raise CommandError("--rows and --chunk-size must be positive.")
+
+        client = APIClient()
+        client.force_authenticate(user)
+        with transaction.atomic():
+            products = Product.objects.bulk_create(
+                [
+                    Product(
+                        name=f"Bulk benchmark product {index}",
+                        price=1,
+                        stack=1,
+                        category=category,
+                    )
+                    for index in range(options["rows"])
+                ]
+            )
+            ids = [product.pk for product in products]
+
+            per_item = self.run(
+                ids, 2, lambda rows: self.patch_each(client, rows), options
+            )
+            bulk = self.run(ids, 3, lambda rows: self.bulk(client, rows), options)
+            transaction.set_rollback(True)
+
+        for name, (elapsed, queries) in (("per item", per_item), ("bulk", bulk)):
+            self.stdout.write(
+                f"{name}: {len(ids) / elapsed:,.0f} rows/s, "
+                f"{queries} queries ({queries / len(ids):.3f} per row)"
+            )
+        self.stdout.write(f"Bulk speed-up: {per_item[0] / bulk[0]:.1f}x")
+
+    def run(self, ids, value, send, options):
+        """
+        Sets the price and stock of the products to `value` through `send`
+        and returns the time taken and the number of queries.
+        """
+        rows = [{"id": pk, "price": str(value), "stack": value} for pk in ids]
+        chunk_size = options["chunk_size"]
+        queries = 0
+
+        def count_query(execute, *args):
+            nonlocal queries
+            queries += 1
+            return execute(*args)
+
+        with connection.execute_wrapper(count_query):
+            started = time.perf_counter()
+            for start in range(0, len(rows), chunk_size):
+                send(rows[start : start + chunk_size])
+            elapsed = time.perf_counter() - started
+
+        wrong = (
+            Product.objects.filter(pk__in=ids).exclude(price=value, stack=value).count()
+        )
+        if wrong:
+            raise CommandError(f"{wrong} products don't have the values sent.")
+        return elapsed, queries
+
+    def patch_each(self, client, rows):
+        for row in rows:
+            response = client.patch(
+                f"/products/api/{row['id']}/",
+                {"price": row["price"], "stack": row["stack"]},
+                format="json",
+            )
+            if response.status_code != 200:
+                raise CommandError(f"PATCH failed: {response.status_code}.")
+
+    def bulk(self, client, rows):
+        response = client.post("/products/api/bulk-update/", rows, format="json")
+        if response.status_code != 200 or response.data["errors"]:
+            raise CommandError(f"Bulk update failed: {response.data}.")
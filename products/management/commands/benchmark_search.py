@@ -0,0 +1,178 @@
+import random
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+
+from categories.models import Category
+from products.models import Product
+from products.search import search_products, tokenize
+
+# A few words most products share, and a long tail of rare ones, like
+# real product text.
+COMMON_WORDS = [
+    "black",
+    "wireless",
+    "steel",
+    "pro",
+    "mini",
+    "portable",
+    "cotton",
+    "smart",
+    "classic",
+    "kit",
+]
+RARE_WORDS = 5000
+
+
+class Command(BaseCommand):
+    """
+    Measures search latency as the catalog grows.
+
+    Adds synthetic products to the catalog in steps (see --sizes), and at
+    each step times a mix of queries (a common word, a rare word, two
+    words, a prefix) through search_products() and through a plain
+    `icontains` scan of names and descriptions. Each query is timed as the
+    list endpoint runs it: a count and the first page. Reports the median
+    and 95th percentile per method and catalog size.
+
+    On MySQL, search_products() uses the FULLTEXT indexes. Elsewhere it is
+    a ranked scan itself, so both methods should take about as long.
+
+    The products are committed (InnoDB FULLTEXT indexes only see committed
+    rows) and deleted at the end, unless --keep: meant for development and
+    staging databases only.
+    """
+
+    help = "Benchmark product search latency against catalog size."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1000,10000,50000",
+            help="Synthetic catalog sizes to measure at (default 1000,10000,50000).",
+        )
+        parser.add_argument(
+            "--queries", type=int, default=20, help="Queries per kind (default 20)."
+        )
+        parser.add_argument(
+            "--page-size", type=int, default=10, help="Rows per page (default 10)."
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--no-scan",
+            action="store_true",
+            help="Only time the indexed search (the scan gets slow on big catalogs).",
+        )
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the synthetic products."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted({int(size) for size in options["sizes"].split(",")})
+        except ValueError:
+            raise CommandError("--sizes must be a comma-separated list of integers.")
+        if sizes[0] < 1:
+            raise CommandError("Sizes must be positive.")
+
+        self.random = random.Random(options["seed"])
+        self.rare_words = [
+            "".join(
+                self.random.choices(string.ascii_lowercase, k=self.random.randint(5, 9))
+            )
+            for _ in range(RARE_WORDS)
+        ]
+        queries = self.build_queries(options["queries"])
+
+        self.stdout.write(f"Database: {connection.vendor}")
+        category = Category.objects.create(
+            name="Search benchmark", slug=f"search-benchmark-{time.time_ns()}"
+        )
+        try:
+            created = 0
+            for size in sizes:
+                self.add_products(category, size - created)
+                created = size
+                self.measure(queries, options)
+        finally:
+            if not options["keep"]:
+                # Its products go with it.
+                category.delete()
+
+    def words(self, count):
+        """
+        Picks product words: about one in five is a common word.
+        """
+        return [
+            (
+                self.random.choice(COMMON_WORDS)
+                if self.random.random() < 0.2
+                else self.random.choice(self.rare_words)
+            )
+            for _ in range(count)
+        ]
+
+    def build_queries(self, per_kind):
+        queries = {"common word": [], "rare word": [], "two words": [], "prefix": []}
+        for _ in range(per_kind):
+            queries["common word"].append(self.random.choice(COMMON_WORDS))
+            queries["rare word"].append(self.random.choice(self.rare_words))
+            queries["two words"].append(
+                f"{self.random.choice(COMMON_WORDS)} {self.random.choice(self.rare_words)}"
+            )
+            queries["prefix"].append(self.random.choice(self.rare_words)[:3])
+        return queries
+
+    def add_products(self, category, count, batch_size=1000):
+        while count > 0:
+            batch = [
+                Product(
+                    name=" ".join(self.words(self.random.randint(2, 5))).title(),
+                    description=" ".join(self.words(self.random.randint(10, 30))),
+                    price=self.random.randint(100, 100000) / 100,
+                    stack=self.random.randint(0, 100),
+                    category=category,
+                )
+                for _ in range(min(count, batch_size))
+            ]
+            Product.objects.bulk_create(batch)
+            count -= len(batch)
+
+    def scan(self, query):
+        """
+        The search without the index: every word must appear somewhere in
+        the name or the description.
+        """
+        condition = Q()
+        for term in tokenize(query):
+            condition &= Q(name__icontains=term) | Q(description__icontains=term)
+        return Product.objects.filter(condition).order_by("-created_at")
+
+    def time_query(self, queryset, page_size):
+        started = time.perf_counter()
+        queryset.count()
+        list(queryset[:page_size])
+        return (time.perf_counter() - started) * 1000
+
+    def measure(self, queries, options):
+        methods = {"search": lambda query: search_products(Product.objects.all(), query)}
+        if not options["no_scan"]:
+            methods["scan"] = self.scan
+
+        self.stdout.write(f"Catalog of {Product.objects.count()} products:")
+        for kind, kind_queries in queries.items():
+            line = [f"  {kind:<12}"]
+            for name, method in methods.items():
+                timings = sorted(
+                    self.time_query(method(query), options["page_size"])
+                    for query in kind_queries
+                )
+                p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                line.append(
+                    f"{name} p50 {statistics.median(timings):7.2f} ms, p95 {p95:7.2f} ms"
+                )
+            self.stdout.write(" | ".join(line))
@@ -0,0 +1,88 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from ecommerce_api.mixins import build_query_plan
+from ecommerce_api.serializers import CompiledRepresentationMixin
+from orders.models import Order
+from orders.serializers import OrderSerializer
+from products.models import Product
+from products.serializers import ProductSerializer
+from reviews.models import Review
+from reviews.serializers import ReviewSerializer
+
+TARGETS = {
+    "products": (Product, ProductSerializer),
+    "orders": (Order, OrderSerializer),
+    "reviews": (Review, ReviewSerializer),
+}
+
+
+class Command(BaseCommand):
+    """
+    Measures the serialization speed of the API list serializers.
+
+    Loads one page of rows per serializer (with the same query plan the
+    viewsets use), then renders it with the stock DRF code path and with
+    the compiled one, and reports rows per second for both. The rendered
+    JSON of both paths is compared byte for byte.
+    """
+
+    help = "Benchmark the compiled serializer read path against stock DRF."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, default=10000, help="Rows per page (default 10000)."
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=3, help="Best of N runs (default 3)."
+        )
+        parser.add_argument(
+            "targets",
+            nargs="*",
+            help=f"Serializers to benchmark: {', '.join(TARGETS)} (default: all).",
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options["targets"]) - set(TARGETS)
+        if unknown:
+            raise CommandError(f"Unknown targets: {', '.join(sorted(unknown))}.")
+
+        request = Request(APIRequestFactory().get("/"))
+        for target in options["targets"] or TARGETS:
+            model, serializer_class = TARGETS[target]
+            context = {"request": request}
+            plan = build_query_plan(serializer_class(many=True, context=context))
+            rows = list(
+                plan.apply(model._default_manager.order_by("-pk"))[: options["rows"]]
+            )
+            if not rows:
+                self.stdout.write(f"{target}: no rows, skipped.")
+                continue
+
+            results = {}
+            for compiled in (False, True):
+                CompiledRepresentationMixin.compiled_representation = compiled
+                try:
+                    best = None
+                    for _ in range(options["repeat"]):
+                        serializer = serializer_class(rows, many=True, context=context)
+                        started = time.perf_counter()
+                        data = serializer.data
+                        elapsed = time.perf_counter() - started
+                        best = elapsed if best is None else min(best, elapsed)
+                    results[compiled] = (best, JSONRenderer().render(data))
+                finally:
+                    CompiledRepresentationMixin.compiled_representation = True
+
+            stock, stock_json = results[False]
+            fast, fast_json = results[True]
+            identical = "identical" if stock_json == fast_json else "DIFFERENT"
+            self.stdout.write(
+                f"{target}: {len(rows)} rows, stock {len(rows) / stock:,.0f} rows/s, "
+                f"compiled {len(rows) / fast:,.0f} rows/s "
+                f"({stock / fast:.1f}x), output {identical}."
+            )
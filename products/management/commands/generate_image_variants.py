@@ -0,0 +1,83 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from categories.models import Category
+from ecommerce_api.images import (
+    has_variants,
+    ready_field,
+    record_variants,
+    render_variants,
+    variant_job,
+)
+from products.models import Product
+from users.models import Users
+
+IMAGE_FIELDS = [
+    (Product, "image"),
+    (Category, "image"),
+    (Users, "profile_image"),
+]
+
+
+class Command(BaseCommand):
+    """
+    Generates the resized variants of every uploaded image.
+
+    Needed for images uploaded before variants existed, after changing
+    settings.IMAGE_VARIANTS (with --force), or after loading fixtures.
+    Images are resized in parallel by a pool of worker processes, and
+    recorded on their row once done. Uploads are normally handled by the
+    `images.generate_variants` job instead.
+    """
+
+    help = "Generate missing thumbnail/medium variants of uploaded images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.IMAGE_VARIANT_WORKERS,
+            help="Number of worker processes.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate variants that are already recorded.",
+        )
+
+    def handle(self, *args, **options):
+        generated = failed = 0
+        with ProcessPoolExecutor(max_workers=options["workers"]) as executor:
+            futures = {}
+            for model, field_name in IMAGE_FIELDS:
+                images = (
+                    model.objects.exclude(**{field_name: ""})
+                    .exclude(**{f"{field_name}__isnull": True})
+                    .values_list("pk", field_name, ready_field(field_name))
+                )
+                field = model._meta.get_field(field_name)
+                for pk, name, recorded in images.iterator():
+                    if not options["force"] and has_variants(recorded, name):
+                        continue
+                    job = variant_job(field.attr_class(None, field, name))
+                    if job is not None:
+                        future = executor.submit(render_variants, *job)
+                        futures[future] = (model, pk, field_name, name)
+
+            for future in as_completed(futures):
+                model, pk, field_name, name = futures[future]
+                try:
+                    generated += future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"{name}: {exc}")
+                else:
+                    record_variants(model, pk, field_name, name)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {generated} image variants ({failed} images failed)."
+            )
+        )
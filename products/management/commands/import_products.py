@@ -0,0 +1,219 @@
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from categories.models import Category
+from ecommerce_api.cache import bump_generation
+from products.models import Product
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None
+
+UPDATE_FIELDS = [
+    "name",
+    "price",
+    "stack",
+    "category",
+    "description",
+    "is_available",
+    "updated_at",
+]
+
+
+class RowError(Exception):
+    """
+    Raised when a feed row can't be turned into a product.
+    """
+
+
+class Command(BaseCommand):
+    """
+    Streams a CSV or JSONL product feed into the catalog.
+
+    Each row needs `name`, `price`, `stack` and `category` (a category
+    slug); `description` and `id` are optional. Rows are upserted in
+    batches: existing products are matched by id (or by name) and updated
+    with bulk_update, the rest are inserted with bulk_create. Each batch is
+    written in its own transaction, so a failure only rolls back the
+    current batch and memory use stays flat whatever the feed size.
+    """
+
+    help = "Import products from a CSV or JSONL file (use '-' for stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Feed file, or '-' to read stdin.")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="Feed format. Defaults to the file extension.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows written per bulk statement and transaction.",
+        )
+        parser.add_argument(
+            "--match",
+            choices=["id", "name"],
+            default="id",
+            help="Field used to find the existing product a row updates.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        feed_format = options["format"] or Path(path).suffix.lstrip(".").lower()
+        if feed_format not in ("csv", "jsonl"):
+            raise CommandError("Unknown feed format, pass --format csv|jsonl.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        self.match = options["match"]
+        self.categories = dict(Category.objects.values_list("slug", "id"))
+        self.created = self.updated = self.failed = 0
+
+        started = time.monotonic()
+        if path == "-":
+            stream = sys.stdin
+        else:
+            stream = open(path, newline="", encoding="utf-8")
+        try:
+            batch = []
+            for line_number, row in self.read_rows(stream, feed_format):
+                try:
+                    batch.append(self.build_product(row))
+                except RowError as exc:
+                    self.failed += 1
+                    self.stderr.write(f"Line {line_number}: {exc}")
+                if len(batch) >= options["batch_size"]:
+                    self.write_batch(batch)
+                    batch = []
+            self.write_batch(batch)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        if self.created or self.updated:
+            bump_generation(Product)
+        self.report(time.monotonic() - started)
+
+    def read_rows(self, stream, feed_format):
+        """
+        Yields (line number, row dict) pairs from the feed.
+        """
+        if feed_format == "csv":
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as exc:
+                self.failed += 1
+                self.stderr.write(f"Line {line_number}: invalid JSON ({exc}).")
+
+    def clean(self, field_name, value):
+        """
+        Converts and validates one raw value like the model field would.
+        """
+        field = Product._meta.get_field(field_name)
+        try:
+            value = field.clean(value, None)
+        except ValidationError as exc:
+            raise RowError(f"{field_name}: {' '.join(exc.messages)}")
+        return value
+
+    def build_product(self, row):
+        """
+        Builds an unsaved Product from a feed row.
+        """
+        slug = (row.get("category") or "").strip()
+        if slug not in self.categories:
+            raise RowError(f"unknown category '{slug}'.")
+
+        product = Product(
+            name=self.clean("name", (row.get("name") or "").strip()),
+            price=self.clean("price", row.get("price")),
+            stack=self.clean("stack", row.get("stack")),
+            category_id=self.categories[slug],
+            description=row.get("description") or None,
+        )
+        if row.get("id") not in (None, ""):
+            product.pk = self.clean("id", row["id"])
+        product.update_availability()
+        return product
+
+    def split_existing(self, batch):
+        """
+        Splits a batch into products to insert and products to update.
+        """
+        if self.match == "name":
+            # Later rows for the same name win.
+            batch = list({product.name: product for product in batch}.values())
+            existing = dict(
+                Product.objects.filter(
+                    name__in=[product.name for product in batch]
+                ).values_list("name", "pk")
+            )
+            for product in batch:
+                product.pk = existing.get(product.name)
+            existing = set(existing.values())
+        else:
+            keyed = {product.pk: product for product in batch if product.pk}
+            batch = list(keyed.values()) + [p for p in batch if not p.pk]
+            existing = set(
+                Product.objects.filter(pk__in=list(keyed)).values_list(
+                    "pk", flat=True
+                )
+            )
+
+        to_create = [product for product in batch if product.pk not in existing]
+        to_update = [product for product in batch if product.pk in existing]
+        return to_create, to_update
+
+    def write_batch(self, batch):
+        """
+        Upserts one batch of products.
+        """
+        if not batch:
+            return
+        to_create, to_update = self.split_existing(batch)
+        now = timezone.now()
+        for product in to_update:
+            product.updated_at = now
+
+        with transaction.atomic():
+            Product.objects.bulk_create(to_create)
+            Product.objects.bulk_update(to_update, UPDATE_FIELDS)
+
+        self.created += len(to_create)
+        self.updated += len(to_update)
+
+    def report(self, elapsed):
+        rows = self.created + self.updated
+        rate = rows / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {rows} products ({self.created} created, "
+                f"{self.updated} updated, {self.failed} failed) "
+                f"in {elapsed:.1f}s ({rate:.0f} rows/s)."
+            )
+        )
+        if resource is not None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+            divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+            peak_mb = peak / divisor
+            self.stdout.write(f"Peak memory: {peak_mb:.1f} MB.")
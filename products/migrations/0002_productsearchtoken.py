@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='products.product')),
+            ],
+            options={
+                'db_table': 'ProductSearchTokens',
+                'indexes': [models.Index(fields=['token', 'product'], name='ProductSear_token_fb0d90_idx')],
+                'unique_together': {('product', 'token')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        ('products', '0002_productsearchtoken'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-created_at', '-id'], name='Products_created_4d7cf3_idx'),
+        ),
+    ]
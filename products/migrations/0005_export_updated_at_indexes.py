@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("categories", "0001_initial"),
+        ("products", "0004_product_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["updated_at"], name="Products_updated_98c5ac_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("categories", "0001_initial"),
+        ("products", "0005_export_updated_at_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="rating_1",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_2",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_3",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_4",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_5",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_avg",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_sum",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["rating_avg"], name="Products_rating__553229_idx"
+            ),
+        ),
+    ]
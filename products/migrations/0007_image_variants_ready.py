@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0006_product_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="image_variants_ready",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
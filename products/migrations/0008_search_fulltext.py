@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:47
+
+from django.db import migrations
+
+# FULLTEXT indexes are MySQL only; Django has no portable way to declare
+# them. Other databases search without an index (see products/search.py).
+FULLTEXT_INDEXES = {
+    "Products_search_ft": ("name", "description"),
+    "Products_name_ft": ("name",),
+}
+
+
+def add_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "mysql":
+        return
+    qn = schema_editor.quote_name
+    for name, columns in FULLTEXT_INDEXES.items():
+        schema_editor.execute(
+            f"CREATE FULLTEXT INDEX {qn(name)} ON {qn('Products')} "
+            f"({', '.join(qn(column) for column in columns)})"
+        )
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "mysql":
+        return
+    qn = schema_editor.quote_name
+    for name in FULLTEXT_INDEXES:
+        schema_editor.execute(f"DROP INDEX {qn(name)} ON {qn('Products')}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0007_image_variants_ready"),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name="ProductSearchToken",
+        ),
+        migrations.RunPython(add_fulltext_indexes, drop_fulltext_indexes),
+    ]
@@ -22,6 +22,16 @@ class Product(models.Model):
         updated_at (DateTimeField): Records when the product was last updated.
         is_available (BooleanField): True if the product is in stock.
         image (ImageField): An optional image for the product.
+        image_variants_ready (JSONField): Which resized variants of the
+            image exist (see ecommerce_api/images.py).
+        rating_avg (DecimalField): The average review rating (0 if none).
+        rating_count (IntegerField): The number of reviews.
+        rating_sum (IntegerField): The sum of all review ratings.
+        rating_1 ... rating_5 (IntegerField): The number of reviews per star.
+
+    The rating fields are maintained incrementally by Review.save() and the
+    review delete signal (see reviews/ratings.py); run
+    `manage.py recompute_ratings` after writing reviews in bulk.
     """
 
     name = models.CharField(max_length=100)
@@ -44,6 +54,15 @@ class Product(models.Model):
         blank=True,
         help_text="Upload an image for the product",
     )
+    image_variants_ready = models.JSONField(default=dict, blank=True, editable=False)
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    rating_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    rating_1 = models.IntegerField(default=0)
+    rating_2 = models.IntegerField(default=0)
+    rating_3 = models.IntegerField(default=0)
+    rating_4 = models.IntegerField(default=0)
+    rating_5 = models.IntegerField(default=0)
 
     class Meta:
         """
@@ -51,10 +70,23 @@ class Product(models.Model):
 
         - db_table: Sets a custom table name in the database.
         - ordering: Sets the default sort order for products to be by name.
+        - indexes: Support the newest-first keyset pagination of the API,
+          the category / price / availability / rating filters and the
+          `updated_after` filter of incremental exports. On MySQL, the
+          FULLTEXT indexes used by searches are added by migration 0008
+          (see products/search.py).
         """
 
         db_table = "Products"
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"]),
+            models.Index(fields=["category", "price"]),
+            models.Index(fields=["is_available", "price"]),
+            models.Index(fields=["price"]),
+            models.Index(fields=["updated_at"]),
+            models.Index(fields=["rating_avg"]),
+        ]
 
     def __str__(self):
         """
@@ -62,6 +94,18 @@ class Product(models.Model):
         """
         return f"{self.name} - ${self.price}"
 
+    def update_availability(self):
+        """
+        Sets the 'is_available' field from the stock count.
+
+        A product is unavailable when its stock count is zero or less.
+        Bulk writers that bypass save() call this to apply the same rule.
+        """
+        if self.stack <= 0:
+            self.is_available = False
+        else:
+            self.is_available = True
+
     def save(self, *args, **kwargs):
         """
         Overrides the default save method to manage availability.
@@ -70,8 +114,5 @@ class Product(models.Model):
         if the stock count is zero or less, ensuring the product cannot
         be purchased.
         """
-        if self.stack <= 0:
-            self.is_available = False
-        else:
-            self.is_available = True
+        self.update_availability()
         super().save(*args, **kwargs)
@@ -0,0 +1,131 @@
+"""
+Product search.
+
+On MySQL, searches use the FULLTEXT indexes of the `Products` table (see
+migration 0008): one on (name, description) finds the products, one on
+name ranks name matches first. MySQL keeps them up to date on every
+write, bulk imports included, so there is nothing to rebuild.
+
+Matching there is by word prefix: every query word must start a word of
+the name or the description, so `wire` finds "Wireless charger" but
+`less` doesn't. Words MySQL leaves out of the index (shorter than
+innodb_ft_min_token_size, or on its default stopword list) are matched
+anywhere in the name or description instead, like on other databases.
+
+Other databases (SQLite in development) have no such index: every query
+word must appear somewhere in the name or the description (a
+`LIKE '%word%'` scan), which also covers prefixes.
+
+Either way, results are ranked name matches first, then by date.
+"""
+
+import re
+
+from django.db import connections
+from django.db.models import Case, FloatField, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Words in the product name describe it better than words in the description.
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+# Words InnoDB leaves out of FULLTEXT indexes: shorter than
+# innodb_ft_min_token_size, or in INNODB_FT_DEFAULT_STOPWORD.
+FULLTEXT_MIN_LENGTH = 3
+FULLTEXT_STOPWORDS = frozenset(
+    "a about an are as at be by com de en for from how i in is it la of on or "
+    "that the this to was what when where who will with und www".split()
+)
+
+
+def tokenize(text):
+    """
+    Splits text into lower-cased search words.
+    """
+    if not text:
+        return []
+    return TOKEN_RE.findall(text.lower())
+
+
+def _indexed(term):
+    return len(term) >= FULLTEXT_MIN_LENGTH and term not in FULLTEXT_STOPWORDS
+
+
+def _scan(term):
+    return Q(name__icontains=term) | Q(description__icontains=term)
+
+
+def _match(connection, table, columns, query):
+    """
+    Returns the MATCH ... AGAINST relevance of a boolean-mode query.
+    """
+    qn = connection.ops.quote_name
+    # Qualified, as joined tables (categories) have a name column too.
+    columns = ", ".join(f"{qn(table)}.{qn(column)}" for column in columns)
+    return RawSQL(
+        f"MATCH ({columns}) AGAINST (%s IN BOOLEAN MODE)",
+        [query],
+        output_field=FloatField(),
+    )
+
+
+def _fulltext_search(queryset, connection, terms):
+    indexed = [term for term in terms if _indexed(term)]
+    query = " ".join(f"+{term}*" for term in indexed)
+    table = queryset.model._meta.db_table
+
+    condition = Q()
+    for term in terms:
+        if term not in indexed:
+            condition &= _scan(term)
+    return (
+        queryset.filter(condition)
+        .alias(search_match=_match(connection, table, ("name", "description"), query))
+        .filter(search_match__gt=0)
+        .annotate(
+            search_rank=NAME_WEIGHT * _match(connection, table, ("name",), query)
+            + _match(connection, table, ("name", "description"), query)
+        )
+        .order_by("-search_rank", "-created_at")
+    )
+
+
+def _scan_search(queryset, terms):
+    condition = Q()
+    rank = Value(0)
+    for term in terms:
+        condition &= _scan(term)
+        rank = rank + Case(
+            When(name__icontains=term, then=Value(NAME_WEIGHT)),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        rank = rank + Case(
+            When(description__icontains=term, then=Value(DESCRIPTION_WEIGHT)),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    return (
+        queryset.filter(condition)
+        .annotate(search_rank=rank)
+        .order_by("-search_rank", "-created_at")
+    )
+
+
+def search_products(queryset, query):
+    """
+    Filters a Product queryset down to the products matching a search query.
+
+    Every word of the query must match (see the module docstring for how).
+    Matching products are annotated with ``search_rank`` and ordered by it,
+    most relevant first.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return queryset.none()
+    connection = connections[queryset.db]
+    if connection.vendor == "mysql" and any(_indexed(term) for term in terms):
+        return _fulltext_search(queryset, connection, terms)
+    return _scan_search(queryset, terms)
@@ -1,9 +1,11 @@
 from rest_framework import serializers
 from .models import Product
 from categories.models import Category
+from ecommerce_api.fields import ImageVariantsField
+from ecommerce_api.serializers import CompiledRepresentationMixin, SparseFieldsetsMixin
 
 
-class CategoryLiteSerializer(serializers.ModelSerializer):
+class CategoryLiteSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """A simple serializer to represent categories within product details."""
 
     class Meta:
@@ -11,12 +13,34 @@ class CategoryLiteSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "slug")
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class RatingHistogramField(serializers.Field):
+    """
+    Renders the per-star review counts of a product as {"1": n, ..., "5": n}.
+    """
+
+    # Columns read from the product, for the API query planner.
+    source_fields = tuple(f"rating_{star}" for star in range(1, 6))
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, product):
+        return {
+            str(star): getattr(product, f"rating_{star}") for star in range(1, 6)
+        }
+
+
+class ProductSerializer(
+    SparseFieldsetsMixin, CompiledRepresentationMixin, serializers.ModelSerializer
+):
     """
     Serializer for the Product model.
 
     This handles the conversion of Product instances to JSON, including
-    nested details for the category.
+    nested details for the category. Read requests can pick fields with
+    `?fields=` / `?omit=` (see SparseFieldsetsMixin).
     """
 
     # Use a nested serializer for the category to show its details,
@@ -29,6 +53,12 @@ class ProductSerializer(serializers.ModelSerializer):
         queryset=Category.objects.all(), source="category", write_only=True
     )
 
+    # URLs of the resized copies of the image (thumbnail, medium, ...).
+    image_variants = ImageVariantsField("image")
+
+    # Review counts per star rating, kept up to date with the reviews.
+    rating_histogram = RatingHistogramField()
+
     class Meta:
         model = Product
         fields = (
@@ -41,10 +71,40 @@ class ProductSerializer(serializers.ModelSerializer):
             "description",
             "is_available",
             "image",
+            "image_variants",
+            "rating_avg",
+            "rating_count",
+            "rating_histogram",
             "created_at",
             "updated_at",
         )
 
         # These fields are set automatically by the model's logic
         # or the database, so they should not be editable via the API.
-        read_only_fields = ("is_available", "created_at", "updated_at")
+        read_only_fields = (
+            "is_available",
+            "rating_avg",
+            "rating_count",
+            "created_at",
+            "updated_at",
+        )
+
+
+class ProductStockUpdateSerializer(serializers.Serializer):
+    """
+    Validates one row of a bulk price/stock update.
+
+    Each row names a product by id and carries a new price, a new stock
+    count, or both.
+    """
+
+    id = serializers.IntegerField()
+    price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0, required=False
+    )
+    stack = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, attrs):
+        if "price" not in attrs and "stack" not in attrs:
+            raise serializers.ValidationError("Provide a price, a stack, or both.")
+        return attrs
@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ecommerce_api.cache import bump_generation
+from ecommerce_api.images import schedule_variants
+
+from .models import Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, **kwargs):
+    """
+    Invalidates cached product responses after any write.
+
+    The generation is bumped once the write is committed: bumped earlier,
+    a concurrent read could still cache the old data under the new one.
+    """
+    transaction.on_commit(lambda: bump_generation(Product))
+
+
+@receiver(post_save, sender=Product)
+def generate_product_image_variants(sender, instance, raw=False, **kwargs):
+    """
+    Resizes a newly uploaded product image in the background.
+    """
+    update_fields = kwargs.get("update_fields")
+    if raw or (update_fields is not None and "image" not in update_fields):
+        return
+    schedule_variants(instance.image)
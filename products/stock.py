@@ -0,0 +1,94 @@
+"""
+Atomic stock changes for checkout and cancellation.
+
+Stock is taken with conditional UPDATEs (`SET stack = stack - qty WHERE
+stack >= qty`) instead of read-modify-write, so two checkouts can never
+both take the last unit: the database serializes the updates on the row
+and the second one simply matches no row. No row is locked before the
+update, and products are updated in id order so concurrent checkouts
+always lock rows in the same order and can't deadlock each other.
+"""
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from ecommerce_api.cache import bump_generation
+
+from .models import Product
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when some products don't have enough stock for a checkout.
+    """
+
+    def __init__(self, product_ids):
+        self.product_ids = product_ids
+        super().__init__(
+            "Not enough stock for products " + ", ".join(map(str, product_ids))
+        )
+
+
+def _availability_after(delta):
+    # Computed from the stock *before* the update; it is passed before
+    # `stack` in update() because MySQL applies SET clauses left to right.
+    # Same rule as Product.update_availability(): available while stack > 0.
+    return Case(When(stack__gt=-delta, then=Value(True)), default=Value(False))
+
+
+def _change_stock(product_id, delta, **conditions):
+    return Product.objects.filter(pk=product_id, **conditions).update(
+        is_available=_availability_after(delta),
+        stack=F("stack") + delta,
+        updated_at=timezone.now(),
+    )
+
+
+def decrement_stock(quantities):
+    """
+    Takes stock for a checkout, all or nothing.
+
+    `quantities` maps product ids to the number of units to take. Raises
+    InsufficientStock naming every product that is short; the caller's
+    transaction must then be rolled back (raising out of
+    transaction.atomic() does that).
+    """
+    short = [
+        product_id
+        for product_id in sorted(quantities)
+        if not _change_stock(
+            product_id,
+            -quantities[product_id],
+            stack__gte=quantities[product_id],
+        )
+    ]
+    if short:
+        raise InsufficientStock(short)
+    transaction.on_commit(lambda: bump_generation(Product))
+
+
+def restock(quantities):
+    """
+    Puts units back into stock, e.g. when an order is cancelled.
+
+    All products are updated with a single statement, so releasing a large
+    batch of orders doesn't cost one query per product.
+    """
+    if not quantities:
+        return
+    product_ids = sorted(quantities)
+    Product.objects.filter(pk__in=product_ids).update(
+        # Before `stack`, see _availability_after().
+        is_available=Case(
+            *[
+                When(pk=pk, stack__gt=-quantities[pk], then=Value(True))
+                for pk in product_ids
+            ],
+            default=Value(False),
+        ),
+        stack=F("stack")
+        + Case(*[When(pk=pk, then=Value(quantities[pk])) for pk in product_ids]),
+        updated_at=timezone.now(),
+    )
+    transaction.on_commit(lambda: bump_generation(Product))
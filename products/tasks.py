@@ -0,0 +1,13 @@
+from django.apps import apps
+
+from ecommerce_api.images import GENERATE_VARIANTS_JOB, generate_variants
+from jobs.queue import task
+
+
+@task(GENERATE_VARIANTS_JOB)
+def generate_image_variants(model, pk, field, image):
+    """
+    Resizes an uploaded image of a product, category or user (see
+    ecommerce_api/images.py).
+    """
+    generate_variants(apps.get_model(model), pk, field, image)
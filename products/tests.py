@@ -1,3 +1,666 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from urllib.parse import urlsplit
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from categories.models import Category
+from ecommerce_api.serializers import CompiledRepresentationMixin
+from jobs.models import Job
+from reviews.models import Review
+from users.models import Users
+
+from .models import Product
+from .search import search_products
+from .serializers import ProductSerializer
+from .stock import InsufficientStock, decrement_stock, restock
+
+
+class ProductApiQueryTests(TestCase):
+    """
+    The product API reads a page with a fixed number of queries, however
+    many products, categories and reviews there are.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create_user(
+            username="reader", email="reader@example.com", password="x"
+        )
+        for index in range(3):
+            category = Category.objects.create(name=f"Category {index}")
+            for number in range(4):
+                product = Product.objects.create(
+                    name=f"Product {index}-{number}",
+                    price=Decimal("10.00") + number,
+                    stack=5,
+                    category=category,
+                )
+                Review.objects.create(user=cls.user, product=product, rating=4)
+        cls.product = product
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_list_queries(self):
+        # Validators, count, page, and the three facets.
+        with self.assertNumQueries(6):
+            response = self.client.get("/products/api/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 12)
+
+    def test_detail_queries(self):
+        # Validators, then the product with its category.
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/products/api/{self.product.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["rating_count"], 1)
+
+    def test_cached_reads_run_no_queries(self):
+        # The validators are cached along with the response.
+        self.client.get("/products/api/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/products/api/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Conditional")
+        cls.product = Product.objects.create(
+            name="Mouse", price=10, stack=5, category=cls.category
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = f"/products/api/{self.product.pk}/"
+
+    def test_unchanged_product_is_not_modified(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_changed_list_is_sent_again(self):
+        etag = self.client.get("/products/api/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = "Renamed"
+            self.category.save()
+        response = self.client.get("/products/api/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["results"][0]["category"]["name"], "Renamed")
+
+    def test_missing_product_is_not_found(self):
+        response = self.client.get("/products/api/999999/", HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(response.status_code, 404)
+
+
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Cached")
+        cls.product = Product.objects.create(
+            name="Mouse", price=10, stack=5, category=cls.category
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = f"/products/api/{self.product.pk}/"
+
+    def test_repeated_reads_are_served_from_the_cache(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["name"], "Mouse")
+        self.assertFalse([query for query in queries if "LIMIT" in query["sql"]])
+
+    def test_product_write_invalidates_once_committed(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.product.name = "Trackball"
+            self.product.save()
+            # Not bumped before the commit: a concurrent read would cache
+            # the old row under the new generation.
+            self.assertEqual(self.client.get(self.url).data["name"], "Mouse")
+        self.assertTrue(callbacks)
+        self.assertEqual(self.client.get(self.url).data["name"], "Trackball")
+
+    def test_category_write_invalidates_products(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = "Pointing devices"
+            self.category.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["category"]["name"], "Pointing devices")
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Pages")
+        created_at = timezone.now()
+        # Half of them share a timestamp: the id breaks the ties.
+        for index in range(25):
+            Product.objects.create(
+                name=f"Product {index}",
+                price=1,
+                stack=1,
+                category=category,
+                created_at=created_at
+                - timezone.timedelta(seconds=index if index % 2 else 0),
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_pages_are_numbered_by_default(self):
+        response = self.client.get("/products/api/")
+        self.assertEqual(response.data["count"], 25)
+
+    def test_cursor_pages_cover_every_product_once(self):
+        expected = list(
+            Product.objects.order_by("-created_at", "-id").values_list("pk", flat=True)
+        )
+        seen = []
+        url = "/products/api/?pagination=cursor"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            seen.extend(row["id"] for row in response.data["results"])
+            url = response.data["next"]
+            if url:
+                parts = urlsplit(url)
+                url = f"{parts.path}?{parts.query}"
+        self.assertEqual(seen, expected)
+
+    def test_cursor_pages_skip_the_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/products/api/?pagination=cursor")
+        self.assertFalse(
+            [query for query in queries if 'COUNT(*) AS "__count"' in query["sql"]]
+        )
+
+
+class ImportProductsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Imported", slug="imported")
+        cls.existing = Product.objects.create(
+            name="Old mouse", price=5, stack=1, category=cls.category
+        )
+
+    def run_import(self, content, *args, suffix=".csv"):
+        with tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False) as feed:
+            feed.write(content)
+        self.addCleanup(os.unlink, feed.name)
+        stdout, stderr = StringIO(), StringIO()
+        call_command("import_products", feed.name, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_rows_are_upserted_by_id(self):
+        output, _ = self.run_import(
+            "id,name,price,stack,category,description\n"
+            f"{self.existing.pk},New mouse,7.50,0,imported,\n"
+            ",Wireless keyboard,20,3,imported,Quiet keys\n"
+            "9999,Webcam,30,2,imported,\n",
+            "--batch-size",
+            "2",
+        )
+        self.assertIn("(2 created, 1 updated, 0 failed)", output)
+        self.existing.refresh_from_db()
+        self.assertEqual(
+            (self.existing.name, self.existing.price, self.existing.is_available),
+            ("New mouse", Decimal("7.50"), False),
+        )
+        self.assertTrue(Product.objects.filter(pk=9999, name="Webcam").exists())
+        # Imported products are searchable right away.
+        self.assertEqual(
+            [product.name for product in search_products(Product.objects, "quiet")],
+            ["Wireless keyboard"],
+        )
+
+    def test_rows_are_upserted_by_name(self):
+        output, _ = self.run_import(
+            '{"name": "Old mouse", "price": "6", "stack": 4, "category": "imported"}\n'
+            '{"name": "Pad", "price": "2", "stack": 1, "category": "imported"}\n',
+            "--match",
+            "name",
+            suffix=".jsonl",
+        )
+        self.assertIn("(1 created, 1 updated, 0 failed)", output)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.stack, 4)
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        output, errors = self.run_import(
+            "name,price,stack,category\n"
+            "Pad,2,1,imported\n"
+            "Cable,-,1,imported\n"
+            "Hub,3,1,unknown\n"
+        )
+        self.assertIn("(1 created, 0 updated, 2 failed)", output)
+        self.assertIn("Line 3: price", errors)
+        self.assertIn("Line 4: unknown category 'unknown'.", errors)
+
+
+class FacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        mice = Category.objects.create(name="Mice", slug="mice")
+        pads = Category.objects.create(name="Pads", slug="pads")
+        for name, price, stack, category in (
+            ("Wired mouse", 10, 5, mice),
+            ("Wireless mouse", 30, 0, mice),
+            ("Gaming mouse", 120, 5, mice),
+            ("Cloth pad", 10, 5, pads),
+            ("Wireless charging pad", 60, 5, pads),
+        ):
+            Product.objects.create(
+                name=name, price=price, stack=stack, category=category
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_facets_count_every_value(self):
+        facets = self.client.get("/products/api/").data["facets"]
+        self.assertEqual(
+            facets["category"],
+            [
+                {"slug": "mice", "name": "Mice", "count": 3},
+                {"slug": "pads", "name": "Pads", "count": 2},
+            ],
+        )
+        self.assertEqual(
+            [bucket["count"] for bucket in facets["price"]], [2, 1, 1, 1, 0, 0, 0]
+        )
+        self.assertEqual(facets["price"][-1], {"min": 1000, "max": None, "count": 0})
+        self.assertEqual(facets["is_available"], {"true": 4, "false": 1})
+
+    def test_facet_counts_ignore_their_own_filter(self):
+        response = self.client.get("/products/api/?category=mice&max_price=50")
+        self.assertEqual(response.data["count"], 2)
+        facets = response.data["facets"]
+        # Filtered by price, not by category.
+        self.assertEqual([row["count"] for row in facets["category"]], [2, 1])
+        # Filtered by category, not by price.
+        self.assertEqual(
+            [bucket["count"] for bucket in facets["price"]], [1, 1, 0, 1, 0, 0, 0]
+        )
+        self.assertEqual(facets["is_available"], {"true": 1, "false": 1})
+
+    def test_facets_follow_the_search(self):
+        facets = self.client.get("/products/api/?search=wireless").data["facets"]
+        self.assertEqual([row["count"] for row in facets["category"]], [1, 1])
+        self.assertEqual(facets["is_available"], {"true": 1, "false": 1})
+
+
+class ImageVariantTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Pictured")
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        override = override_settings(MEDIA_ROOT=media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self, name="mouse.png"):
+        data = io.BytesIO()
+        Image.new("RGB", (800, 600), "red").save(data, "PNG")
+        return SimpleUploadedFile(name, data.getvalue(), content_type="image/png")
+
+    def test_one_job_per_image(self):
+        product = Product.objects.create(
+            name="Mouse", price=10, stack=5, category=self.category, image=self.upload()
+        )
+        # Saving again before the workers ran doesn't queue another job.
+        product.price = 12
+        product.save()
+        self.assertEqual(Job.objects.filter(status="queued").count(), 1)
+
+        call_command("run_workers", "--once", stdout=StringIO())
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants_ready["name"], product.image.name)
+        product.save()
+        self.assertFalse(Job.objects.filter(status="queued").exists())
+
+        product.image = self.upload("pad.png")
+        product.save()
+        job = Job.objects.get(status="queued")
+        self.assertEqual(job.payload["image"], product.image.name)
+
+
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create_user(
+            username="writer", email="writer@example.com", password="x"
+        )
+        cls.category = Category.objects.create(name="Sparse")
+        cls.product = Product.objects.create(
+            name="Mouse",
+            price=10,
+            stack=5,
+            category=cls.category,
+            description="A long description",
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def page_query(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        [sql] = [query["sql"] for query in queries if "LIMIT" in query["sql"]]
+        return response, sql
+
+    def test_fields_keeps_the_listed_fields_and_columns(self):
+        response, sql = self.page_query("/products/api/?fields=id,name,unknown")
+        self.assertEqual(list(response.data["results"][0]), ["id", "name"])
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn("JOIN", sql)
+
+    def test_omit_drops_the_listed_fields_and_columns(self):
+        response, sql = self.page_query(
+            f"/products/api/{self.product.pk}/?omit=description,category"
+        )
+        self.assertNotIn("description", response.data)
+        self.assertNotIn("category", response.data)
+        self.assertIn("price", response.data)
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn("JOIN", sql)
+
+    def test_writes_return_every_field(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(
+            f"/products/api/{self.product.pk}/?fields=id", {"stack": 3}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["stack"], 3)
+        self.assertEqual(response.data["description"], "A long description")
+
+
+class CompiledRepresentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = Users.objects.create_user(
+            username="rater", email="rater@example.com", password="x"
+        )
+        category = Category.objects.create(name="Compiled")
+        cls.rated = Product.objects.create(
+            name="Mouse", price="10.50", stack=5, category=category, description="Hi"
+        )
+        Review.objects.create(user=user, product=cls.rated, rating=4)
+        Product.objects.create(name="Pad", price=2, stack=0, category=category)
+
+    def render(self):
+        request = Request(APIRequestFactory().get("/products/api/"))
+        serializer = ProductSerializer(
+            Product.objects.select_related("category").order_by("pk"),
+            many=True,
+            context={"request": request},
+        )
+        return serializer.data
+
+    def test_output_matches_drf(self):
+        compiled = self.render()
+        with mock.patch.object(
+            CompiledRepresentationMixin, "compiled_representation", False
+        ):
+            stock = self.render()
+        self.assertEqual(compiled, stock)
+        self.assertEqual(compiled[0]["price"], "10.50")
+        self.assertEqual(compiled[0]["rating_histogram"]["4"], 1)
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Exported")
+        for index in range(5):
+            Product.objects.create(
+                name=f"Product {index}", price=index, stack=1, category=cls.category
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def test_ndjson_streams_every_row_in_chunks(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/products/api/export/?fields=id,name")
+            lines = self.content(response).decode().splitlines()
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [row["id"] for row in rows],
+            sorted(Product.objects.values_list("pk", flat=True)),
+        )
+        self.assertEqual(set(rows[0]), {"id", "name"})
+        # Three chunks of at most two rows, then the empty one.
+        self.assertEqual(len([q for q in queries if "LIMIT 2" in q["sql"]]), 4)
+
+    def test_csv_flattens_nested_objects(self):
+        response = self.client.get(
+            "/products/api/export/?output=csv&fields=id,name,category&max_price=2"
+        )
+        rows = list(csv.DictReader(io.StringIO(self.content(response).decode())))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["category.name"], "Exported")
+
+    def test_gzip_when_accepted(self):
+        response = self.client.get(
+            "/products/api/export/", HTTP_ACCEPT_ENCODING="gzip, br"
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        lines = gzip.decompress(self.content(response)).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+
+    def test_updated_after(self):
+        later = timezone.now() + timezone.timedelta(minutes=1)
+        Product.objects.filter(name="Product 3").update(updated_at=later)
+        response = self.client.get(
+            "/products/api/export/",
+            {"updated_after": timezone.now().isoformat()},
+        )
+        [line] = self.content(response).decode().splitlines()
+        self.assertEqual(json.loads(line)["name"], "Product 3")
+
+
+class BulkUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = Users.objects.create_user(
+            username="staff", email="staff@example.com", password="x", is_staff=True
+        )
+        cls.customer = Users.objects.create_user(
+            username="customer", email="customer@example.com", password="x"
+        )
+        category = Category.objects.create(name="Bulk")
+        cls.mouse = Product.objects.create(
+            name="Mouse", price=10, stack=5, category=category
+        )
+        cls.pad = Product.objects.create(
+            name="Pad", price=2, stack=5, category=category
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_customers_cannot_bulk_update(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.post(
+            "/products/api/bulk-update/",
+            [{"id": self.mouse.pk, "stack": 0}],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 403)
+        self.mouse.refresh_from_db()
+        self.assertEqual(self.mouse.stack, 5)
+
+    def test_valid_rows_are_applied_and_the_others_reported(self):
+        self.client.force_authenticate(self.staff)
+        self.client.get(f"/products/api/{self.mouse.pk}/")
+        rows = [
+            {"id": self.mouse.pk, "stack": 0},
+            {"id": self.pad.pk, "price": "-1"},
+            {"id": 999999, "stack": 1},
+            {"id": self.pad.pk, "stack": 2},
+            {"id": self.pad.pk, "stack": 3},
+        ]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post(
+                "/products/api/bulk-update/", rows, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(callbacks)
+        self.assertEqual(response.data["updated"], 1)
+        self.assertEqual(
+            [error["index"] for error in response.data["errors"]], [1, 2, 3, 4]
+        )
+        self.assertEqual(
+            response.data["errors"][1]["errors"]["id"], ["Product not found."]
+        )
+
+        self.mouse.refresh_from_db()
+        self.assertEqual(self.mouse.stack, 0)
+        self.assertFalse(self.mouse.is_available)
+        self.pad.refresh_from_db()
+        self.assertEqual(self.pad.stack, 5)
+        # The cached detail was invalidated.
+        response = self.client.get(f"/products/api/{self.mouse.pk}/")
+        self.assertEqual(response.data["stack"], 0)
+
+
+class StockTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Stock")
+        cls.first = Product.objects.create(
+            name="First", price=1, stack=3, category=category
+        )
+        cls.second = Product.objects.create(
+            name="Second", price=1, stack=1, category=category
+        )
+
+    def test_decrement_takes_every_product_or_none(self):
+        with self.assertRaises(InsufficientStock) as raised:
+            with transaction.atomic():
+                decrement_stock({self.first.pk: 2, self.second.pk: 2})
+        self.assertEqual(raised.exception.product_ids, [self.second.pk])
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.stack, 3)
+
+    def test_decrement_and_restock(self):
+        decrement_stock({self.first.pk: 2, self.second.pk: 1})
+        self.second.refresh_from_db()
+        self.assertEqual((self.second.stack, self.second.is_available), (0, False))
+
+        restock({self.first.pk: 2, self.second.pk: 1})
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.stack, self.second.stack), (3, 1))
+        self.assertTrue(self.second.is_available)
+
+
+class SearchTests(TransactionTestCase):
+    """
+    Runs outside a test transaction: InnoDB FULLTEXT indexes only see
+    committed rows.
+    """
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Search")
+        self.charger = Product.objects.create(
+            name="Wireless charger",
+            description="Charges phones.",
+            price=20,
+            stack=1,
+            category=category,
+        )
+        self.cable = Product.objects.create(
+            name="USB cable",
+            description="Works with any wireless charger.",
+            price=5,
+            stack=1,
+            category=category,
+        )
+        self.mouse = Product.objects.create(
+            name="Mouse",
+            description="A wireless mouse.",
+            price=9,
+            stack=1,
+            category=category,
+        )
+
+    def search(self, query):
+        return list(search_products(Product.objects.all(), query))
+
+    def test_every_word_must_match(self):
+        self.assertEqual(
+            set(self.search("wireless charger")), {self.charger, self.cable}
+        )
+        self.assertEqual(self.search("wireless keyboard"), [])
+
+    def test_name_matches_rank_first(self):
+        self.assertEqual(self.search("charger")[0], self.charger)
+        self.assertEqual(self.search("wireless charger")[0], self.charger)
+
+    def test_words_match_by_prefix(self):
+        self.assertEqual(
+            set(self.search("WIRE")), {self.charger, self.cable, self.mouse}
+        )
+        self.assertEqual(self.search("charg usb"), [self.cable])
+
+    def test_empty_query_matches_nothing(self):
+        self.assertEqual(self.search(" ... "), [])
+
+    def test_api_search(self):
+        response = APIClient().get("/products/api/", {"search": "charger"})
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]],
+            [self.charger.pk, self.cable.pk],
+        )
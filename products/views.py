@@ -1,7 +1,23 @@
-from django.db.models import Q  # <-- تم إضافة هذا السطر للبحث المتقدم
-from rest_framework import viewsets, permissions
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
+from rest_framework.response import Response
+from categories.models import Category
+from ecommerce_api.cache import bump_generation, get_cache, versioned_key
+from ecommerce_api.conditional import ConditionalDetailMixin, ConditionalGetMixin
+from ecommerce_api.exports import stream_export
+from ecommerce_api.mixins import CachedResponseMixin, QueryPlannerMixin
+from ecommerce_api.pagination import OptInCursorPagination
+from .facets import compute_facets
+from .filters import ProductFacetFilter, ProductSearchFilter
 from .models import Product
-from .serializers import ProductSerializer
+from .search import search_products
+from .serializers import ProductSerializer, ProductStockUpdateSerializer
 from .forms import ProductForm
 
 # --- Django Generic Views for Templates ---
@@ -15,16 +31,181 @@ from django.views.generic import (
 from django.urls import reverse_lazy
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    QueryPlannerMixin,
+    viewsets.ModelViewSet,
+):
     """
     API endpoint for products.
     Provides CRUD operations via REST API.
+    The nested category is joined in the same query (QueryPlannerMixin).
+    Reads are cached until a product or category changes (CachedResponseMixin).
+    Reads carry ETag / Last-Modified validators (ConditionalGetMixin).
+
+    Filtering:
+    - `?search=` full-text search, `?category=`, `?min_price=`, `?max_price=`,
+      `?is_available=`, `?created_after=`, `?created_before=` and
+      `?min_rating=`.
+    - `?ordering=` sorts by rating_avg, rating_count, price, created_at or
+      name, e.g. `?ordering=-rating_avg` for the best rated first.
+    - List responses carry a `facets` object with product counts per
+      category, price bucket and availability.
+    - `export/` streams every matching product as NDJSON or CSV.
     """
 
     queryset = Product.objects.all().order_by("-created_at")  # Latest products first
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     # Authenticated users can create/update, others can only read
+    filter_backends = [ProductSearchFilter, ProductFacetFilter, OrderingFilter]
+    ordering_fields = ["rating_avg", "rating_count", "price", "created_at", "name"]
+    pagination_class = OptInCursorPagination  # ?pagination=cursor for keyset pages
+    cache_dependencies = (Product, Category)  # The nested category is cached too
+    conditional_fields = ("updated_at", "category__updated_at")
+
+    # Query parameters that only order or page the products, not select them.
+    pagination_params = ("page", "cursor", "pagination", "ordering")
+
+    def get_conditional_queryset(self):
+        """
+        Returns the searched products, before the facet filters.
+
+        Facet counts cover products outside the filtered list (each facet
+        ignores its own filter), so list validators watch the wider set.
+        """
+        queryset = self.get_queryset()
+        if self.action == "list":
+            return ProductSearchFilter().filter_queryset(self.request, queryset, self)
+        return self.filter_queryset(queryset)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data["facets"] = self.get_facets()
+        return response
+
+    def get_facets(self):
+        """
+        Returns the facet counts for the current search and filters.
+
+        Counts are shared by every page of a result set and cached until a
+        product or category changes.
+        """
+        params = sorted(
+            (key, values)
+            for key, values in self.request.query_params.lists()
+            if key not in self.pagination_params
+        )
+        cache = get_cache()
+        key = versioned_key(
+            "facets", self.cache_dependencies, urlencode(params, doseq=True)
+        )
+        facets = cache.get(key)
+        if facets is None:
+            queryset = ProductSearchFilter().filter_queryset(
+                self.request, self.get_queryset(), self
+            )
+            filters = ProductFacetFilter().get_filters(self.request)
+            facets = compute_facets(queryset, filters)
+            cache.set(key, facets, settings.RESPONSE_CACHE_TIMEOUT)
+        return facets
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk-update",
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def bulk_stock_update(self, request):
+        """
+        Applies many price/stock changes in one request (staff only).
+
+        Expects a list of `{"id": ..., "price": ..., "stack": ...}` rows.
+        Valid rows are written with a single bulk_update in one transaction;
+        invalid rows are reported by their position in the list and don't
+        stop the others from being applied. A product may appear on one row
+        only: all the rows of a repeated id are reported, none is applied.
+        """
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response(
+                {"detail": "Expected a list of changes."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(rows) > settings.PRODUCT_BULK_UPDATE_LIMIT:
+            return Response(
+                {
+                    "detail": "Too many changes, send at most "
+                    f"{settings.PRODUCT_BULK_UPDATE_LIMIT} per request."
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        errors = []
+        changes = {}  # product id -> (row index, validated data)
+        repeated = {}  # product id -> indexes of all its rows
+        for index, row in enumerate(rows):
+            serializer = ProductStockUpdateSerializer(data=row)
+            if not serializer.is_valid():
+                errors.append({"index": index, "errors": serializer.errors})
+                continue
+            product_id = serializer.validated_data["id"]
+            if product_id in repeated:
+                repeated[product_id].append(index)
+            elif product_id in changes:
+                repeated[product_id] = [changes.pop(product_id)[0], index]
+            else:
+                changes[product_id] = (index, serializer.validated_data)
+        for product_id, indexes in repeated.items():
+            message = f"Product {product_id} is changed by several rows: {indexes}."
+            errors.extend(
+                {"index": index, "errors": {"id": [message]}} for index in indexes
+            )
+
+        products = Product.objects.only("id", "price", "stack", "is_available").in_bulk(
+            list(changes)
+        )
+        now = timezone.now()
+        to_update = []
+        fields = {"updated_at"}
+        for product_id, (index, data) in changes.items():
+            product = products.get(product_id)
+            if product is None:
+                errors.append(
+                    {"index": index, "errors": {"id": ["Product not found."]}}
+                )
+                continue
+            if "price" in data:
+                product.price = data["price"]
+                fields.add("price")
+            if "stack" in data:
+                product.stack = data["stack"]
+                product.update_availability()
+                fields.update(("stack", "is_available"))
+            product.updated_at = now
+            to_update.append(product)
+
+        # Only the columns some row actually changes are written.
+        with transaction.atomic():
+            Product.objects.bulk_update(to_update, sorted(fields), batch_size=500)
+            if to_update:
+                transaction.on_commit(lambda: bump_generation(Product))
+
+        errors.sort(key=lambda error: error["index"])
+        return Response({"updated": len(to_update), "errors": errors})
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        Streams the whole (filtered) catalog as NDJSON or CSV.
+
+        Accepts the list filters plus `?output=ndjson|csv` and
+        `?updated_after=`; see ecommerce_api/exports.py.
+        """
+        return stream_export(
+            self, self.filter_queryset(self.get_queryset()), "products"
+        )
 
 
 class ProductListView(ListView):
@@ -50,26 +231,27 @@ class ProductListView(ListView):
         query = self.request.GET.get("q")
 
         if query:
-            # If a query exists, filter the queryset.
-            # The Q object allows for a complex query (searching in name OR description).
-            # 'icontains' makes the search case-insensitive.
-            queryset = queryset.filter(
-                Q(name__icontains=query) | Q(description__icontains=query)
-            ).distinct()
+            # If a query exists, filter the queryset through the search
+            # (products/search.py). Matching is case-insensitive and results
+            # come back ranked by relevance (name matches first).
+            queryset = search_products(queryset, query)
 
         return queryset
 
     # --- END: Search Logic Addition ---
 
 
-class ProductDetailView(DetailView):
+class ProductDetailView(ConditionalDetailMixin, DetailView):
     """
     Display details of a single product.
+    Answers conditional requests with 304 while the product and its
+    category are unchanged.
     """
 
     model = Product
     template_name = "products/product_detail.html"
     context_object_name = "product"
+    conditional_fields = ("updated_at", "category__updated_at")
 
 
 class ProductCreateView(CreateView):
@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from ecommerce_api.cache import bump_generation
+from products.models import Product
+from reviews.models import Review
+from reviews.ratings import STARS, average_rating, star_field
+
+COUNTER_FIELDS = ["rating_count", "rating_sum"] + [star_field(star) for star in STARS]
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the rating aggregates of every product from its reviews.
+
+    Needed after writing reviews in bulk (bulk_create, queryset.update())
+    or if the stored aggregates ever drift. All counters are read with one
+    grouped query over the review table; only products whose values
+    changed are written.
+    """
+
+    help = "Recompute product rating aggregates from the reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Products written per bulk_update.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        grouped = (
+            Review.objects.order_by()
+            .values("product_id")
+            .annotate(
+                rating_count=Count("id"),
+                rating_sum=Sum("rating"),
+                **{
+                    star_field(star): Count("id", filter=Q(rating=star))
+                    for star in STARS
+                },
+            )
+        )
+        expected = {row.pop("product_id"): row for row in grouped}
+
+        now = timezone.now()
+        corrected = 0
+        with transaction.atomic():
+            batch = []
+            stored = Product.objects.only("id", *COUNTER_FIELDS).order_by("pk")
+            for product in stored.iterator(chunk_size=batch_size):
+                values = expected.get(product.pk) or dict.fromkeys(COUNTER_FIELDS, 0)
+                if all(getattr(product, f) == values[f] for f in COUNTER_FIELDS):
+                    continue
+                for field in COUNTER_FIELDS:
+                    setattr(product, field, values[field])
+                product.updated_at = now
+                batch.append(product)
+                if len(batch) >= batch_size:
+                    self.write_batch(batch)
+                    corrected += len(batch)
+                    batch = []
+            self.write_batch(batch)
+            corrected += len(batch)
+
+        if corrected:
+            bump_generation(Product)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Recomputed ratings of {len(expected)} reviewed products "
+                f"({corrected} corrected)."
+            )
+        )
+
+    def write_batch(self, products):
+        if not products:
+            return
+        Product.objects.bulk_update(products, COUNTER_FIELDS + ["updated_at"])
+        Product.objects.filter(pk__in=[product.pk for product in products]).update(
+            rating_avg=average_rating()
+        )
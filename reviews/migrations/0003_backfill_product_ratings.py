@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+
+def backfill_ratings(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Review = apps.get_model("reviews", "Review")
+    stars = {
+        f"rating_{star}": Count("id", filter=Q(rating=star)) for star in range(1, 6)
+    }
+    rows = Review.objects.values("product_id").annotate(
+        rating_count=Count("id"), rating_sum=Sum("rating"), **stars
+    )
+    for row in rows.order_by():
+        product_id = row.pop("product_id")
+        row["rating_avg"] = round(row["rating_sum"] / row["rating_count"], 2)
+        Product.objects.filter(pk=product_id).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0006_product_rating_aggregates"),
+        ("reviews", "0002_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
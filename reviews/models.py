@@ -1,8 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from users.models import Users
 from products.models import Product
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .ratings import record_rating_change
+
 class Review(models.Model):
     """
     Represents a user's review for a product.
@@ -27,15 +29,40 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Relations followed by __str__, selected up front by the API query planner.
+    STR_RELATED_FIELDS = ('user', 'product')
+
     class Meta:
         """
         Meta options for the Review model.
         
         - unique_together: Ensures a user can't review the same product twice.
         - ordering: Sets the default order to show newest reviews first.
+        - indexes: Supports the newest-first keyset pagination of the API.
         """
         unique_together = ('user', 'product')
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['-created_at', '-id'])]
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the review and updates the product's rating aggregates in the
+        same transaction.
+
+        The stored rating and product are re-read under a row lock, so the
+        aggregates stay right even if this instance was loaded long ago.
+        """
+        with transaction.atomic():
+            old = None
+            if self.pk is not None:
+                old = (
+                    Review.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list('product_id', 'rating')
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            record_rating_change(old, (self.product_id, self.rating))
 
     def __str__(self):
         """
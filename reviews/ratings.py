@@ -0,0 +1,70 @@
+"""
+Incremental maintenance of the rating aggregates stored on Product.
+
+Each review moves its rating into or out of the product's counters with
+F() arithmetic, so no review table scan is needed and concurrent reviews
+of the same product can't overwrite each other. The average is derived
+from the stored counters in a second UPDATE: in a single statement MySQL
+would read the already-updated counters while other databases read the
+old ones.
+"""
+
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+
+from ecommerce_api.cache import bump_generation
+from products.models import Product
+
+STARS = range(1, 6)
+
+
+def star_field(rating):
+    return f"rating_{rating}"
+
+
+def average_rating():
+    """
+    Returns the expression computing rating_avg from the stored counters.
+    """
+    return Case(
+        When(rating_count__lte=0, then=Value(0)),
+        default=Round(
+            Cast("rating_sum", FloatField()) / F("rating_count"), precision=2
+        ),
+        output_field=Product._meta.get_field("rating_avg"),
+    )
+
+
+def record_rating_change(old, new):
+    """
+    Applies one review write to the product rating aggregates.
+
+    `old` and `new` are the review's (product id, rating) before and after
+    the write; None for a created or deleted review. Must run in the
+    transaction of the review write.
+    """
+    if old == new:
+        return
+    deltas = {}
+    for review, sign in ((old, -1), (new, 1)):
+        if review is None:
+            continue
+        product_id, rating = review
+        delta = deltas.setdefault(product_id, {})
+        for field, amount in (
+            ("rating_count", 1),
+            ("rating_sum", rating),
+            (star_field(rating), 1),
+        ):
+            delta[field] = delta.get(field, 0) + sign * amount
+
+    now = timezone.now()
+    for product_id, delta in deltas.items():
+        Product.objects.filter(pk=product_id).update(
+            updated_at=now,
+            **{field: F(field) + amount for field, amount in delta.items() if amount},
+        )
+    Product.objects.filter(pk__in=list(deltas)).update(rating_avg=average_rating())
+    transaction.on_commit(lambda: bump_generation(Product))
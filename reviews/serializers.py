@@ -1,15 +1,19 @@
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 from .models import Review
+from ecommerce_api.serializers import CompiledRepresentationMixin, SparseFieldsetsMixin
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(
+    SparseFieldsetsMixin, CompiledRepresentationMixin, serializers.ModelSerializer
+):
     """
     Serializer for the Review model.
 
     This serializer handles creating and displaying reviews. It ensures that
     the user is automatically set to the currently logged-in user and that a
-    user cannot review the same product more than once.
+    user cannot review the same product more than once. Read requests can
+    pick fields with `?fields=` / `?omit=`.
     """
 
     # We make the 'user' field read-only because we will set it automatically
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Review
+from .ratings import record_rating_change
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_rating(sender, instance, **kwargs):
+    """
+    Takes a deleted review out of its product's rating aggregates.
+
+    Also runs for queryset deletes and cascades, which never call
+    Review.delete().
+    """
+    record_rating_change((instance.product_id, instance.rating), None)
@@ -1,3 +1,66 @@
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from categories.models import Category
+from products.models import Product
+from users.models import Users
+
+from .models import Review
+
+
+class ReviewApiQueryTests(TestCase):
+    """
+    The review API reads a page with a fixed number of queries, however
+    many users and products the reviews belong to.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Reviews')
+        products = [
+            Product.objects.create(name=f'Product {index}', price=1, stack=1, category=category)
+            for index in range(3)
+        ]
+        for index in range(4):
+            user = Users.objects.create_user(
+                username=f'reviewer{index}', email=f'reviewer{index}@example.com', password='x'
+            )
+            for product in products:
+                cls.review = Review.objects.create(user=user, product=product, rating=index + 1)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_list_queries(self):
+        # Validators, count and page.
+        with self.assertNumQueries(3):
+            response = self.client.get('/reviews/api/reviews/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 12)
+
+    def test_detail_queries(self):
+        # Validators and the row.
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/reviews/api/reviews/{self.review.pk}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_unchanged_review_is_not_modified(self):
+        url = f'/reviews/api/reviews/{self.review.pk}/'
+        etag = self.client.get(url)['ETag']
+        # Only the validators are computed.
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.review.rating = 1
+        self.review.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_ratings_follow_reviews(self):
+        product = self.review.product
+        product.refresh_from_db()
+        self.assertEqual((product.rating_count, product.rating_4), (4, 1))
+        self.review.delete()
+        product.refresh_from_db()
+        self.assertEqual((product.rating_count, product.rating_4), (3, 0))
@@ -6,11 +6,14 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from .models import Review, Product  # Assuming Product model is accessible
 from .serializers import ReviewSerializer
 from .permissions import IsOwnerOrReadOnly
+from ecommerce_api.conditional import ConditionalGetMixin
+from ecommerce_api.mixins import QueryPlannerMixin
+from ecommerce_api.pagination import OptInCursorPagination
 
 # --- Django REST Framework API Views ---
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, QueryPlannerMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing, creating, updating, and deleting reviews.
 
@@ -22,14 +25,21 @@ class ReviewViewSet(viewsets.ModelViewSet):
     Filtering:
     - You can order reviews by rating using the `ordering` query parameter.
       Example: `/api/reviews/?ordering=-rating` to get highest rated first.
+
+    Pagination:
+    - Page numbers by default; `?pagination=cursor` switches to keyset pages.
+
+    Reads carry ETag / Last-Modified validators, so polling clients get a
+    304 while nothing changed (ConditionalGetMixin).
     """
 
-    queryset = Review.objects.all().select_related("user", "product")
+    queryset = Review.objects.all()  # Joins are added by QueryPlannerMixin
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ["rating", "created_at"]  # Fields available for ordering
-    ordering = ["-created_at"]  # Default ordering
+    ordering = ["-created_at", "-id"]  # Default ordering (id breaks ties)
+    pagination_class = OptInCursorPagination
 
     def perform_create(self, serializer):
         """
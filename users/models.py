@@ -38,6 +38,11 @@ class Users(AbstractUser):
     profile_image = models.ImageField(
         upload_to="profile_images/", blank=True, null=True
     )
+    # Which resized variants of the profile image exist (see
+    # ecommerce_api/images.py).
+    profile_image_variants_ready = models.JSONField(
+        default=dict, blank=True, editable=False
+    )
     slug = models.SlugField(max_length=100, unique=True, blank=True)
     password_reset_code = models.CharField(max_length=10, blank=True, null=True)
     password_reset_expires = models.DateTimeField(blank=True, null=True)
@@ -109,6 +114,9 @@ class Address(models.Model):
     postal_code = models.CharField(max_length=20)
     is_default = models.BooleanField(default=False)
 
+    # Relations followed by __str__, selected up front by the API query planner.
+    STR_RELATED_FIELDS = ("user",)
+
     class Meta:
         """
         Meta options for the Address model. Ensures a user can only have one
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Users, Address
+from ecommerce_api.fields import ImageVariantsField
 
 
 class AddressSerializer(serializers.ModelSerializer):
@@ -35,6 +36,9 @@ class UserSerializer(serializers.ModelSerializer):
     # Nested serializer for related addresses (read-only)
     addresses = AddressSerializer(many=True, read_only=True)
 
+    # URLs of the resized copies of the profile image
+    profile_image_variants = ImageVariantsField("profile_image")
+
     class Meta:
         model = Users
         fields = (
@@ -46,6 +50,7 @@ class UserSerializer(serializers.ModelSerializer):
             "role",
             "phone",
             "profile_image",
+            "profile_image_variants",
             "addresses",  # Nested addresses appear here
             "password",  # For create/update only (write-only)
         )
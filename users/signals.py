@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from ecommerce_api.images import schedule_variants
+
+from .models import Users
+
+
+@receiver(post_save, sender=Users)
+def generate_profile_image_variants(sender, instance, raw=False, **kwargs):
+    """
+    Resizes a newly uploaded profile image in the background.
+    """
+    update_fields = kwargs.get("update_fields")
+    if raw or (update_fields is not None and "profile_image" not in update_fields):
+        return
+    schedule_variants(instance.profile_image)